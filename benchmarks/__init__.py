@@ -0,0 +1,6 @@
+"""Offline benchmarks for the SDK.
+
+These aren't tests, they print timings meant to be compared between
+changes. They run against a local emulator of the APIs, see
+`tests/stub_server.py`.
+"""
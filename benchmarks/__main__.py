@@ -0,0 +1,6 @@
+"""Run all benchmarks with `python -m benchmarks`."""
+from . import bench_codec, bench_dispatch, bench_client
+
+bench_codec.main()
+bench_dispatch.main()
+bench_client.main()
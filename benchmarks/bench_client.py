@@ -0,0 +1,114 @@
+"""Measure the overhead, throughput and memory use of the client.
+
+All requests are sent to a local emulator of the API, so the benchmark
+runs fully offline. Run with `python -m benchmarks.bench_client`.
+"""
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .stub import stub_server, create_client, create_subscription
+
+
+def bench_overhead(url, number):
+    """Compare a query through the client with a bare `requests` call."""
+    client = create_client(url, pool_size=1)
+    subscription_id = create_subscription(client)
+    query_url = "{0}/subscription/{1}/query".format(url, subscription_id)
+
+    session = requests.Session()
+    start = time.perf_counter()
+    for _ in range(number):
+        session.get(query_url).json()
+    bare = (time.perf_counter() - start) / number
+
+    start = time.perf_counter()
+    for _ in range(number):
+        client.subscription.query(subscription_id)
+    sdk = (time.perf_counter() - start) / number
+
+    print("overhead: requests {0:.0f} us/call, client {1:.0f} us/call, "
+          "overhead {2:.0f} us/call".format(
+              bare * 1e6, sdk * 1e6, (sdk - bare) * 1e6))
+    client.close()
+
+
+def bench_throughput(url, number, threads):
+    """Measure the number of queries per second from `threads` threads."""
+    client = create_client(url, pool_size=threads)
+    subscription_id = create_subscription(client)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(
+            lambda _: client.subscription.query(subscription_id),
+            range(number)))
+    elapsed = time.perf_counter() - start
+
+    print("throughput: {0:>2} threads {1:>8.0f} calls/s".format(
+        threads, number / elapsed))
+    client.close()
+
+
+def bench_memory(url, number):
+    """Measure the memory allocated by each query."""
+    client = create_client(url, pool_size=1)
+    subscription_id = create_subscription(client)
+    # Warm up the connection pool and caches.
+    client.subscription.query(subscription_id)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(number):
+        client.subscription.query(subscription_id)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print("memory: peak {0:.1f} KiB during a call, {1:.0f} bytes "
+          "retained per call".format(
+              (peak - before) / 1024, (after - before) / number))
+    client.close()
+
+
+def bench_large_response(url, count):
+    """Measure the peak memory of a search returning `count` subscriptions,
+    with and without streaming the response."""
+    client = create_client(url, pool_size=1)
+    for _ in range(count):
+        create_subscription(client)
+    client.close()
+
+    for stream_threshold in (None, 0):
+        client = create_client(
+            url, pool_size=1, stream_threshold=stream_threshold)
+        client.subscription.query(1)
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        data = client.subscription.search(merchantId="sweetpay-demo")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print("memory: peak {0:.0f} KiB searching {1} subscriptions, "
+              "{2}".format(
+                  (peak - before) / 1024, len(data["payload"]),
+                  "streamed" if stream_threshold is not None else "buffered"))
+        del data
+        client.close()
+
+
+def main(number=2000):
+    with stub_server() as url:
+        bench_overhead(url, number)
+        for threads in (1, 4, 16):
+            bench_throughput(url, number, threads)
+        bench_memory(url, number // 10)
+        bench_large_response(url, number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the throughput of the JSON codecs on subscription payloads.
+
+Run with `python -m benchmarks.bench_codec`.
+"""
+import datetime
+import timeit
+from decimal import Decimal
+
+from sweetpay.codec import JSONCodec, OrjsonCodec, orjson
+from sweetpay.constants import DATE_FORMAT
+from sweetpay.models import PayloadDecoder
+from sweetpay.utils import decode_date
+
+
+def create_params():
+    """Return the parameters of a typical subscription creation."""
+    return {
+        "amount": Decimal("199.00"), "currency": "SEK", "country": "SE",
+        "merchantId": "sweetpay-demo", "interval": "MONTHLY",
+        "ssn": "19500101-0002", "startsAt": datetime.date(2017, 1, 1),
+        "maxExecutions": 12, "merchantItemId": "item-1234",
+        "attachment": "eyJvcmRlciI6IDEyMzR9"
+    }
+
+
+def subscription(subscription_id):
+    """Return a subscription as returned from the API."""
+    return {
+        "subscriptionId": subscription_id, "amount": 199.0,
+        "currency": "SEK", "interval": "MONTHLY", "state": "ACTIVE",
+        "merchantId": "sweetpay-demo", "merchantItemId": "item-1234",
+        "startsAt": "2017-01-01", "maxExecutions": 12, "executions": 3,
+        "customer": {
+            "ssn": "19500101-0002", "firstName": "Test", "lastName": "Person",
+            "address": {
+                "street": "Testgatan 1", "zip": "12345", "city": "Stockholm",
+                "country": "SE"
+            }
+        }
+    }
+
+
+def search_response(count):
+    return {
+        "status": "OK",
+        "payload": [subscription(i) for i in range(count)]
+    }
+
+
+def bench(codec, number):
+    params = create_params()
+    raw = JSONCodec().encode(search_response(200))
+
+    encode = timeit.timeit(lambda: codec.encode(params), number=number)
+    decode = timeit.timeit(lambda: codec.decode(raw), number=number // 100)
+    print("{0:>8}: encode {1:>10.0f} ops/s, decode (200 subscriptions) "
+          "{2:>8.0f} ops/s".format(
+              codec.name, number / encode, number // 100 / decode))
+
+
+def bench_decoders(number):
+    strptime = timeit.timeit(
+        lambda: datetime.datetime.strptime("2017-01-01", DATE_FORMAT).date(),
+        number=number)
+    cached = timeit.timeit(lambda: decode_date("2017-01-01"), number=number)
+    print("   dates: strptime {0:>10.0f} ops/s, decode_date {1:>10.0f} "
+          "ops/s".format(number / strptime, number / cached))
+
+    data = search_response(200)
+    decoder = PayloadDecoder()
+    decode = timeit.timeit(lambda: decoder(data), number=number // 100)
+    print(" payload: PayloadDecoder (200 subscriptions) {0:>8.0f} "
+          "ops/s".format(number // 100 / decode))
+
+
+def main(number=100000):
+    codecs = [JSONCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    for codec in codecs:
+        bench(codec, number)
+    bench_decoders(number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Measure the Python overhead of an operation, without any network.
+
+The connector answers every request with a canned response, so only the
+time spent in the SDK itself is measured. Run with
+`python -m benchmarks.bench_dispatch`.
+"""
+import timeit
+from datetime import timedelta
+
+from sweetpay import Client, Connector
+
+from .bench_codec import subscription
+
+
+class CannedResponse:
+    """A response whose body has already been read, like `requests`
+    leaves it after a non-streamed request."""
+
+    status_code = 200
+    raw = None
+    _content_consumed = True
+    elapsed = timedelta(0)
+
+    def __init__(self, content):
+        self.content = content.encode() if isinstance(content, str) \
+            else content
+        self.headers = {"Content-Length": str(len(self.content))}
+
+    def close(self):
+        pass
+
+
+class CannedConnector(Connector):
+    """A connector answering every request with the same subscription."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.response = CannedResponse(self.codec.encode(
+            {"status": "OK", "payload": subscription(1)}))
+
+    def send_request(self, method, url, reqkwargs):
+        return self.response
+
+
+def main(number=100000):
+    client = Client(
+        "bench-token", test=True, version={"subscription": 1},
+        connector=CannedConnector)
+    resource = client.subscription
+
+    build = timeit.timeit(
+        lambda: resource._build_url(str(1), "query"), number=number)
+    get = timeit.timeit(
+        lambda: resource._get_url("query", 1), number=number)
+    query = timeit.timeit(lambda: resource.query(1), number=number)
+    print("dispatch: _build_url {0:.2f} us, _get_url {1:.2f} us, "
+          "query {2:.1f} us/call".format(
+              build / number * 1e6, get / number * 1e6,
+              query / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Run the API emulator from the tests in a separate process.
+
+Running it in its own process keeps the server out of the measurements.
+"""
+import subprocess
+import sys
+from contextlib import contextmanager
+
+from sweetpay import Client
+
+from tests.stub_server import point
+
+
+@contextmanager
+def stub_server(latency=0):
+    """Start the emulator, yielding its URL."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "tests.stub_server", "--port", "0",
+         "--latency", str(latency)],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        yield process.stdout.readline().strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def create_client(url, **kwargs):
+    """Return a client sending all requests to the emulator at `url`."""
+    client = Client("bench-token", test=True, version={
+        "subscription": 1, "creditcheck": 2, "checkout_session": 1
+    }, **kwargs)
+    return point(client, url)
+
+
+def create_subscription(client):
+    """Create a subscription, returning its ID."""
+    return client.subscription.create(
+        amount=10, currency="SEK", country="SE", merchantId="sweetpay-demo",
+        interval="MONTHLY", ssn="19500101-0002",
+        maxExecutions=4)["payload"]["subscriptionId"]
@@ -14,5 +14,8 @@ setup(
     download_url="https://github.com/sweetpay/sweetpay-"
                  "python/tarball/%s" % __version__,
     packages=["sweetpay"],
-    install_requires=["restbase"]
+    install_requires=["restbase"],
+    extras_require={
+        "async": ["aiohttp"], "fast": ["orjson"], "http2": ["httpx[http2]"]
+    }
 )
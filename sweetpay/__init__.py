@@ -1,11 +1,44 @@
-from . import errors
-from .resources import SubscriptionV1, CreditcheckV2, CheckoutSessionV1, \
-    Resource
-from .connector import Connector
-from .client import Client
-from .utils import decode_date, decode_attachment, encode_attachment
+"""The Sweetpay SDK.
+
+The names below are imported on first access, so that `import sweetpay`
+(or importing a light module like `sweetpay.utils`) doesn't pay for
+importing `requests` and the resources until they're used.
+"""
+from importlib import import_module
+
+# Maps the public names to the modules defining them.
+_LAZY_NAMES = {
+    "Client": ".client",
+    "Connector": ".connector",
+    "Resource": ".resources",
+    "SubscriptionV1": ".resources",
+    "CreditcheckV2": ".resources",
+    "CheckoutSessionV1": ".resources",
+    "decode_date": ".utils",
+    "decode_attachment": ".utils",
+    "encode_attachment": ".utils",
+}
+
+_LAZY_MODULES = ("errors",)
 
 __all__ = [
     "Client", "Connector", "Resource", "errors", "decode_date",
     "decode_attachment", "encode_attachment"
 ]
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        value = import_module("." + name, __name__)
+    elif name in _LAZY_NAMES:
+        value = getattr(import_module(_LAZY_NAMES[name], __name__), name)
+    else:
+        raise AttributeError(
+            "module {0!r} has no attribute {1!r}".format(__name__, name))
+    # Only import it once.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_LAZY_MODULES))
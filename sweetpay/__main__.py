@@ -0,0 +1,117 @@
+"""The command line interface, run it with `python -m sweetpay`.
+
+Export all subscriptions of the stage environment to a CSV file:
+
+    SWEETPAY_API_TOKEN=... python -m sweetpay export subscriptions \\
+        subscriptions.csv --stage
+"""
+import argparse
+import os
+import sys
+
+from .batch import DEFAULT_CONCURRENCY
+from .client import Client
+from .errors import SweetpayError
+from .export import Exporter, FORMATS, DEFAULT_CHECKPOINT_PATH, \
+    DEFAULT_CHECKPOINT_EVERY
+from .sync import FileCheckpointStore
+
+#: The environment variable the API token is read from by default.
+TOKEN_VARIABLE = "SWEETPAY_API_TOKEN"
+
+
+def parse_param(value):
+    """Parse a `key=value` search parameter."""
+    key, sep, value = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(
+            "Expected key=value, got {0!r}".format(key))
+    return key, value
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="python -m sweetpay")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser(
+        "export", help="Export subscriptions or their logs to a file.")
+    export.add_argument(
+        "kind", choices=("subscriptions", "logs"),
+        help="What to export.")
+    export.add_argument("output", help="The file to write to.")
+    export.add_argument(
+        "subscription_ids", nargs="*",
+        help="The subscriptions whose logs to export, defaults to those "
+             "found by the search.")
+    export.add_argument(
+        "--format", choices=FORMATS,
+        help="Defaults to csv for .csv files and ndjson otherwise.")
+    export.add_argument(
+        "--param", action="append", type=parse_param, default=[],
+        metavar="KEY=VALUE", help="A search parameter, may be repeated.")
+    export.add_argument(
+        "--columns", help="The comma-separated columns of a CSV file.")
+    export.add_argument(
+        "--checkpoints", default=DEFAULT_CHECKPOINT_PATH,
+        help="The file to keep the checkpoints in.")
+    export.add_argument(
+        "--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+        help="The number of subscriptions between checkpoints.")
+    export.add_argument(
+        "--restart", action="store_true",
+        help="Start over, rather than continue from the last checkpoint.")
+    export.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="The number of logs fetched concurrently.")
+    export.add_argument(
+        "--token", default=os.environ.get(TOKEN_VARIABLE),
+        help="The API token, defaults to ${0}.".format(TOKEN_VARIABLE))
+    export.add_argument(
+        "--stage", action="store_true",
+        help="Use the stage environment.")
+    export.add_argument(
+        "--timeout", type=float, default=Client.DEFAULT_TIMEOUT,
+        help="The timeout of every request, in seconds.")
+    return parser
+
+
+def create_client(args):
+    return Client(
+        args.token, args.stage, {"subscription": 1},
+        timeout=args.timeout, pool_size=args.concurrency)
+
+
+def export(args, client):
+    """Run the export command, returning the number exported."""
+    exporter = Exporter(
+        client, FileCheckpointStore(args.checkpoints),
+        concurrency=args.concurrency,
+        checkpoint_every=args.checkpoint_every)
+    kwargs = dict(args.param)
+    kwargs.update({
+        "format": args.format, "restart": args.restart,
+        "columns": args.columns.split(",") if args.columns else None
+    })
+    if args.kind == "subscriptions":
+        return exporter.export_subscriptions(args.output, **kwargs)
+    return exporter.export_logs(
+        args.output, args.subscription_ids or None, **kwargs)
+
+
+def main(argv=None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    if not args.token:
+        parser.error("An API token is required, see --token")
+    with create_client(args) as client:
+        try:
+            count = export(args, client)
+        except SweetpayError as e:
+            print("The export failed, run it again to continue: {0}".format(
+                e), file=sys.stderr)
+            return 1
+    print("Exported {0} {1} to {2}".format(count, args.kind, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
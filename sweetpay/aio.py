@@ -0,0 +1,318 @@
+"""An asyncio version of the SDK, built on top of `aiohttp`.
+
+Install it with `pip install sweetpay[async]`.
+"""
+import asyncio
+from functools import partial
+from time import perf_counter
+
+try:
+    import aiohttp
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "The asyncio client requires aiohttp, install it with "
+        "`pip install sweetpay[async]`") from e
+from restbase.base import ResponseClass
+
+from .batch import DEFAULT_CONCURRENCY
+from .client import Client
+from .connector import Connector
+from .deadline import check_delay, get_request_timeout, \
+    timeout_error
+from .errors import SweetpayError, RequestError
+from .resources import SubscriptionV1, CreditcheckV2, CheckoutSessionV1
+from .utils import logger
+
+
+async def _call(func):
+    """Await `func()`, returning the raised `SweetpayError` instead."""
+    try:
+        return await func()
+    except SweetpayError as e:
+        return e
+
+
+async def iter_batch_async(
+        calls, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+    """Same as `sweetpay.batch.iter_batch`, but for coroutine functions.
+
+    At most `concurrency` calls are awaited at the same time, as tasks of
+    the running event loop.
+
+    :return: An asynchronous generator of `(key, result)` tuples.
+    """
+    calls = enumerate(calls)
+    running = {}
+    finished = {}
+    next_index = 0
+    try:
+        while True:
+            # Also bound the results waiting to be yielded in order.
+            while len(running) < concurrency and \
+                    len(running) + len(finished) < concurrency * 2:
+                try:
+                    index, (key, func) = next(calls)
+                except StopIteration:
+                    break
+                running[asyncio.ensure_future(_call(func))] = index, key
+
+            if not running and not finished:
+                return
+
+            if running:
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, key = running.pop(task)
+                    if ordered:
+                        finished[index] = key, task.result()
+                    else:
+                        yield key, task.result()
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        # E.g. if the caller stopped iterating early.
+        for task in running:
+            task.cancel()
+
+
+class AsyncConnector(Connector):
+    """A connector sending requests with `aiohttp`.
+
+    All requests share the same connection pool, which is limited
+    to `pool_size` connections per host.
+    """
+
+    def __init__(self, api_token, *args, **kwargs):
+        # The session must be created within the running event loop, which
+        # is why it's created on the first request.
+        self._session = None
+        super().__init__(api_token, *args, **kwargs)
+
+    def create_transport(self):
+        # The requests are sent with the aiohttp session instead.
+        return None
+
+    def get_session(self):
+        """Return the session shared by all requests."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.pool_size or 0)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector)
+        return self._session
+
+    async def make_request(
+            self, url, method, reqdata=None, headers=None, info=None,
+            timeout=None):
+        """Same as `Connector.make_request`, but awaitable.
+
+        The connection timings are not available, so the time until the
+        response has been read is reported as the `server` timing.
+        """
+        method = method.upper()
+        reqkwargs = self.prepare_request(
+            method, url, reqdata, headers, timeout)
+        start = perf_counter()
+        resp, body = await self.send_request(method, url, reqkwargs)
+        if info is None:
+            data = self.decode_data(body)
+        else:
+            info.timings["server"] = perf_counter() - start
+            info.status_code = resp.status
+            info.bytes_sent = len(reqkwargs["data"] or "")
+            info.bytes_received = len(body)
+            start = perf_counter()
+            data = self.decode_data(body)
+            info.timings["decode"] = perf_counter() - start
+            if isinstance(data, dict):
+                info.status = data.get("status")
+        respcls = ResponseClass(resp, resp.status, data)
+        return self.post_process_request(respcls)
+
+    async def send_request(self, method, url, reqkwargs):
+        """Send a request to the server.
+
+        :param method: The HTTP method to use.
+        :param url: The URL to send the request to.
+        :param reqkwargs: The keyword arguments to pass to the
+            request function.
+        :return: A tuple of the response, and its body as bytes.
+        """
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(self.namespace)
+            if delay:
+                try:
+                    check_delay(delay)
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    # Also when cancelled, as the request isn't sent.
+                    self.rate_limiter.refund(self.namespace)
+                    raise
+                reqkwargs["timeout"] = get_request_timeout(
+                    reqkwargs["timeout"])
+        session = self.get_session()
+        timeout = reqkwargs["timeout"]
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=connect, sock_read=read)
+        else:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+        try:
+            # An empty body is represented by an empty dict, which
+            # aiohttp would send as a form.
+            async with session.request(
+                    method, url, data=reqkwargs["data"] or None,
+                    headers=reqkwargs.get("headers"),
+                    timeout=timeout) as resp:
+                # Read the body before the connection is released.
+                body = await resp.read()
+        except asyncio.TimeoutError as e:
+            raise timeout_error("The request timed out", exc=e)
+        except aiohttp.ClientError as e:
+            raise RequestError(
+                "Could not send a request to the server, inspect "
+                "the `exc` attribute to see the underlying "
+                "`aiohttp` exception", code=None, status=None,
+                response=None, exc=e)
+        logger.info(
+            "Sent request to url=%s and method=%s, "
+            "received status_code=%d", url, method, resp.status)
+        return resp, body
+
+    async def close(self):
+        """Close the connection pool."""
+        if self._session is not None:
+            await self._session.close()
+
+
+class AsyncResource:
+    """Mixin that makes all operations of a resource awaitable."""
+
+    async def _api_call(
+            self, url, method, data=None, opname=None, resource_id=None,
+            idempotency_key=None):
+        cache_key, result = self._lookup(
+            opname, resource_id, data, idempotency_key)
+        if result is not None:
+            return self._wrap(opname, result)
+        headers, retryable = self._get_idempotency_headers(idempotency_key)
+
+        call = partial(self._send, url, method, data, headers, opname)
+        if self.circuit_breaker is not None:
+            call = partial(
+                self.circuit_breaker.call_async, self.namespace, call)
+        if self.retry is not None:
+            call = partial(self.retry.call_async, call, opname, retryable)
+        if self._coalesces(opname):
+            call = partial(
+                self.single_flight.call_async,
+                cache_key or self._get_request_key(opname, resource_id, data),
+                call)
+        try:
+            result = await call()
+        finally:
+            self._invalidate(opname, resource_id)
+
+        self._remember(opname, resource_id, cache_key, idempotency_key, result)
+        return self._wrap(opname, result)
+
+    async def _iter_api_call(self, url, method, data=None, chunk_size=None):
+        """Same as `Resource._iter_api_call`, but an asynchronous generator.
+
+        The response is not streamed: it's read and decoded in full, like
+        that of any other operation, before the items are yielded.
+        """
+        data = await self._api_call(url, method, data, opname="search")
+        for item in data["payload"]:
+            yield item
+
+    async def _send(self, url, method, data=None, headers=None, opname=None):
+        info = self._before_request(opname, method, url)
+        try:
+            respcls = await self.client.make_request(
+                url, method, data, headers=headers, info=info,
+                timeout=self._get_timeout(opname))
+            result = self._check_for_errors(
+                code=respcls.code, data=respcls.data,
+                response=respcls.response)
+        except SweetpayError as e:
+            self._after_request(info, e)
+            raise
+        self._after_request(info)
+        return result
+
+
+class AsyncSubscriptionV1(AsyncResource, SubscriptionV1):
+    """The awaitable subscription resource."""
+
+    def query_many(
+            self, subscription_ids, concurrency=DEFAULT_CONCURRENCY,
+            ordered=False):
+        """Same as `SubscriptionV1.query_many`, but returns an
+        asynchronous generator.
+        """
+        return iter_batch_async(
+            ((subscription_id, partial(self.query, subscription_id))
+             for subscription_id in subscription_ids),
+            concurrency=concurrency, ordered=ordered)
+
+    def update_many(
+            self, updates, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+        """Same as `SubscriptionV1.update_many`, but returns an
+        asynchronous generator.
+        """
+        return iter_batch_async(
+            ((subscription_id, partial(self.update, subscription_id, **params))
+             for subscription_id, params in updates),
+            concurrency=concurrency, ordered=ordered)
+
+
+class AsyncCreditcheckV2(AsyncResource, CreditcheckV2):
+    """The awaitable creditcheck resource."""
+
+
+class AsyncCheckoutSessionV1(AsyncResource, CheckoutSessionV1):
+    """The awaitable checkout session resource."""
+
+
+class AsyncClient(Client):
+    """The asyncio developer-interface for the API.
+
+    Every operation returns a coroutine, e.g.
+    `await client.subscription.query(subscription_id)`.
+    """
+
+    RESOURCE_MAPPER = {
+        (SubscriptionV1.namespace, 1): AsyncSubscriptionV1,
+        (CreditcheckV2.namespace, 2): AsyncCreditcheckV2,
+        (CheckoutSessionV1.namespace, 1): AsyncCheckoutSessionV1
+    }
+
+    DEFAULT_CONNECTOR = AsyncConnector
+
+    def batch(self, calls, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+        """Same as `Client.batch`, but for coroutine functions, e.g.
+        `functools.partial(client.subscription.query, 1)`.
+
+        :return: An asynchronous generator of `(index, result)` tuples.
+        """
+        return iter_batch_async(
+            enumerate(calls), concurrency=concurrency, ordered=ordered)
+
+    async def close(self):
+        """Close the connection pools held by the resources."""
+        for namespace in self.version:
+            await getattr(self, namespace).client.close()
+
+    def __enter__(self):
+        raise TypeError("Use `async with` with the AsyncClient")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,67 @@
+"""Helpers for running many operations concurrently."""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+
+from .errors import SweetpayError
+
+#: The default number of worker threads used for a batch.
+DEFAULT_CONCURRENCY = 8
+
+
+def _call(func):
+    """Call `func`, returning the raised `SweetpayError` instead of raising."""
+    try:
+        return func()
+    except SweetpayError as e:
+        return e
+
+
+def iter_batch(calls, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+    """Run calls over a bounded pool of worker threads.
+
+    Calls are read lazily from `calls`, so that only a bounded number of
+    them are in flight at the same time, and results are yielded as soon
+    as they are available.
+
+    :param calls: An iterable of `(key, func)` tuples, where `func` is
+        called without arguments.
+    :param concurrency: The number of worker threads.
+    :param ordered: Whether to yield the results in the same order as
+        `calls`. Defaults to yielding the results as they finish.
+    :return: A generator of `(key, result)` tuples. If a call raised a
+        `SweetpayError`, the exception instance is the result. Any other
+        exception is raised.
+    """
+    calls = enumerate(calls)
+    # Bound the number of results we hold on to, in case the results
+    # must wait for a slow call to be yielded in order.
+    limit = concurrency * 2
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        running = {}
+        finished = {}
+        next_index = 0
+        while True:
+            # Keep the workers busy.
+            while len(running) + len(finished) < limit:
+                try:
+                    index, (key, func) = next(calls)
+                except StopIteration:
+                    break
+                # Run in a copy of our context, to keep e.g. the deadline.
+                running[executor.submit(
+                    copy_context().run, _call, func)] = index, key
+
+            if not running and not finished:
+                return
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, key = running.pop(future)
+                if ordered:
+                    finished[index] = key, future.result()
+                else:
+                    yield key, future.result()
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
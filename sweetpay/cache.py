@@ -0,0 +1,106 @@
+"""Caching of responses from read-only operations."""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+#: The default number of seconds to cache the result of each operation.
+DEFAULT_TTLS = {"query": 30, "list_log": 30, "search": 60}
+
+
+class ResponseCache:
+    """A thread-safe cache with a time-to-live per operation.
+
+    When the cache is full, the least recently used entry is evicted.
+    Every entry is tagged (e.g. with the subscription ID), so that all
+    entries of a tag can be invalidated when the resource changes.
+    """
+
+    def __init__(self, maxsize=1024, ttls=None):
+        """
+        :param maxsize: The maximum number of cached responses.
+        :param ttls: Optional. A dictionary mapping operation names to the
+            number of seconds to cache their results. Operations which
+            aren't in the dictionary are not cached. Defaults
+            to `DEFAULT_TTLS`.
+        """
+        self.maxsize = maxsize
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Maps a key to a (expires_at, tag, value) tuple.
+        self._entries = OrderedDict()
+        # Maps a tag to the set of keys tagged with it.
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def get_ttl(self, opname):
+        """Return the TTL for `opname`, or None if it isn't cached."""
+        return self.ttls.get(opname)
+
+    def _remove(self, key):
+        _, tag, _ = self._entries.pop(key)
+        keys = self._tags[tag]
+        keys.discard(key)
+        if not keys:
+            del self._tags[tag]
+
+    def get(self, key):
+        """Return the cached value for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        # Copy the value, so that it can't be modified by the caller.
+        return copy.deepcopy(entry[2])
+
+    def set(self, key, value, ttl, tag=None):
+        """Cache `value` for `ttl` seconds.
+
+        :param key: The key to cache the value under.
+        :param value: The value to cache.
+        :param ttl: The number of seconds to cache the value.
+        :param tag: Optional. The tag to invalidate the value by.
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, tag, value)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Remove all values tagged with any of `tags`."""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """Remove all values."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        """Return the hit, miss and eviction counters and the size."""
+        return {
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "size": len(self._entries)
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "<{0}: size={1}>".format(type(self).__name__, len(self))
@@ -0,0 +1,224 @@
+"""A circuit breaker, failing fast while an API is down."""
+import threading
+import time
+from collections import deque
+
+from .errors import CircuitOpenError, RequestError, InternalServerError, \
+    ProxyError, UnderMaintenanceError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit:
+    """The state of a single circuit."""
+
+    def __init__(self, window):
+        self.state = CLOSED
+        self.results = deque(maxlen=window)
+        self.opened_at = None
+        self.probes = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """Stop sending requests to a resource which keeps failing.
+
+    Every resource namespace (e.g. "subscription") has its own circuit.
+    A circuit opens when the failure rate of the last `window` calls
+    exceeds `failure_rate`. While open, calls fail immediately with a
+    `CircuitOpenError`. After `reset_timeout` seconds the circuit is
+    half-open, letting `probes` calls through: if they succeed the
+    circuit is closed, otherwise it's opened again.
+    """
+
+    def __init__(
+            self, failure_rate=0.5, window=20, min_calls=10,
+            reset_timeout=30.0, probes=1, exceptions=(
+                RequestError, InternalServerError, ProxyError,
+                UnderMaintenanceError),
+            on_state_change=None):
+        """
+        :param failure_rate: The failure rate, between 0 and 1, at which
+            the circuit opens.
+        :param window: The number of recent calls to compute the
+            failure rate from.
+        :param min_calls: The minimum number of calls in the window
+            before the circuit may open.
+        :param reset_timeout: The number of seconds before an open
+            circuit lets probe calls through.
+        :param probes: The number of concurrent probe calls allowed
+            while half-open.
+        :param exceptions: The exceptions counted as failures. Other
+            exceptions mean that the API is up, and count as successes.
+        :param on_state_change: Optional. Called with the namespace, the
+            old state and the new state whenever a circuit changes state.
+        """
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.exceptions = exceptions
+        self.on_state_change = on_state_change
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _get_circuit(self, namespace):
+        circuit = self._circuits.get(namespace)
+        if circuit is None:
+            circuit = self._circuits[namespace] = _Circuit(self.window)
+        return circuit
+
+    def _set_state(self, namespace, circuit, state):
+        """Change the state of a circuit, with the lock held.
+
+        :return: The change to pass on to `_notify` once the lock has
+            been released.
+        """
+        old, circuit.state = circuit.state, state
+        if state == OPEN:
+            circuit.opened_at = time.monotonic()
+        elif state == CLOSED:
+            circuit.results.clear()
+        circuit.probes = 0
+        return namespace, old, state
+
+    def _notify(self, change):
+        """Call `on_state_change`, without the lock held, so that it may
+        call e.g. `stats`.
+        """
+        if change is not None and self.on_state_change is not None:
+            self.on_state_change(*change)
+
+    def before_call(self, namespace):
+        """Check that a call may be made.
+
+        :raise CircuitOpenError: If the circuit is open.
+        """
+        change = None
+        try:
+            with self._lock:
+                circuit = self._get_circuit(namespace)
+                if circuit.state == OPEN:
+                    waited = time.monotonic() - circuit.opened_at
+                    if waited < self.reset_timeout:
+                        circuit.rejected += 1
+                        raise CircuitOpenError(
+                            "The circuit for namespace={0} is open, retry "
+                            "in {1:.1f} seconds".format(
+                                namespace, self.reset_timeout - waited))
+                    change = self._set_state(namespace, circuit, HALF_OPEN)
+                if circuit.state == HALF_OPEN:
+                    if circuit.probes >= self.probes:
+                        circuit.rejected += 1
+                        raise CircuitOpenError(
+                            "The circuit for namespace={0} is half-open and "
+                            "waiting for probe calls".format(namespace))
+                    circuit.probes += 1
+        finally:
+            self._notify(change)
+
+    def record(self, namespace, failed):
+        """Record the outcome of a call.
+
+        :param namespace: The namespace of the called resource.
+        :param failed: Whether the call failed.
+        """
+        change = None
+        with self._lock:
+            circuit = self._get_circuit(namespace)
+            if circuit.state == HALF_OPEN:
+                change = self._set_state(
+                    namespace, circuit, OPEN if failed else CLOSED)
+            else:
+                circuit.results.append(failed)
+                calls = len(circuit.results)
+                if circuit.state == CLOSED and calls >= self.min_calls and \
+                        sum(circuit.results) / calls >= self.failure_rate:
+                    change = self._set_state(namespace, circuit, OPEN)
+        self._notify(change)
+
+    def release(self, namespace):
+        """Give back the probe slot of a call without an outcome.
+
+        :param namespace: The namespace of the called resource.
+        """
+        with self._lock:
+            circuit = self._get_circuit(namespace)
+            if circuit.state == HALF_OPEN and circuit.probes > 0:
+                circuit.probes -= 1
+
+    def call(self, namespace, func):
+        """Call `func` through the circuit of `namespace`.
+
+        :raise CircuitOpenError: If the circuit is open.
+        :return: The return value of `func`.
+        """
+        self.before_call(namespace)
+        try:
+            result = func()
+        except self.exceptions:
+            self.record(namespace, True)
+            raise
+        except Exception:
+            self.record(namespace, False)
+            raise
+        except BaseException:
+            # E.g. cancelled, which says nothing about the API.
+            self.release(namespace)
+            raise
+        self.record(namespace, False)
+        return result
+
+    async def call_async(self, namespace, func):
+        """Same as `call`, but for a coroutine function."""
+        self.before_call(namespace)
+        try:
+            result = await func()
+        except self.exceptions:
+            self.record(namespace, True)
+            raise
+        except Exception:
+            self.record(namespace, False)
+            raise
+        except BaseException:
+            # E.g. cancelled, which says nothing about the API.
+            self.release(namespace)
+            raise
+        self.record(namespace, False)
+        return result
+
+    def state(self, namespace):
+        """Return the state of the circuit for `namespace`."""
+        with self._lock:
+            circuit = self._get_circuit(namespace)
+            if circuit.state == OPEN and time.monotonic() - \
+                    circuit.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return circuit.state
+
+    def stats(self):
+        """Return the state of all circuits, e.g. for metrics.
+
+        :return: A dictionary mapping each namespace to a dictionary with
+            its `state`, the number of `calls` and `failures` in the
+            window and the number of `rejected` calls.
+        """
+        with self._lock:
+            namespaces = list(self._circuits)
+        stats = {}
+        for namespace in namespaces:
+            circuit = self._circuits[namespace]
+            stats[namespace] = {
+                "state": self.state(namespace),
+                "calls": len(circuit.results),
+                "failures": sum(circuit.results),
+                "rejected": circuit.rejected
+            }
+        return stats
+
+    def __repr__(self):
+        return "<{0}: failure_rate={1}>".format(
+            type(self).__name__, self.failure_rate)
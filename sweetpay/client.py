@@ -1,6 +1,8 @@
 from restbase import BaseClient
 
-from sweetpay import CheckoutSessionV1, CreditcheckV2, SubscriptionV1, Connector
+from .batch import DEFAULT_CONCURRENCY, iter_batch
+from .connector import Connector
+from .resources import CheckoutSessionV1, CreditcheckV2, SubscriptionV1
 
 
 class Client(BaseClient):
@@ -17,17 +19,132 @@ class Client(BaseClient):
     DEFAULT_CONNECTOR = Connector
     DEFAULT_TIMEOUT = 15
 
-    def __init__(self, api_token, *args, **kwargs):
+    def __init__(
+            self, api_token, *args, pool_size=None, codec=None, retry=None,
+            idempotency_keys=False, journal=None, circuit_breaker=None,
+            cache=None, hooks=None, models=False, stream_threshold=None,
+            rate_limiter=None, single_flight=None, timeouts=None,
+            transport=None, response_hook=None, **kwargs):
         """Configure the API with default values.
 
         :param api_token: The API token provided by SweetPay.
-        :param args: Passed to restbase.BaseClient.
+        :param args: Passed to restbase.BaseClient. The `timeout` may be
+            a `(connect, read)` tuple of seconds.
+        :param pool_size: Optional. When set, keep-alive connections are
+            reused between requests (and threads), keeping at most
+            `pool_size` connections per host. By default, a new
+            connection is opened for every request.
+        :param codec: Optional. The codec used to encode and decode JSON,
+            see `sweetpay.codec`. Defaults to the fastest one available.
+        :param retry: Optional. A `sweetpay.retry.RetryPolicy` used to
+            retry failed operations. By default, nothing is retried.
+        :param idempotency_keys: Optional. Whether to send a generated
+            idempotency key with every create operation, which also makes
+            them retried by `retry`. Only enable this if the API you're
+            talking to honors idempotency keys.
+        :param journal: Optional. A `sweetpay.idempotency.MemoryJournal`
+            (or compatible) used to return the result of a create
+            operation which already succeeded with the same key, without
+            sending another request.
+        :param circuit_breaker: Optional. A
+            `sweetpay.circuit.CircuitBreaker`, failing fast while
+            a resource keeps failing.
+        :param cache: Optional. A `sweetpay.cache.ResponseCache` caching
+            the results of read-only operations.
+        :param hooks: Optional. A list of `sweetpay.instrumentation.Hook`
+            instances, called before and after every request.
+        :param models: Optional. Whether to wrap the payloads in the
+            typed models of `sweetpay.models`, e.g. `Subscription`.
+        :param stream_threshold: Optional. Response bodies larger than
+            this many bytes (or of unknown size) are decoded while they're
+            read, rather than after having been read in full. Saves memory
+            on large searches and logs. By default, nothing is streamed.
+        :param rate_limiter: Optional. A `sweetpay.ratelimit.RateLimiter`,
+            delaying requests to stay under the rate limits of the API.
+        :param single_flight: Optional. A
+            `sweetpay.singleflight.SingleFlight`, letting identical
+            concurrent read operations share one request.
+        :param timeouts: Optional. A dictionary of timeouts by namespace
+            (e.g. `"creditcheck"`) or operation (e.g. `"subscription.query"`),
+            overriding `timeout` for them. Like `timeout`, each one is
+            either a number of seconds or a `(connect, read)` tuple.
+        :param transport: Optional. The `sweetpay.transport.Transport`
+            sending the requests, e.g. an `HTTP2Transport`. Defaults to
+            sending them with `requests`, see `pool_size`.
+        :param response_hook: Optional. Called with the decoded JSON of
+            every response (and of every item of `iter_search`), returning
+            the data to return instead. E.g. a
+            `sweetpay.models.PayloadDecoder`, decoding dates and amounts.
         :param kwargs: Passed to restbase.BaseClient.
         """
         self.api_token = api_token
+        self.pool_size = pool_size
+        self.codec = codec
+        self.retry = retry
+        self.idempotency_keys = idempotency_keys
+        self.journal = journal
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        self.hooks = hooks
+        self.models = models
+        self.stream_threshold = stream_threshold
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.timeouts = timeouts
+        self.transport = transport
+        self.response_hook = response_hook
         super().__init__(*args, **kwargs)
 
     def _get_resource_arguments(self):
         kwargs = super()._get_resource_arguments()
-        kwargs.update({"api_token": self.api_token})
+        kwargs.update({
+            "api_token": self.api_token, "retry": self.retry,
+            "idempotency_keys": self.idempotency_keys, "journal": self.journal,
+            "circuit_breaker": self.circuit_breaker, "cache": self.cache,
+            "models": self.models, "single_flight": self.single_flight,
+            "timeouts": self.timeouts, "response_hook": self.response_hook
+        })
+        if self.pool_size is not None:
+            kwargs["pool_size"] = self.pool_size
+        if self.codec is not None:
+            kwargs["codec"] = self.codec
+        if self.hooks is not None:
+            kwargs["hooks"] = self.hooks
+        if self.stream_threshold is not None:
+            kwargs["stream_threshold"] = self.stream_threshold
+        if self.rate_limiter is not None:
+            kwargs["rate_limiter"] = self.rate_limiter
+        if self.transport is not None:
+            kwargs["transport"] = self.transport
         return kwargs
+
+    def batch(self, calls, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+        """Run many operations concurrently.
+
+        A failing operation doesn't abort the batch, instead the raised
+        `SweetpayError` is returned as its result.
+
+        :param calls: An iterable of callables taking no arguments, e.g.
+            `functools.partial(client.subscription.query, 1)`.
+        :param concurrency: The number of concurrent requests.
+        :param ordered: Whether to yield the results in the same
+            order as `calls`.
+        :return: A generator of `(index, result)` tuples, where `index` is
+            the position of the call in `calls`.
+        """
+        return iter_batch(
+            enumerate(calls), concurrency=concurrency, ordered=ordered)
+
+    def close(self):
+        """Close all pooled connections held by the resources.
+
+        A `transport` passed in is left open, as it may be shared.
+        """
+        for namespace in self.version:
+            getattr(self, namespace).client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,119 @@
+"""JSON codecs used by the connector to encode and decode data."""
+import datetime
+import json
+import math
+from decimal import Decimal
+
+from .constants import DATE_FORMAT
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def encode_value(obj):
+    """Return a JSON serializable version of a custom type.
+
+    :param obj: The value to convert.
+    :raise TypeError: If the type isn't supported.
+    """
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    elif isinstance(obj, datetime.date):
+        return obj.strftime(DATE_FORMAT)
+    elif isinstance(obj, Decimal):
+        # String, as we want it money safe.
+        return str(obj)
+    raise TypeError(
+        "Object of type {0} is not JSON serializable".format(
+            type(obj).__name__))
+
+
+class SweetpayJSONEncoder(json.JSONEncoder):
+    """A custom JSON encoder to support custom types."""
+    def default(self, obj):
+        try:
+            return encode_value(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+class JSONCodec:
+    """Encode and decode JSON with the standard library."""
+
+    name = "json"
+
+    def __init__(self, encoder=None):
+        """
+        :param encoder: Optional. The `json.JSONEncoder` instance to use,
+            defaults to a `SweetpayJSONEncoder`.
+        """
+        self.encoder = encoder or SweetpayJSONEncoder()
+
+    def encode(self, obj):
+        return self.encoder.encode(obj)
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def __repr__(self):
+        return "<{0}>".format(type(self).__name__)
+
+
+class OrjsonCodec(JSONCodec):
+    """Encode and decode JSON with `orjson`.
+
+    Anything `orjson` can't handle on its own is passed on to the
+    standard library, so the result is always the same as with
+    `JSONCodec`: integers larger than 64 bits, and NaN and infinity,
+    which `orjson` would encode as null.
+    """
+
+    name = "orjson"
+
+    OPTIONS = 0
+    if orjson is not None:
+        # Let dates go through `encode_value`, to keep them in
+        # the exact same format as with the standard library.
+        OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        super().__init__()
+
+    def encode(self, obj):
+        try:
+            encoded = orjson.dumps(
+                obj, default=encode_value, option=self.OPTIONS)
+        except TypeError:
+            return super().encode(obj)
+        # Only look for non-finite floats when they may have been nulled.
+        if b"null" in encoded and _has_non_finite(obj):
+            return super().encode(obj)
+        return encoded
+
+    def decode(self, data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().decode(data)
+
+
+def _has_non_finite(obj):
+    """Return whether `obj` contains a NaN or infinite float."""
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
+def get_default_codec():
+    """Return the fastest available codec."""
+    if orjson is not None:
+        return OrjsonCodec()
+    return JSONCodec()
@@ -1,40 +1,54 @@
 """All base classes are defined in this file."""
-import json
-import datetime
-from decimal import Decimal
-import requests
+import time
+from types import MappingProxyType
+from time import perf_counter
+
 from restbase import BaseConnector
+from restbase.base import ResponseClass
 
 from .utils import logger
-from .errors import TimeoutError, RequestError
-from .constants import DATE_FORMAT
-
-
-class SweetpayJSONEncoder(json.JSONEncoder):
-    """A custom JSON encoder to support custom types."""
-    def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        elif isinstance(obj, datetime.date):
-            return obj.strftime(DATE_FORMAT)
-        elif isinstance(obj, Decimal):
-            # String, as we want it money safe.
-            return str(obj)
-        return super().default(obj)
+from .constants import MAX_RAW_BODY_SIZE
+from .deadline import check_delay, get_request_timeout
+from .codec import SweetpayJSONEncoder, JSONCodec, get_default_codec
+from .instrumentation import start_timing, stop_timing
+from .transport import RequestsTransport
+from .streaming import DEFAULT_CHUNK_SIZE, ChunkRecorder, load
 
 
 class Connector(BaseConnector):
     """The base class used to create API clients."""
 
-    def __init__(self, api_token, *args, **kwargs):
+    def __init__(
+            self, api_token, *args, pool_size=None, codec=None, hooks=None,
+            stream_threshold=None, namespace=None, rate_limiter=None,
+            transport=None, **kwargs):
         """Initialize the checkout client used to talk to the checkout API.
 
         :param api_token: Same as `SweetpayClient`.
         :param args: The arguments to pass to BaseConnector.
+        :param pool_size: Optional. Same as `Client`.
+        :param codec: Optional. Same as `Client`.
+        :param hooks: Optional. Same as `Client`.
+        :param stream_threshold: Optional. Same as `Client`.
+        :param namespace: Optional. The namespace of the resource the
+            connector sends requests for.
+        :param rate_limiter: Optional. Same as `Client`.
+        :param transport: Optional. Same as `Client`.
         :param kwargs: The keyword arguments to pass to BaseConnector.
         """
         self.api_token = api_token
+        self.pool_size = pool_size
+        self.stream_threshold = stream_threshold
+        self.namespace = namespace
+        self.rate_limiter = rate_limiter
+        self.codec = codec or self.get_codec()
+        self.hooks = list(hooks or ())
+        # A transport passed in may be shared, so it's not ours to close.
+        self._owns_transport = transport is None
+        self.transport = transport or self.create_transport()
         super().__init__(*args, **kwargs)
+        # The headers are shared by all requests, so they must not change.
+        self.headers = MappingProxyType(self.headers)
 
     def create_headers(self):
         """Return headers to use in each request."""
@@ -51,30 +65,171 @@ class Connector(BaseConnector):
         :param reqkwargs: The keyword arguments to pass to the
             request function.
         """
-
-        # We need to create the session on every request to
-        # keep the library thread-safe.
-        session = self.create_session()
-        try:
-            # Send the actual request
-            resp = session.request(method=method, url=url, **reqkwargs)
-        except requests.Timeout as e:
-            # If the request timed out.
-            raise TimeoutError(
-                "The request timed out", code=None, status=None,
-                response=None, exc=e)
-        except requests.RequestException as e:
-            # If another request error occurred.
-            raise RequestError(
-                "Could not send a request to the server, inspect "
-                "the `exc` attribute to see the underlying "
-                "`requests` exception", code=None, status=None,
-                response=None, exc=e)
+        if self.rate_limiter is not None:
+            delay = self.rate_limiter.reserve(self.namespace)
+            if delay:
+                try:
+                    check_delay(delay)
+                    time.sleep(delay)
+                except BaseException:
+                    # The request isn't sent, so don't delay the others.
+                    self.rate_limiter.refund(self.namespace)
+                    raise
+                # Less time is left of the deadline after waiting.
+                reqkwargs["timeout"] = get_request_timeout(
+                    reqkwargs["timeout"])
+        resp = self.transport.send(method, url, self.headers, reqkwargs)
         logger.info(
             "Sent request to url=%s and method=%s, "
             "received status_code=%d", url, method, resp.status_code)
         return resp
 
+    def prepare_request(
+            self, method, url, reqdata=None, headers=None, timeout=None):
+        """Return the keyword arguments for a request.
+
+        :param method: The HTTP method, in upper-case.
+        :param url: The URL to send the request to.
+        :param reqdata: The parameters passed by the client.
+        :param headers: Optional. Extra headers to send with the request.
+        :param timeout: Optional. The timeout of this request, defaults
+            to the timeout of the connector.
+        :return: The keyword arguments to pass to `send_request`.
+        """
+        reqkwargs = {"timeout": self.timeout if timeout is None else timeout}
+        if self.stream_threshold is not None:
+            # Only read the headers, `read_data` decides how to read the body.
+            reqkwargs["stream"] = True
+        if headers:
+            reqkwargs["headers"] = headers
+        reqdata = self.pre_process_request_data(method, reqdata)
+        reqkwargs["data"] = self.encode_data(method, reqdata)
+        return self.pre_process_request(method, url, reqkwargs)
+
+    def make_request(
+            self, url, method, reqdata=None, headers=None, info=None,
+            timeout=None):
+        """Make a request to a passed URL.
+
+        Same as `restbase.BaseConnector.make_request`, but extra headers
+        can be sent with the request.
+
+        :param url: The URL to send the request to.
+        :param method: The method to use. Should be GET or POST.
+        :param reqdata: The parameters passed by the client.
+        :param headers: Optional. Extra headers to send with the request.
+        :param info: Optional. A `sweetpay.instrumentation.RequestInfo`
+            to fill in with the sizes and timings of the request.
+        :param timeout: Optional. Same as `prepare_request`.
+        :return: Return a `ResponseClass` instance.
+        """
+        method = method.upper()
+        reqkwargs = self.prepare_request(
+            method, url, reqdata, headers, timeout)
+        if info is None:
+            resp = self.send_request(method, url, reqkwargs)
+            data, _ = self.read_data(resp)
+        else:
+            resp, data = self._make_instrumented_request(
+                method, url, reqkwargs, info)
+        respcls = ResponseClass(resp, resp.status_code, data)
+        return self.post_process_request(respcls)
+
+    def _make_instrumented_request(self, method, url, reqkwargs, info):
+        """Send and decode a request, filling in `info` on the way."""
+        info.bytes_sent = len(reqkwargs["data"] or "")
+        timings = start_timing()
+        try:
+            resp = self.send_request(method, url, reqkwargs)
+        finally:
+            stop_timing()
+            info.timings.update(timings)
+        info.status_code = resp.status_code
+        # The elapsed time includes setting up the connection.
+        info.timings["server"] = max(
+            0.0, resp.elapsed.total_seconds() - timings["connect"] -
+            timings["tls"])
+
+        start = perf_counter()
+        data, info.bytes_received = self.read_data(resp)
+        info.timings["decode"] = perf_counter() - start
+        if isinstance(data, dict):
+            info.status = data.get("status")
+        return resp, data
+
+    def read_data(self, resp):
+        """Read and decode the body of a response.
+
+        Bodies larger than `stream_threshold` bytes, or of unknown size,
+        are decoded while they're read from the connection. Others are
+        decoded at once, straight from the raw bytes.
+
+        :param resp: The `requests.Response` to read.
+        :raise TimeoutError: If reading the body timed out.
+        :raise RequestError: If the body couldn't be read.
+        :return: A tuple of the decoded data, and the size of the body.
+        """
+        if not self.should_stream(resp):
+            with self.transport.reading():
+                body = resp.content
+            return self.decode_data(body), len(body)
+
+        chunks = ChunkRecorder(
+            resp.iter_content(DEFAULT_CHUNK_SIZE), MAX_RAW_BODY_SIZE)
+        try:
+            with self.transport.reading():
+                try:
+                    data = load(chunks)
+                except ValueError:
+                    # Only the head of the body has been kept.
+                    for _ in chunks:
+                        pass
+                    data = None
+        finally:
+            resp.close()
+        if data is None:
+            data = self.decode_data(bytes(chunks.head), chunks.size)
+        return data, chunks.size
+
+    def should_stream(self, resp):
+        """Return whether to decode the body of `resp` while reading it."""
+        if self.stream_threshold is None or resp.raw is None or \
+                resp._content_consumed:
+            return False
+        length = resp.headers.get("Content-Length")
+        return length is None or int(length) > self.stream_threshold
+
+    def stream_request(
+            self, url, method, reqdata=None, headers=None, timeout=None):
+        """Send a request without reading the response body.
+
+        Same as `make_request`, but the `requests` response is returned
+        as-is, with its body left to be streamed. The response must
+        be closed by the caller.
+
+        :param url: The URL to send the request to.
+        :param method: The method to use. Should be GET or POST.
+        :param reqdata: The parameters passed by the client.
+        :param headers: Optional. Extra headers to send with the request.
+        :param timeout: Optional. Same as `prepare_request`.
+        :return: A `requests.Response` instance.
+        """
+        method = method.upper()
+        reqkwargs = self.prepare_request(
+            method, url, reqdata, headers, timeout)
+        reqkwargs["stream"] = True
+        return self.send_request(method, url, reqkwargs)
+
+    def create_transport(self):
+        """Return the transport to use when none was passed in."""
+        return RequestsTransport(
+            pool_size=self.pool_size, timing=bool(self.hooks))
+
+    def close(self):
+        """Close all pooled connections, if any."""
+        if self._owns_transport and self.transport is not None:
+            self.transport.close()
+
     def encode_data(self, method, params):
         """Encode the request data.
 
@@ -86,7 +241,7 @@ class Connector(BaseConnector):
         elif method == "POST":
             if params:
                 # Encode the data to JSON
-                data = self.get_json_encoder().encode(params)
+                data = self.codec.encode(params)
             else:
                 # Use an empty body
                 data = {}
@@ -96,19 +251,37 @@ class Connector(BaseConnector):
                 "Only GET and POST requests are allowed, not "
                 "method=%s".format(method))
 
-    def decode_data(self, rawdata):
+    def decode_data(self, rawdata, size=None):
         """Decode the response returned from the server.
 
         This would be the place to decode JSON.
 
-        :param rawdata: The raw data to decode.
-        :return: The response data.
+        :param rawdata: The raw data to decode, as bytes or a string.
+        :param size: Optional. The size of the whole body, if `rawdata`
+            is only the head of it.
+        :return: The response data. If it couldn't be decoded, the first
+            `MAX_RAW_BODY_SIZE` bytes of it as a string.
         """
         try:
-            return json.loads(rawdata)
+            return self.codec.decode(rawdata)
         except (TypeError, ValueError):
-            logger.error("Could not deserialize JSON data=%s", rawdata)
-            return rawdata
+            if isinstance(rawdata, str):
+                rawdata = rawdata.encode()
+            head = rawdata[:MAX_RAW_BODY_SIZE].decode("utf-8", "replace")
+            logger.error(
+                "Could not deserialize JSON data=%s (%d bytes)", head,
+                len(rawdata) if size is None else size)
+            return head
+
+    def get_codec(self):
+        """Return the codec used to encode and decode JSON data.
+
+        Defaults to the fastest available codec, unless `get_json_encoder`
+        has been overwritten, in which case that encoder is used.
+        """
+        if type(self).get_json_encoder is not Connector.get_json_encoder:
+            return JSONCodec(self.get_json_encoder())
+        return get_default_codec()
 
     def get_json_encoder(self):
         """Return an instance of the encoder to use for encoding request data.
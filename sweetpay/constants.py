@@ -5,6 +5,10 @@ All constants for the package.
 DATE_FORMAT = "%Y-%m-%d"
 OK_STATUS = "OK"
 LOGGER_NAME = "sweetpay-sdk"
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+SIGNATURE_HEADER = "X-Sweetpay-Signature"
+# The number of bytes of an undecodable response body to keep and log
+MAX_RAW_BODY_SIZE = 1024
 
 # Define some test data for SE
 TEST_CREDIT_SSN = "19500101-0002"
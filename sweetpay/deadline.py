@@ -0,0 +1,81 @@
+"""Deadlines, limiting the total time spent on operations.
+
+A deadline applies to all operations within its block, including their
+retries, and is propagated to the threads of batches:
+
+    with deadline(2.5):
+        client.subscription.query(subscription_id)
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .errors import TimeoutError
+
+# The `time.monotonic` time of the current deadline, if any.
+_deadline = ContextVar("sweetpay_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    """Limit the total time of the operations within the block.
+
+    A nested deadline can't extend the one it's nested in.
+
+    :param seconds: The number of seconds the operations may take.
+    """
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        at = min(at, outer)
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_remaining():
+    """Return the number of seconds left of the current deadline, or None
+    if there is no deadline."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def timeout_error(msg, exc=None):
+    """Return a `TimeoutError`, with a `remaining` attribute set to the
+    number of seconds left of the deadline (or None)."""
+    error = TimeoutError(
+        msg, code=None, status=None, response=None, exc=exc)
+    error.remaining = get_remaining()
+    return error
+
+
+def check_delay(delay):
+    """Check that waiting `delay` seconds leaves time before the deadline.
+
+    :raise TimeoutError: If the deadline would pass while waiting.
+    """
+    remaining = get_remaining()
+    if remaining is not None and delay >= remaining:
+        raise timeout_error(
+            "Waiting {0:.2f} seconds would exceed the deadline".format(delay))
+
+
+def get_request_timeout(timeout):
+    """Return the timeout for a request, cut to fit the deadline.
+
+    :param timeout: The configured timeout, either a number of seconds or
+        a `(connect, read)` tuple.
+    :raise TimeoutError: If the deadline has already passed.
+    """
+    remaining = get_remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise timeout_error("The deadline was exceeded")
+    if isinstance(timeout, tuple):
+        return tuple(
+            remaining if part is None else min(part, remaining)
+            for part in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
@@ -62,3 +62,21 @@ class RequestError(SweetpayError):
 
 class TimeoutError(RequestError):
     """Raised when a timeout occurs"""
+
+
+class CircuitOpenError(SweetpayError):
+    """Raised without sending a request, when the circuit breaker of the
+    resource is open because the API keeps failing.
+    """
+
+
+class WebhookError(SweetpayError):
+    """Raised when a received notification can't be handled, e.g. because
+    it isn't valid JSON.
+    """
+
+
+class InvalidSignatureError(WebhookError):
+    """Raised when the signature of a received notification doesn't match
+    its body.
+    """
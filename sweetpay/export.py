@@ -0,0 +1,249 @@
+"""Bulk export of subscriptions and their logs to NDJSON or CSV files.
+
+Results are written as they're read, so memory use stays bounded no
+matter how many subscriptions are exported. The progress is saved to a
+checkpoint every `checkpoint_every` subscriptions, and an interrupted
+export continues from the last checkpoint when run again:
+
+    exporter = Exporter(client)
+    exporter.export_subscriptions("subscriptions.csv", format="csv")
+    exporter.export_logs("logs.ndjson")
+
+The same is available from the command line, see `python -m sweetpay
+export --help`.
+"""
+import csv
+import os
+from itertools import islice
+
+from .batch import DEFAULT_CONCURRENCY, iter_batch
+from .codec import get_default_codec
+from .errors import SweetpayError
+from .models import Model
+from .sync import FileCheckpointStore
+
+#: The file the checkpoints are saved to by default.
+DEFAULT_CHECKPOINT_PATH = "sweetpay-export.json"
+
+#: The number of subscriptions exported between checkpoints by default.
+DEFAULT_CHECKPOINT_EVERY = 1000
+
+#: The output formats.
+FORMATS = ("ndjson", "csv")
+
+
+def flatten(data, prefix=""):
+    """Flatten nested dictionaries into one, for a row of a CSV file.
+
+    The keys are joined with dots, e.g. `customer.address.country`, and
+    lists are kept as they are.
+    """
+    flat = {}
+    for key, value in data.items():
+        key = prefix + key
+        if isinstance(value, Model):
+            value = value.to_dict()
+        if isinstance(value, dict):
+            flat.update(flatten(value, key + "."))
+        else:
+            flat[key] = value
+    return flat
+
+
+def get_format(path):
+    """Return the format of an output file, by its extension."""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+class NDJSONWriter:
+    """Write every record as a line of JSON."""
+
+    def __init__(self, fileobj, codec=None):
+        """
+        :param fileobj: The text file to write to.
+        :param codec: Optional. Same as `Client`.
+        """
+        self.fileobj = fileobj
+        self.codec = codec or get_default_codec()
+
+    def write(self, record):
+        if isinstance(record, Model):
+            record = record.to_dict()
+        line = self.codec.encode(record)
+        if isinstance(line, bytes):
+            line = line.decode()
+        self.fileobj.write(line + "\n")
+
+
+class CSVWriter:
+    """Write every record as a row, with the nested fields flattened.
+
+    The columns are those of the first record unless given, and fields
+    missing from them are left out.
+    """
+
+    def __init__(self, fileobj, columns=None, header=True):
+        """
+        :param fileobj: The text file to write to, opened with
+            `newline=""`.
+        :param columns: Optional. The columns to write, see `flatten`.
+        :param header: Whether to write the header before the first row.
+        """
+        self.fileobj = fileobj
+        self.columns = columns
+        self.header = header
+        self._writer = None
+
+    def write(self, record):
+        row = flatten(record)
+        if self._writer is None:
+            self._writer = csv.DictWriter(
+                self.fileobj, self.columns or list(row),
+                extrasaction="ignore")
+            if self.header:
+                self._writer.writeheader()
+        self._writer.writerow(row)
+
+
+class Exporter:
+    """Export subscriptions and their logs, resumably."""
+
+    def __init__(
+            self, client, store=None, concurrency=DEFAULT_CONCURRENCY,
+            checkpoint_every=DEFAULT_CHECKPOINT_EVERY):
+        """
+        :param client: The `Client` to export with.
+        :param store: Optional. Where to keep the checkpoints, defaults
+            to a `sweetpay.sync.FileCheckpointStore` in the working
+            directory. The checkpoint of an export is kept by the path of
+            its output file.
+        :param concurrency: The number of logs fetched concurrently.
+        :param checkpoint_every: The number of subscriptions exported
+            between checkpoints.
+        """
+        self.client = client
+        self.store = store if store is not None else FileCheckpointStore(
+            DEFAULT_CHECKPOINT_PATH)
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+
+    def export_subscriptions(
+            self, path, format=None, columns=None, restart=False,
+            **params):
+        """Export the subscriptions found by a search.
+
+        :param path: The file to write to.
+        :param format: Optional. One of `FORMATS`, defaults to CSV if the
+            path ends with `.csv` and NDJSON otherwise.
+        :param columns: Optional. The columns of a CSV file, see
+            `CSVWriter`.
+        :param restart: Whether to start over, rather than continue from
+            the last checkpoint.
+        :param params: The search parameters, same as
+            `SubscriptionV1.search`.
+        :raise SweetpayError: If the search failed.
+        :return: The total number of subscriptions exported.
+        """
+        def read(skip):
+            # The subscriptions already exported are read again, but
+            # not written.
+            items = self.client.subscription.iter_search(**params)
+            return islice(([item] for item in items), skip, None)
+        return self._export(
+            "subscriptions", path, format, columns, restart, read)
+
+    def export_logs(
+            self, path, subscription_ids=None, format=None, columns=None,
+            restart=False, **params):
+        """Export the log entries of many subscriptions.
+
+        Every entry is written with the `subscriptionId` it belongs to,
+        and the entries are written in the order of `subscription_ids`.
+
+        :param path: Same as `export_subscriptions`.
+        :param subscription_ids: Optional. An iterable of the IDs of the
+            subscriptions, defaults to those found by a search.
+        :param format: Same as `export_subscriptions`.
+        :param columns: Same as `export_subscriptions`.
+        :param restart: Same as `export_subscriptions`.
+        :param params: The search parameters, if no `subscription_ids`
+            are given.
+        :raise SweetpayError: If a log couldn't be listed.
+        :return: The total number of subscriptions whose logs were
+            exported.
+        """
+        resource = self.client.subscription
+        if subscription_ids is None:
+            subscription_ids = (
+                item["subscriptionId"]
+                for item in resource.iter_search(**params))
+
+        def read(skip):
+            calls = (
+                (subscription_id,
+                 lambda subscription_id=subscription_id:
+                    resource.list_log(subscription_id))
+                for subscription_id in islice(subscription_ids, skip, None))
+            results = iter_batch(
+                calls, concurrency=self.concurrency, ordered=True)
+            for subscription_id, data in results:
+                if isinstance(data, SweetpayError):
+                    raise data
+                yield [self._log_record(subscription_id, entry)
+                       for entry in data["payload"]]
+        return self._export("logs", path, format, columns, restart, read)
+
+    @staticmethod
+    def _log_record(subscription_id, entry):
+        if isinstance(entry, Model):
+            entry = entry.to_dict()
+        record = {"subscriptionId": subscription_id}
+        record.update(entry)
+        return record
+
+    def _export(self, kind, path, format, columns, restart, read):
+        """Write the records from `read` to `path`, resumably.
+
+        :param read: A function taking the number of subscriptions
+            already exported, returning an iterable of the lists of
+            records of the following ones.
+        """
+        format = format or get_format(path)
+        if format not in FORMATS:
+            raise ValueError("Unknown format: {0}".format(format))
+        key = "{0}:{1}".format(kind, os.path.abspath(path))
+        checkpoint = None if restart else self.store.get(key)
+        done, offset = checkpoint or (0, 0)
+        if offset and os.path.exists(path):
+            fileobj = open(path, "r+", newline="")
+            if format == "csv":
+                columns = next(csv.reader([fileobj.readline()]))
+            # Drop what was written after the checkpoint.
+            fileobj.seek(offset)
+            fileobj.truncate()
+        else:
+            done, offset = 0, 0
+            fileobj = open(path, "w", newline="")
+
+        with fileobj:
+            if format == "csv":
+                writer = CSVWriter(fileobj, columns, header=not offset)
+            else:
+                writer = NDJSONWriter(fileobj, self.client.codec)
+            for records in read(done):
+                for record in records:
+                    writer.write(record)
+                done += 1
+                if done % self.checkpoint_every == 0:
+                    self._checkpoint(key, done, fileobj)
+            self._checkpoint(key, done, fileobj)
+        return done
+
+    def _checkpoint(self, key, done, fileobj):
+        """Save the number of subscriptions exported, and where to write
+        the next one.
+        """
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+        self.store.set(key, (done, fileobj.tell()))
+        self.store.flush()
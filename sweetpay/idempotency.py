@@ -0,0 +1,53 @@
+"""Idempotency keys, making it safe to retry create operations."""
+import copy
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+
+def generate_key():
+    """Return a new, random idempotency key."""
+    return uuid4().hex
+
+
+class MemoryJournal:
+    """Remember the results of successful operations by idempotency key.
+
+    When an operation is repeated with a key that already succeeded,
+    the remembered result is returned instead of sending a request.
+    Only the `maxsize` most recent keys are remembered.
+
+    Only received results are recorded: a create that succeeded on the
+    server but failed with a `ProxyError` isn't, so the journal can't
+    tell whether repeating it would create a duplicate.
+
+    To share the journal between processes, implement the same
+    `get` and `record` methods on top of a shared store.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the result recorded for `key`, or None."""
+        with self._lock:
+            result = self._results.get(key)
+        # Copy the result, so that it can't be modified by the caller.
+        return copy.deepcopy(result)
+
+    def record(self, key, result):
+        """Record the `result` of the operation with the given `key`."""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return "<{0}: size={1}>".format(type(self).__name__, len(self))
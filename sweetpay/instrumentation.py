@@ -0,0 +1,219 @@
+"""Hooks for instrumenting requests, and a latency histogram collector."""
+import math
+import threading
+from time import perf_counter
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# The timings of the request currently sent by this thread, if any.
+_local = threading.local()
+
+
+class RequestInfo:
+    """Information about a single request, passed to the hooks.
+
+    The `timings` dictionary holds the number of seconds spent on
+    `connect` (TCP), `tls`, `server` (from sending the request until the
+    response headers arrived), `decode` and `total`. `connect` and `tls`
+    are zero when a pooled connection was reused.
+    """
+
+    __slots__ = (
+        "namespace", "opname", "method", "url", "status_code", "status",
+        "bytes_sent", "bytes_received", "timings", "started")
+
+    def __init__(self, namespace, opname, method, url):
+        self.namespace = namespace
+        self.opname = opname
+        self.method = method
+        self.url = url
+        self.status_code = None
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = {
+            "connect": 0.0, "tls": 0.0, "server": 0.0, "decode": 0.0,
+            "total": 0.0
+        }
+        self.started = perf_counter()
+
+    def __repr__(self):
+        return "<{0}: {1}.{2} status_code={3}>".format(
+            type(self).__name__, self.namespace, self.opname,
+            self.status_code)
+
+
+class Hook:
+    """The base class of request hooks.
+
+    Hooks are called synchronously by the thread sending the request,
+    so they should be quick. All methods are no-ops by default.
+    """
+
+    def before_request(self, info):
+        """Called before a request is sent.
+
+        :param info: A `RequestInfo` instance.
+        """
+
+    def after_request(self, info):
+        """Called after a successful request.
+
+        :param info: A `RequestInfo` instance.
+        """
+
+    def on_error(self, info, exc):
+        """Called when a request raised a `SweetpayError`.
+
+        :param info: A `RequestInfo` instance.
+        :param exc: The raised exception.
+        """
+
+
+class Histogram:
+    """A histogram with logarithmic buckets.
+
+    Percentiles are accurate to within `growth` (10% by default), while
+    the memory used is bounded by the range of recorded values.
+    """
+
+    def __init__(self, growth=1.1, minimum=1e-5):
+        self.growth = growth
+        self.minimum = minimum
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """Record a value."""
+        if value > self.minimum:
+            index = math.ceil(math.log(value / self.minimum, self.growth))
+        else:
+            index = 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Return the value below which `percent` % of the values fall."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.minimum * self.growth ** index)
+        return self.max
+
+
+class HistogramCollector(Hook):
+    """Collect latency histograms per operation, e.g. `subscription.query`.
+
+    Failed requests are recorded as well.
+    """
+
+    def __init__(self, timing="total", **histogram_kwargs):
+        """
+        :param timing: The timing from `RequestInfo.timings` to record.
+        :param histogram_kwargs: Passed to `Histogram`.
+        """
+        self.timing = timing
+        self.histogram_kwargs = histogram_kwargs
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def _record(self, info):
+        key = "{0}.{1}".format(info.namespace, info.opname)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(
+                    **self.histogram_kwargs)
+            histogram.add(info.timings[self.timing])
+
+    def after_request(self, info):
+        self._record(info)
+
+    def on_error(self, info, exc):
+        self._record(info)
+
+    def snapshot(self, percentiles=(50, 90, 99)):
+        """Return the count, mean, max and percentiles per operation."""
+        with self._lock:
+            snapshot = {}
+            for key, histogram in self.histograms.items():
+                stats = {
+                    "count": histogram.count, "max": histogram.max,
+                    "mean": histogram.sum / histogram.count
+                }
+                for percent in percentiles:
+                    stats["p{0}".format(percent)] = histogram.percentile(
+                        percent)
+                snapshot[key] = stats
+            return snapshot
+
+
+def start_timing():
+    """Start collecting connection timings for this thread's request."""
+    _local.timings = timings = {"connect": 0.0, "tls": 0.0}
+    return timings
+
+
+def stop_timing():
+    """Stop collecting connection timings for this thread."""
+    _local.timings = None
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """Record the time spent on connecting."""
+
+    def _new_conn(self):
+        start = perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            timings = getattr(_local, "timings", None)
+            if timings is not None:
+                timings["connect"] += perf_counter() - start
+
+
+class _TimedHTTPSConnection(HTTPSConnection, _TimedHTTPConnection):
+    """Record the time spent on connecting and the TLS handshake."""
+
+    def connect(self):
+        start = perf_counter()
+        timings = getattr(_local, "timings", None)
+        connected = timings["connect"] if timings is not None else 0.0
+        try:
+            super().connect()
+        finally:
+            if timings is not None:
+                # Whatever isn't spent on the TCP connection is the
+                # TLS handshake.
+                spent = perf_counter() - start
+                timings["tls"] += max(
+                    0.0, spent - (timings["connect"] - connected))
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """An adapter recording connection timings for `RequestInfo`."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
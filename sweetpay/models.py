@@ -0,0 +1,233 @@
+"""Typed, lazily decoded response models.
+
+A model wraps the decoded JSON of a resource. Fields are decoded (e.g.
+into dates or Decimals) on first access only, and the model can still
+be used as a read-only dictionary of the raw JSON data.
+
+Alternatively, a `PayloadDecoder` decodes the same fields of a whole
+response at once, keeping the plain dictionaries.
+"""
+from collections.abc import Mapping
+from decimal import Decimal
+
+from .utils import decode_date, decode_dates, decode_attachment, \
+    decode_attachments
+
+
+def decode_decimal(value):
+    """Decode a JSON number into a `Decimal`, money safe."""
+    # Go through str, as the float itself isn't exact.
+    return Decimal(str(value))
+
+
+def decode_decimals(values):
+    """Decode a list of JSON numbers, see `decode_decimal`."""
+    return [Decimal(str(value)) for value in values]
+
+
+class Field:
+    """A lazily decoded field of a `Model`."""
+
+    def __init__(self, key, decoder=None):
+        """
+        :param key: The key of the field in the JSON data.
+        :param decoder: Optional. Called with the raw value on first
+            access, unless the value is None.
+        """
+        self.key = key
+        self.decoder = decoder
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        decoded = instance._decoded
+        if decoded is None:
+            decoded = instance._decoded = {}
+        elif self.name in decoded:
+            return decoded[self.name]
+        value = instance._data.get(self.key)
+        if value is not None and self.decoder is not None:
+            value = self.decoder(value)
+        decoded[self.name] = value
+        return value
+
+
+class Model(Mapping):
+    """The base class of all response models."""
+
+    __slots__ = ("_data", "_decoded")
+
+    def __init__(self, data):
+        """
+        :param data: The dictionary of JSON data to wrap.
+        """
+        self._data = data
+        # Created on first access, as many fields are never used.
+        self._decoded = None
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def to_dict(self):
+        """Return the raw JSON data."""
+        return self._data
+
+    def __repr__(self):
+        return "<{0}: {1!r}>".format(type(self).__name__, self._data)
+
+
+class Address(Model):
+    __slots__ = ()
+
+    street = Field("street")
+    zip = Field("zip")
+    city = Field("city")
+    country = Field("country")
+
+
+class Customer(Model):
+    __slots__ = ()
+
+    ssn = Field("ssn")
+    first_name = Field("firstName")
+    last_name = Field("lastName")
+    address = Field("address", Address)
+
+
+class Subscription(Model):
+    """A subscription, from the subscription API."""
+
+    __slots__ = ()
+
+    subscription_id = Field("subscriptionId")
+    merchant_id = Field("merchantId")
+    merchant_item_id = Field("merchantItemId")
+    state = Field("state")
+    amount = Field("amount", decode_decimal)
+    currency = Field("currency")
+    interval = Field("interval")
+    starts_at = Field("startsAt", decode_date)
+    max_executions = Field("maxExecutions")
+    customer = Field("customer", Customer)
+    attachment = Field("attachment", decode_attachment)
+
+
+class SubscriptionLogEntry(Model):
+    """An entry in the log of a subscription."""
+
+    __slots__ = ()
+
+    log_id = Field("logId")
+    subscription_id = Field("subscriptionId")
+    event = Field("event")
+    amount = Field("amount", decode_decimal)
+    created_at = Field("createdAt")
+
+
+class CreditCheck(Model):
+    """A credit check, from the creditcheck API."""
+
+    __slots__ = ()
+
+    creditcheck_id = Field("creditcheckId")
+    ssn = Field("ssn")
+    approved = Field("approved")
+
+
+class CheckoutSession(Model):
+    """A checkout session, from the checkout session API."""
+
+    __slots__ = ()
+
+    session_id = Field("sessionId")
+    url = Field("url")
+
+
+def wrap_payload(data, model):
+    """Wrap the payload of a response in `model`, in place.
+
+    :param data: The response data, a dictionary with a payload.
+    :param model: The `Model` class to wrap the payload with.
+    :return: The response data.
+    """
+    payload = data.get("payload")
+    if isinstance(payload, list):
+        data["payload"] = [
+            model(item) if isinstance(item, dict) else item
+            for item in payload]
+    elif isinstance(payload, dict):
+        data["payload"] = model(payload)
+    return data
+
+
+#: The fields decoded by a `PayloadDecoder` by default, mapped to the
+#: functions decoding a list of their values.
+FIELD_DECODERS = {
+    "amount": decode_decimals,
+    "startsAt": decode_dates,
+    "attachment": decode_attachments
+}
+
+
+class PayloadDecoder:
+    """Decode the fields of a response in one pass, e.g. into dates.
+
+    Pass an instance as the `response_hook` of a `Client`. Rather than
+    one at a time, the values of a field are decoded together for all
+    items of a list, e.g. all `startsAt` of a search. Not meant to be
+    combined with `models`, which decode the same fields lazily.
+    """
+
+    def __init__(self, decoders=None):
+        """
+        :param decoders: Optional. A dictionary mapping the keys of the
+            fields to decode to functions decoding a list of values.
+            Defaults to `FIELD_DECODERS`.
+        """
+        self.decoders = FIELD_DECODERS if decoders is None else decoders
+
+    def __call__(self, data):
+        """Return a copy of `data` with the fields decoded.
+
+        :param data: The decoded JSON of a response.
+        """
+        if isinstance(data, dict):
+            return self._decode_list([data])[0]
+        if isinstance(data, list):
+            return self._decode_list(data)
+        return data
+
+    def _decode_list(self, items):
+        decoders = self.decoders
+        decoded = []
+        # The copies and raw values of the fields to decode, by key.
+        fields = {}
+        for item in items:
+            if not isinstance(item, dict):
+                decoded.append(self(item))
+                continue
+            copy = {}
+            for key, value in item.items():
+                if value is None:
+                    pass
+                elif key in decoders:
+                    fields.setdefault(key, []).append((copy, value))
+                elif isinstance(value, (dict, list)):
+                    value = self(value)
+                copy[key] = value
+            decoded.append(copy)
+        for key, values in fields.items():
+            for (copy, _), value in zip(
+                    values, decoders[key]([value for _, value in values])):
+                copy[key] = value
+        return decoded
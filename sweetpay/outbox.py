@@ -0,0 +1,386 @@
+"""A durable write-behind queue (outbox) for mutating operations.
+
+Operations submitted to an `Outbox` are saved to a local SQLite journal
+and sent by a pool of background workers, so the caller doesn't have to
+wait for the API, nor fail when it's temporarily unavailable:
+
+    outbox = Outbox(client, "outbox.sqlite3")
+    future = outbox.submit("subscription", "update", 12, maxExecutions=4)
+
+Operations on the same subscription are sent in the order they were
+submitted. Failed operations are retried up to `max_attempts` times, even
+after a restart, while operations rejected by the API (e.g. with a
+`BadDataError`) fail their future. Creates which may have succeeded
+(e.g. on a `ProxyError` or a timeout) are only retried if the client
+sends idempotency keys, see `Client`. Failed operations are moved to the
+`failed_operations` table of the journal.
+"""
+import heapq
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .codec import SweetpayJSONEncoder
+from .constants import SUBSCRIPTION, CHECKOUT_SESSION
+from .errors import ProxyError, UnderMaintenanceError, RequestError, \
+    InternalServerError, CircuitOpenError
+from .idempotency import generate_key
+from .utils import logger
+
+#: The operations which may be submitted, by namespace.
+OPERATIONS = {
+    SUBSCRIPTION: frozenset(["create", "update", "regret"]),
+    CHECKOUT_SESSION: frozenset(["create"])
+}
+
+#: The exceptions after which an operation may still have succeeded.
+AMBIGUOUS_EXCEPTIONS = (ProxyError, InternalServerError, RequestError)
+
+#: The file the journal is kept in by default.
+DEFAULT_OUTBOX_PATH = "sweetpay-outbox.sqlite3"
+
+#: The number of attempts made at an operation by default.
+DEFAULT_MAX_ATTEMPTS = 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    opname TEXT NOT NULL,
+    resource_id TEXT,
+    params TEXT NOT NULL,
+    idempotency_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS operations_lane
+    ON operations (resource_id, id);
+CREATE TABLE IF NOT EXISTS failed_operations (
+    id INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    opname TEXT NOT NULL,
+    resource_id TEXT,
+    params TEXT NOT NULL,
+    idempotency_key TEXT,
+    attempts INTEGER NOT NULL,
+    error TEXT NOT NULL
+);
+"""
+
+_COLUMNS = (
+    "id, namespace, opname, resource_id, params, idempotency_key, "
+    "attempts, next_attempt")
+
+# The first operation of every lane, i.e. of every resource, and every
+# create. Only subscriptions have operations on a resource, so the lanes
+# are keyed by the resource ID. Only read when the outbox is opened.
+_SELECT_HEADS = """
+SELECT {columns} FROM operations WHERE id IN (
+    SELECT MIN(id) FROM operations WHERE resource_id IS NOT NULL
+    GROUP BY resource_id
+)
+UNION ALL
+SELECT {columns} FROM operations WHERE resource_id IS NULL
+""".format(columns=_COLUMNS)
+
+# The operation following another in its lane.
+_SELECT_NEXT = (
+    "SELECT {columns} FROM operations WHERE resource_id = ? AND id > ? "
+    "ORDER BY id LIMIT 1").format(columns=_COLUMNS)
+
+
+class _Operation:
+    """A pending operation, as saved in the journal."""
+
+    __slots__ = (
+        "id", "namespace", "opname", "resource_id", "params",
+        "idempotency_key", "attempts", "next_attempt")
+
+    def __init__(self, *row):
+        (self.id, self.namespace, self.opname, self.resource_id,
+         self.params, self.idempotency_key, self.attempts,
+         self.next_attempt) = row
+
+    @property
+    def lane(self):
+        """The operations of the same lane are sent in order."""
+        if self.resource_id is None:
+            return None, self.id
+        return self.namespace, self.resource_id
+
+
+class Outbox:
+    """Send mutating operations in the background, durably."""
+
+    def __init__(
+            self, client, path=DEFAULT_OUTBOX_PATH, workers=4, backoff=0.5,
+            max_backoff=60.0, max_attempts=DEFAULT_MAX_ATTEMPTS,
+            exceptions=(
+                ProxyError, UnderMaintenanceError, RequestError,
+                InternalServerError, CircuitOpenError),
+            on_complete=None):
+        """
+        :param client: The `Client` to send the operations with.
+        :param path: The SQLite database to keep the journal in.
+        :param workers: The number of operations sent concurrently.
+        :param backoff: The delay in seconds before the first retry of
+            an operation. The delay is doubled for every retry.
+        :param max_backoff: The maximum delay in seconds between retries.
+        :param max_attempts: The number of attempts made at an operation,
+            including the first one, before it fails with the exception
+            of the last attempt. None retries until it succeeds.
+        :param exceptions: The exceptions to retry on. Any other
+            exception fails the operation, as do `AMBIGUOUS_EXCEPTIONS`
+            on creates, unless the client sends idempotency keys.
+        :param on_complete: Optional. Called with the ID of the operation
+            and its result or exception, when an operation is completed.
+            Also called for operations submitted before a restart, which
+            have no futures.
+        """
+        self.client = client
+        self.path = path
+        self.workers = workers
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.exceptions = exceptions
+        self.on_complete = on_complete
+        self._encoder = SweetpayJSONEncoder()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Committed writes survive a crash of the process, while
+        # not waiting for the disk on every write.
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._futures = {}
+        # Maps the lanes of the operations being sent to their IDs.
+        self._running = {}
+        # The first operation of every lane, and a heap of those waiting
+        # to be sent, by their next attempt. The journal is only read
+        # again when a lane moves on to its next operation.
+        self._heads = {}
+        self._waiting = []
+        for row in self._db.execute(_SELECT_HEADS):
+            self._add_head(_Operation(*row))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="sweetpay-outbox", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, namespace, opname, resource_id=None, **params):
+        """Save an operation to the journal, to be sent in the background.
+
+        :param namespace: The namespace of the resource, e.g.
+            `"subscription"`.
+        :param opname: The name of the operation, e.g. `"update"`.
+        :param resource_id: The ID of the resource, e.g. the subscription
+            ID of an update. Must not be given for create operations.
+        :param params: The parameters of the operation.
+        :raise ValueError: If the operation can't be submitted.
+        :return: A `concurrent.futures.Future`, completed with the result
+            of the operation or the exception it failed with.
+        """
+        if opname not in OPERATIONS.get(namespace, ()):
+            raise ValueError(
+                "The operation {0}.{1} can't be submitted".format(
+                    namespace, opname))
+        if (opname == "create") != (resource_id is None):
+            raise ValueError(
+                "A resource_id must be given for all but create operations")
+        if self._closed:
+            raise RuntimeError("The outbox is closed")
+        # Creates are sent with the same key every attempt, so that
+        # they're only done once by an API honoring the keys.
+        key = None
+        if opname == "create" and getattr(
+                self.client, "idempotency_keys", False):
+            key = generate_key()
+        future = Future()
+        row = [
+            namespace, opname,
+            None if resource_id is None else str(resource_id),
+            self._encoder.encode(params), key]
+        # The future is registered before the dispatcher can see the
+        # operation, which could otherwise be completed without it.
+        with self._lock:
+            with self._db_lock:
+                cursor = self._db.execute(
+                    "INSERT INTO operations (namespace, opname, resource_id, "
+                    "params, idempotency_key) VALUES (?, ?, ?, ?, ?)", row)
+                self._db.commit()
+            self._futures[cursor.lastrowid] = future
+            operation = _Operation(cursor.lastrowid, *row, 0, 0)
+            # Otherwise it's read when the lane gets to it.
+            if operation.lane not in self._heads:
+                self._add_head(operation)
+        self._wakeup.set()
+        return future
+
+    def pending(self):
+        """Return the number of operations not yet completed."""
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM operations").fetchone()[0]
+
+    def failed(self):
+        """Return the number of operations which have failed.
+
+        They're kept in the `failed_operations` table of the journal,
+        with the error they failed with.
+        """
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM failed_operations").fetchone()[0]
+
+    def join(self, timeout=None):
+        """Wait until all operations have been completed.
+
+        :return: Whether all operations were completed in time.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if end is not None and time.monotonic() >= end:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Stop sending operations, after those being sent.
+
+        The operations left are sent when an outbox is opened with the
+        same journal again.
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _dispatch(self):
+        """Start sending the operations which are due, in order per lane."""
+        while not self._closed:
+            self._wakeup.clear()
+            wait = 1.0
+            with self._lock:
+                now = time.time()
+                while self._waiting and len(self._running) < self.workers:
+                    next_attempt, _, operation = self._waiting[0]
+                    if next_attempt > now:
+                        break
+                    heapq.heappop(self._waiting)
+                    self._running[operation.lane] = operation.id
+                    self._executor.submit(self._send, operation)
+                if self._waiting and len(self._running) < self.workers:
+                    wait = min(wait, self._waiting[0][0] - now)
+            self._wakeup.wait(wait)
+
+    def _add_head(self, operation):
+        """Make `operation` the first of its lane, waiting to be sent."""
+        self._heads[operation.lane] = operation
+        heapq.heappush(
+            self._waiting, (operation.next_attempt, operation.id, operation))
+
+    def _next_head(self, operation):
+        """Move the lane of a completed `operation` on to its next one."""
+        del self._heads[operation.lane]
+        if operation.resource_id is None:
+            return
+        with self._db_lock:
+            row = self._db.execute(
+                _SELECT_NEXT, (operation.resource_id, operation.id)
+            ).fetchone()
+        if row is not None:
+            self._add_head(_Operation(*row))
+
+    def _send(self, operation):
+        """Send an operation, and complete or reschedule it."""
+        resource = getattr(self.client, operation.namespace)
+        params = json.loads(operation.params)
+        args = () if operation.resource_id is None else (
+            operation.resource_id,)
+        if operation.idempotency_key is not None:
+            params["idempotency_key"] = operation.idempotency_key
+        try:
+            result = getattr(resource, operation.opname)(*args, **params)
+        except Exception as e:
+            operation.attempts += 1
+            if self._may_retry(operation, e):
+                self._reschedule(operation, e)
+                return
+            logger.warning(
+                "The operation with id=%s failed after %d attempts: %s",
+                operation.id, operation.attempts, e)
+            self._complete(operation, exc=e)
+        else:
+            self._complete(operation, result=result)
+        finally:
+            self._wakeup.set()
+
+    def _may_retry(self, operation, exc):
+        """Return whether an operation may be sent again after `exc`.
+
+        A create without an idempotency key which may have succeeded is
+        not retried, as it could be done twice.
+        """
+        if not isinstance(exc, self.exceptions):
+            return False
+        if self.max_attempts is not None and \
+                operation.attempts >= self.max_attempts:
+            return False
+        return operation.opname != "create" or \
+            operation.idempotency_key is not None or \
+            not isinstance(exc, AMBIGUOUS_EXCEPTIONS)
+
+    def _reschedule(self, operation, exc):
+        delay = min(
+            self.max_backoff, self.backoff * 2 ** (operation.attempts - 1))
+        logger.info(
+            "Retrying the operation with id=%s in %.1f seconds: %s",
+            operation.id, delay, exc)
+        operation.next_attempt = time.time() + delay
+        with self._lock:
+            with self._db_lock:
+                self._db.execute(
+                    "UPDATE operations SET attempts = ?, next_attempt = ? "
+                    "WHERE id = ?", (
+                        operation.attempts, operation.next_attempt,
+                        operation.id))
+                self._db.commit()
+            del self._running[operation.lane]
+            heapq.heappush(self._waiting, (
+                operation.next_attempt, operation.id, operation))
+
+    def _complete(self, operation, result=None, exc=None):
+        with self._lock:
+            with self._db_lock:
+                if exc is not None:
+                    self._db.execute(
+                        "INSERT INTO failed_operations SELECT id, namespace, "
+                        "opname, resource_id, params, idempotency_key, ?, ? "
+                        "FROM operations WHERE id = ?",
+                        (operation.attempts, repr(exc), operation.id))
+                self._db.execute(
+                    "DELETE FROM operations WHERE id = ?", (operation.id,))
+                self._db.commit()
+            del self._running[operation.lane]
+            self._next_head(operation)
+            future = self._futures.pop(operation.id, None)
+        if future is not None:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+        if self.on_complete is not None:
+            self.on_complete(operation.id, result if exc is None else exc)
@@ -0,0 +1,199 @@
+"""Client-side rate limiting, keeping the requests under the API limits.
+
+Requests are limited per namespace by token buckets. A `TokenBucket` is
+shared by all threads of a process, while a `FileTokenBucket` is shared
+by all processes on the same host.
+"""
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+_STATE = struct.Struct("dd")
+
+
+class TokenBucket:
+    """A thread-safe token bucket.
+
+    Tokens are added at `rate` per second, up to `burst` tokens. A request
+    which can't get a token right away reserves the next one, and waits
+    until it's due. The requests are thus spread evenly instead of being
+    let through in bursts.
+    """
+
+    #: The clock used to refill the bucket.
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: The number of requests per second.
+        :param burst: Optional. The number of requests which may be sent
+            at once, after the bucket has been idle. Defaults to `rate`,
+            but at least 1.
+        """
+        self.rate = rate
+        self.burst = max(1, rate) if burst is None else burst
+        self.tokens = self.burst
+        self.updated = self.clock()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens, now):
+        """Take `tokens`, returning the number of seconds until they're due.
+        """
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= tokens
+        return max(0.0, -self.tokens / self.rate)
+
+    def _give(self, tokens, now):
+        """Put back `tokens` taken by `_take`."""
+        self.tokens = min(
+            self.burst, self.tokens + (now - self.updated) * self.rate +
+            tokens)
+        self.updated = now
+
+    def reserve(self, tokens=1):
+        """Reserve `tokens`, without waiting.
+
+        :return: The number of seconds to wait before sending the request.
+        """
+        with self._lock:
+            return self._take(tokens, self.clock())
+
+    def refund(self, tokens=1):
+        """Put back `tokens` reserved for a request which wasn't sent, so
+        that they don't delay the other requests."""
+        with self._lock:
+            self._give(tokens, self.clock())
+
+    def acquire(self, tokens=1):
+        """Wait until `tokens` are available, and take them.
+
+        :return: The number of seconds waited.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def __repr__(self):
+        return "<{0}: rate={1}, burst={2}>".format(
+            type(self).__name__, self.rate, self.burst)
+
+
+class FileTokenBucket(TokenBucket):
+    """A token bucket shared by all processes using the same file.
+
+    The state of the bucket is kept in the file, which is locked while it's
+    updated. Only available where `fcntl` is, i.e. not on Windows.
+    """
+
+    # The wall clock is the same in all processes.
+    clock = staticmethod(time.time)
+
+    def __init__(self, path, rate, burst=None):
+        """
+        :param path: The file to keep the state in, created if missing.
+        :param rate: Same as `TokenBucket`.
+        :param burst: Same as `TokenBucket`.
+        """
+        if fcntl is None:  # pragma: no cover
+            raise RuntimeError(
+                "A FileTokenBucket requires fcntl, which isn't available")
+        super().__init__(rate, burst)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def reserve(self, tokens=1):
+        return self._update(self._take, tokens)
+
+    def refund(self, tokens=1):
+        self._update(self._give, tokens)
+
+    def _update(self, func, tokens):
+        """Call `func` with `tokens` on the state kept in the file."""
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                state = os.pread(self._fd, _STATE.size, 0)
+                now = self.clock()
+                if len(state) == _STATE.size:
+                    self.tokens, self.updated = _STATE.unpack(state)
+                else:
+                    self.tokens, self.updated = self.burst, now
+                result = func(tokens, now)
+                os.pwrite(
+                    self._fd, _STATE.pack(self.tokens, self.updated), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return result
+
+    def close(self):
+        os.close(self._fd)
+
+
+class RateLimiter:
+    """Limit the rate of requests per namespace."""
+
+    def __init__(self, rates, burst=None, directory=None):
+        """
+        :param rates: A dictionary of the number of requests per second
+            of each namespace, e.g. `{"subscription": 10}`. The rate of
+            `"*"` applies to all other namespaces. Namespaces without a
+            rate aren't limited.
+        :param burst: Optional. Same as `TokenBucket`.
+        :param directory: Optional. When set, the limits are shared by
+            all processes using the same directory on the host, using
+            a `FileTokenBucket` per namespace.
+        """
+        self.rates = rates
+        self.burst = burst
+        self.directory = directory
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, namespace):
+        """Return the bucket of `namespace`, or None if it's unlimited."""
+        bucket = self._buckets.get(namespace)
+        if bucket is not None:
+            return bucket
+        rate = self.rates.get(namespace, self.rates.get("*"))
+        if rate is None:
+            return None
+        with self._lock:
+            if namespace not in self._buckets:
+                self._buckets[namespace] = self.create_bucket(namespace, rate)
+            return self._buckets[namespace]
+
+    def create_bucket(self, namespace, rate):
+        """Return a new bucket for `namespace`."""
+        if self.directory is None:
+            return TokenBucket(rate, self.burst)
+        return FileTokenBucket(
+            os.path.join(self.directory, "{0}.bucket".format(namespace)),
+            rate, self.burst)
+
+    def reserve(self, namespace):
+        """Same as `TokenBucket.reserve`, for the bucket of `namespace`."""
+        bucket = self.get_bucket(namespace)
+        return 0.0 if bucket is None else bucket.reserve()
+
+    def refund(self, namespace):
+        """Same as `TokenBucket.refund`, for the bucket of `namespace`."""
+        bucket = self.get_bucket(namespace)
+        if bucket is not None:
+            bucket.refund()
+
+    def acquire(self, namespace):
+        """Same as `TokenBucket.acquire`, for the bucket of `namespace`."""
+        bucket = self.get_bucket(namespace)
+        return 0.0 if bucket is None else bucket.acquire()
+
+    def __repr__(self):
+        return "<{0}: rates={1}>".format(type(self).__name__, self.rates)
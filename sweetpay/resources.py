@@ -1,15 +1,294 @@
-from .constants import SUBSCRIPTION, CHECKOUT_SESSION, CREDITCHECK, OK_STATUS
+import json
+from functools import partial
+from time import perf_counter
+
+from .batch import DEFAULT_CONCURRENCY, iter_batch
+from .streaming import DEFAULT_CHUNK_SIZE, iter_array
+from .constants import SUBSCRIPTION, CHECKOUT_SESSION, CREDITCHECK, \
+    OK_STATUS, IDEMPOTENCY_KEY_HEADER
+from .deadline import get_request_timeout
+from .idempotency import generate_key
+from .instrumentation import RequestInfo
+from .models import Subscription, SubscriptionLogEntry, CreditCheck, \
+    CheckoutSession, wrap_payload
 from .errors import SweetpayError, BadDataError, InvalidParameterError, \
     InternalServerError, UnderMaintenanceError, UnauthorizedError, \
     NotFoundError, MethodNotAllowedError, FailureStatusError, ProxyError
 
 from restbase import operation, BaseResource
 
+# The compiled endpoint URLs by resource class and base URL, shared by all
+# instances, e.g. the clients of a `sweetpay.tenants.ClientPool`.
+_URL_TABLES = {}
+
+# Marks the end of the items of a streamed response.
+_END = object()
+
 
 class Resource(BaseResource):
     """The base resource used to create API resources."""
     namespace = None
 
+    #: The operations which modify resources, invalidating cached results.
+    mutating_operations = frozenset()
+
+    #: The `sweetpay.models.Model` to wrap the payload of each operation in.
+    response_models = {}
+
+    #: The path of each endpoint, relative to the URL of the resource.
+    #: `{0}` is replaced with the ID of the resource, if any.
+    endpoints = {}
+
+    def __init__(
+            self, test, connector, *args, retry=None, idempotency_keys=False,
+            journal=None, circuit_breaker=None, cache=None, models=False,
+            single_flight=None, timeouts=None, response_hook=None,
+            **kwargs):
+        """
+        :param test: Same as `restbase.BaseResource`.
+        :param connector: Same as `restbase.BaseResource`.
+        :param args: Passed to the connector.
+        :param retry: Optional. Same as `Client`.
+        :param idempotency_keys: Optional. Same as `Client`.
+        :param journal: Optional. Same as `Client`.
+        :param circuit_breaker: Optional. Same as `Client`.
+        :param cache: Optional. Same as `Client`.
+        :param models: Optional. Same as `Client`.
+        :param single_flight: Optional. Same as `Client`.
+        :param timeouts: Optional. Same as `Client`.
+        :param response_hook: Optional. Same as `Client`.
+        :param kwargs: Passed to the connector.
+        """
+        self.retry = retry
+        self.idempotency_keys = idempotency_keys
+        self.journal = journal
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        self.models = models
+        self.single_flight = single_flight
+        self.timeouts = timeouts
+        self.response_hook = response_hook
+        # The endpoint URLs, built once per base URL by `_get_url`.
+        self._urls = None
+        self._urls_base = None
+        super().__init__(
+            test, connector, *args, namespace=self.namespace, **kwargs)
+
+    def _get_url(self, endpoint, resource_id=None):
+        """Return the URL of an endpoint.
+
+        Same as `_build_url`, but the URLs are only built once per base
+        URL (and shared by all resources of the class), rather than on
+        every call.
+
+        :param endpoint: The name of the endpoint, see `endpoints`.
+        :param resource_id: Optional. The ID of the resource.
+        """
+        base = self.url
+        if base != self._urls_base:
+            key = (type(self), base)
+            urls = _URL_TABLES.get(key)
+            if urls is None:
+                urls = _URL_TABLES[key] = self._compile_urls(base)
+            self._urls = urls
+            self._urls_base = base
+        url = self._urls[endpoint]
+        if resource_id is None:
+            return url
+        prefix, suffix = url
+        return prefix + str(resource_id) + suffix
+
+    def _compile_urls(self, base):
+        """Return the URLs of all endpoints, relative to `base`.
+
+        URLs including the resource ID are split into the parts
+        before and after the ID.
+        """
+        urls = {}
+        for endpoint, path in self.endpoints.items():
+            url = "{0}/{1}".format(base.rstrip("/"), path)
+            if "{0}" in url:
+                url = tuple(url.split("{0}", 1))
+            urls[endpoint] = url
+        return urls
+
+    def _get_idempotency_key(self, idempotency_key=None):
+        """Return the key to send with a create operation, if any."""
+        if idempotency_key is None and self.idempotency_keys:
+            return generate_key()
+        return idempotency_key
+
+    def _api_call(
+            self, url, method, data=None, opname=None, resource_id=None,
+            idempotency_key=None):
+        """Make an API call, retrying it according to the retry policy.
+
+        :param url: The URL to send the request to.
+        :param method: The HTTP method to use.
+        :param data: The data to send.
+        :param opname: The name of the operation.
+        :param resource_id: Optional. The ID of the resource the
+            operation is for, e.g. a subscription ID.
+        :param idempotency_key: Optional. The key identifying the
+            operation. It's sent with every attempt, which makes the
+            operation safe to retry.
+        :return: A dictionary representing the data from the server.
+        """
+        cache_key, result = self._lookup(
+            opname, resource_id, data, idempotency_key)
+        if result is not None:
+            return self._wrap(opname, result)
+        headers, retryable = self._get_idempotency_headers(idempotency_key)
+
+        call = partial(self._send, url, method, data, headers, opname)
+        if self.circuit_breaker is not None:
+            call = partial(self.circuit_breaker.call, self.namespace, call)
+        if self.retry is not None:
+            call = partial(self.retry.call, call, opname, retryable)
+        if self._coalesces(opname):
+            call = partial(
+                self.single_flight.call,
+                cache_key or self._get_request_key(opname, resource_id, data),
+                call)
+        try:
+            result = call()
+        finally:
+            self._invalidate(opname, resource_id)
+
+        self._remember(opname, resource_id, cache_key, idempotency_key, result)
+        return self._wrap(opname, result)
+
+    def _wrap(self, opname, result):
+        """Pass the result to the response hook, and wrap the payload in
+        its model, if enabled.
+        """
+        if self.response_hook is not None:
+            result = self.response_hook(result)
+        model = self.response_models.get(opname)
+        if not self.models or model is None or not isinstance(result, dict):
+            return result
+        return wrap_payload(result, model)
+
+    def _lookup(self, opname, resource_id, data, idempotency_key):
+        """Look up a known result of an operation, without a request.
+
+        :return: A tuple of the cache key, if the operation is cached, and
+            the known result, if any.
+        """
+        if idempotency_key is not None and self.journal is not None:
+            result = self.journal.get(idempotency_key)
+            if result is not None:
+                return None, result
+        if self.cache is None or self.cache.get_ttl(opname) is None:
+            return None, None
+        cache_key = self._get_request_key(opname, resource_id, data)
+        return cache_key, self.cache.get(cache_key)
+
+    def _get_request_key(self, opname, resource_id, data):
+        """Return a key identifying an operation and its arguments."""
+        return (
+            self.client.api_token, self.namespace, opname,
+            None if resource_id is None else str(resource_id),
+            json.dumps(data, sort_keys=True, default=str) if data else None)
+
+    def _coalesces(self, opname):
+        """Return whether identical concurrent calls of `opname` share
+        one request."""
+        return self.single_flight is not None and \
+            opname in self.single_flight.operations
+
+    def _remember(self, opname, resource_id, cache_key, idempotency_key,
+                  result):
+        """Remember the result of a successful operation."""
+        if idempotency_key is not None and self.journal is not None:
+            self.journal.record(idempotency_key, result)
+        if cache_key is not None:
+            self.cache.set(
+                cache_key, result, self.cache.get_ttl(opname),
+                tag=self._get_cache_tag(opname, resource_id))
+
+    def _invalidate(self, opname, resource_id):
+        """Invalidate the cached results affected by an operation."""
+        if self.cache is not None and opname in self.mutating_operations:
+            self.cache.invalidate(
+                self._get_cache_tag(opname, resource_id),
+                self._get_cache_tag("search", None))
+
+    def _get_cache_tag(self, opname, resource_id):
+        """Return the tag of cached results, by resource ID if given.
+
+        Tags are scoped by API token, so that a cache shared by many
+        merchants only invalidates the results of the one making a change.
+        """
+        if resource_id is None:
+            return self.client.api_token, self.namespace, opname
+        return self.client.api_token, self.namespace, str(resource_id)
+
+    @staticmethod
+    def _get_idempotency_headers(idempotency_key):
+        """Return the headers to send, and whether the call is retryable."""
+        if idempotency_key is None:
+            return None, None
+        return {IDEMPOTENCY_KEY_HEADER: idempotency_key}, True
+
+    def _send(self, url, method, data=None, headers=None, opname=None):
+        """Send a single request and check the response for errors."""
+        info = self._before_request(opname, method, url)
+        try:
+            respcls = self.client.make_request(
+                url, method, data, headers=headers, info=info,
+                timeout=self._get_timeout(opname))
+            result = self._check_for_errors(
+                code=respcls.code, data=respcls.data,
+                response=respcls.response)
+        except SweetpayError as e:
+            self._after_request(info, e)
+            raise
+        self._after_request(info)
+        return result
+
+    def _get_timeout(self, opname):
+        """Return the timeout of a request for `opname`.
+
+        The timeout of the operation is used if there is one, otherwise
+        the one of the namespace or the connector. It's cut to fit the
+        current deadline, if any.
+
+        :raise TimeoutError: If the deadline has already passed.
+        """
+        timeout = None
+        if self.timeouts:
+            timeout = self.timeouts.get(
+                "{0}.{1}".format(self.namespace, opname),
+                self.timeouts.get(self.namespace))
+        if timeout is None:
+            timeout = self.client.timeout
+        return get_request_timeout(timeout)
+
+    def _before_request(self, opname, method, url):
+        """Call the `before_request` hooks, if any.
+
+        :return: A `RequestInfo` to pass on to the request, or None
+            if there are no hooks.
+        """
+        if not self.client.hooks:
+            return None
+        info = RequestInfo(self.namespace, opname, method.upper(), url)
+        for hook in self.client.hooks:
+            hook.before_request(info)
+        return info
+
+    def _after_request(self, info, exc=None):
+        """Call the `after_request` or `on_error` hooks, if any."""
+        if info is None:
+            return
+        info.timings["total"] = perf_counter() - info.started
+        for hook in self.client.hooks:
+            if exc is None:
+                hook.after_request(info)
+            else:
+                hook.on_error(info, exc)
+
     @classmethod
     def _check_for_errors(cls, code, data, response):
         """Inspect a response for errors.
@@ -107,6 +386,91 @@ class Resource(BaseResource):
         # actually passed in.
         raise exc(msg, **exc_kwargs)
 
+    def _iter_api_call(
+            self, url, method, data=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Make an API call, yielding the items of the payload one by one.
+
+        The response is parsed while it is read, so only one item is
+        held in memory at a time. The request goes through the retry
+        policy, the circuit breaker and the hooks like any other, but
+        only until the response status has been received; an error while
+        reading the items is raised without a retry.
+
+        :param url: The URL to send the request to.
+        :param method: The HTTP method to use.
+        :param data: The data to send.
+        :param chunk_size: The number of bytes to read at a time.
+        :raise SweetpayError: Same as `_check_for_errors`, or if the
+            response couldn't be decoded or read.
+        :return: A generator of the items in the payload.
+        """
+        call = partial(self._open_stream, url, method, data)
+        if self.circuit_breaker is not None:
+            call = partial(self.circuit_breaker.call, self.namespace, call)
+        if self.retry is not None:
+            call = partial(self.retry.call, call, "search")
+        response, info = call()
+        try:
+            code = response.status_code
+            envelope = {}
+            model = self.response_models.get("search") if self.models \
+                else None
+            items = iter_array(
+                response.iter_content(chunk_size), "payload", envelope)
+            try:
+                while True:
+                    # Only reading is mapped, not the caller's own errors.
+                    with self.client.transport.reading():
+                        item = next(items, _END)
+                    if item is _END:
+                        break
+                    if self.response_hook is not None:
+                        item = self.response_hook(item)
+                    yield model(item) if model is not None else item
+            except ValueError as e:
+                raise SweetpayError(
+                    "Could not decode the streamed response", code=code,
+                    response=response, exc=e)
+
+            # The status may come after the payload, so it's only
+            # checked when the whole response has been read.
+            self._check_for_errors(
+                code=code, data=envelope, response=response)
+        except SweetpayError as e:
+            self._after_request(info, e)
+            raise
+        finally:
+            response.close()
+        self._after_request(info)
+
+    def _open_stream(self, url, method, data):
+        """Send the request of `_iter_api_call`, checking its status.
+
+        :return: A tuple of the response, with a status of 200, and the
+            `RequestInfo` of the hooks, if any.
+        """
+        info = self._before_request("search", method, url)
+        try:
+            response = self.client.stream_request(
+                url, method, data, timeout=self._get_timeout("search"))
+            if response.status_code != 200:
+                try:
+                    # Errors are small, so decode them as usual.
+                    with self.client.transport.reading():
+                        text = response.text
+                    self._check_for_errors(
+                        code=response.status_code,
+                        data=self.client.decode_data(text),
+                        response=response)
+                finally:
+                    response.close()
+        except SweetpayError as e:
+            self._after_request(info, e)
+            raise
+        if info is not None:
+            info.status_code = response.status_code
+        return response, info
+
     def __repr__(self):
         return "<{0}: namespace={1}>".format(
             type(self).__name__, self.namespace)
@@ -116,76 +480,159 @@ class SubscriptionV1(Resource):
     """The subscription resource."""
 
     namespace = SUBSCRIPTION
+    mutating_operations = frozenset(["create", "update", "regret"])
+    response_models = {
+        "create": Subscription, "query": Subscription,
+        "update": Subscription, "search": Subscription,
+        "list_log": SubscriptionLogEntry, "regret": Subscription
+    }
+    endpoints = {
+        "create": "create", "query": "{0}/query", "update": "{0}/update",
+        "search": "search", "list_log": "{0}/log", "regret": "{0}/regret"
+    }
 
     _test_url = "https://api.stage.kriita.com/subscription/v1"
     _production_url = "https://api.kriita.com/subscription/v1"
 
     @operation
-    def create(self, **params):
-        """Create a subscription."""
-        url = self._build_url("create")
-        return self._api_call(url, "POST", params)
+    def create(self, idempotency_key=None, **params):
+        """Create a subscription.
+
+        :param idempotency_key: Optional. Identifies the subscription, so
+            that it's only created once, no matter how many times the
+            operation is retried with the same key.
+        """
+        url = self._get_url("create")
+        return self._api_call(
+            url, "POST", params, opname="create",
+            idempotency_key=self._get_idempotency_key(idempotency_key))
 
     @operation
     def query(self, subscription_id):
         """Query a subscription for information."""
-        url = self._build_url(str(subscription_id), "query")
-        return self._api_call(url, "GET")
+        url = self._get_url("query", subscription_id)
+        return self._api_call(
+            url, "GET", opname="query", resource_id=subscription_id)
 
     @operation
     def update(self, subscription_id, **params):
         """Update a subscription."""
-        url = self._build_url(str(subscription_id), "update")
-        return self._api_call(url, "POST", params)
+        url = self._get_url("update", subscription_id)
+        return self._api_call(
+            url, "POST", params, opname="update", resource_id=subscription_id)
 
     @operation
     def search(self, **params):
         """Search for subscriptions."""
-        url = self._build_url("search")
-        return self._api_call(url, "POST", params)
+        url = self._get_url("search")
+        return self._api_call(url, "POST", params, opname="search")
+
+    @operation
+    def iter_search(self, chunk_size=DEFAULT_CHUNK_SIZE, **params):
+        """Search for subscriptions, yielding them one by one.
+
+        Memory use stays bounded no matter how many subscriptions
+        are found.
+        """
+        url = self._get_url("search")
+        return self._iter_api_call(url, "POST", params, chunk_size)
 
     @operation
     def list_log(self, subscription_id):
         """List all of the log entries."""
-        url = self._build_url(str(subscription_id), "log")
-        return self._api_call(url, "GET")
+        url = self._get_url("list_log", subscription_id)
+        return self._api_call(
+            url, "GET", opname="list_log", resource_id=subscription_id)
 
     @operation
     def regret(self, subscription_id):
         """Regret a subscription."""
-        url = self._build_url(str(subscription_id), "regret")
-        return self._api_call(url, "POST")
+        url = self._get_url("regret", subscription_id)
+        return self._api_call(
+            url, "POST", opname="regret", resource_id=subscription_id)
+
+    def query_many(
+            self, subscription_ids, concurrency=DEFAULT_CONCURRENCY,
+            ordered=False):
+        """Query many subscriptions concurrently.
+
+        :param subscription_ids: An iterable of subscription IDs.
+        :param concurrency: The number of concurrent requests.
+        :param ordered: Whether to yield the results in the same
+            order as `subscription_ids`.
+        :return: A generator of `(subscription_id, result)` tuples, where
+            `result` is either the data or the raised `SweetpayError`.
+        """
+        return iter_batch(
+            ((subscription_id, partial(self.query, subscription_id))
+             for subscription_id in subscription_ids),
+            concurrency=concurrency, ordered=ordered)
+
+    def update_many(
+            self, updates, concurrency=DEFAULT_CONCURRENCY, ordered=False):
+        """Update many subscriptions concurrently.
+
+        :param updates: An iterable of `(subscription_id, params)` tuples,
+            where `params` is a dictionary passed on to `update`.
+        :param concurrency: The number of concurrent requests.
+        :param ordered: Whether to yield the results in the same
+            order as `updates`.
+        :return: A generator of `(subscription_id, result)` tuples, where
+            `result` is either the data or the raised `SweetpayError`.
+        """
+        return iter_batch(
+            ((subscription_id, partial(self.update, subscription_id, **params))
+             for subscription_id, params in updates),
+            concurrency=concurrency, ordered=ordered)
 
 
 class CreditcheckV2(Resource):
     """The creditcheck resource."""
 
     namespace = CREDITCHECK
+    mutating_operations = frozenset(["create"])
+    response_models = {"create": CreditCheck, "search": CreditCheck}
+    endpoints = {"create": "check", "search": "search"}
 
     _test_url = "https://api.stage.kriita.com/creditcheck/v2"
     _production_url = "https://api.kriita.com/creditcheck/v2"
 
     @operation
-    def create(self, **params):
-        url = self._build_url("check")
-        return self._api_call(url, "POST", params)
+    def create(self, idempotency_key=None, **params):
+        url = self._get_url("create")
+        return self._api_call(
+            url, "POST", params, opname="create",
+            idempotency_key=self._get_idempotency_key(idempotency_key))
 
     @operation
     def search(self, **params):
-        url = self._build_url("search")
-        return self._api_call(url, "POST", params)
+        url = self._get_url("search")
+        return self._api_call(url, "POST", params, opname="search")
+
+    @operation
+    def iter_search(self, chunk_size=DEFAULT_CHUNK_SIZE, **params):
+        """Search for credit checks, yielding them one by one."""
+        url = self._get_url("search")
+        return self._iter_api_call(url, "POST", params, chunk_size)
 
 
 class CheckoutSessionV1(Resource):
     """The checkout session resource."""
 
     namespace = CHECKOUT_SESSION
+    response_models = {"create": CheckoutSession}
+    endpoints = {"create": "session/create"}
 
     _test_url = "https://checkout.stage.paylevo.com/v1"
     _production_url = "https://checkout.paylevo.com/v1"
 
     @operation
-    def create(self, **params):
-        """Create a checkout session"""
-        url = self._build_url("session", "create")
-        return self._api_call(url, "POST", params)
+    def create(self, idempotency_key=None, **params):
+        """Create a checkout session.
+
+        :param idempotency_key: Optional. Same as `SubscriptionV1.create`.
+        """
+        url = self._get_url("create")
+        return self._api_call(
+            url, "POST", params, opname="create",
+            idempotency_key=self._get_idempotency_key(idempotency_key))
@@ -0,0 +1,110 @@
+"""Retrying of failed operations."""
+import asyncio
+import random
+import time
+
+from .deadline import get_remaining
+from .errors import ProxyError, UnderMaintenanceError, TimeoutError
+
+#: The operations retried by default, as they are safe to repeat.
+IDEMPOTENT_OPERATIONS = frozenset(["query", "search", "list_log"])
+
+
+class RetryPolicy:
+    """Retry failed operations with exponential backoff and jitter.
+
+    The exception raised by the last attempt gets an `attempts`
+    attribute with the number of attempts made.
+    """
+
+    def __init__(
+            self, max_attempts=3, backoff=0.5, max_backoff=10.0, jitter=True,
+            deadline=None, exceptions=(
+                ProxyError, UnderMaintenanceError, TimeoutError),
+            operations=IDEMPOTENT_OPERATIONS, on_retry=None):
+        """
+        :param max_attempts: The maximum number of attempts, including
+            the first one.
+        :param backoff: The delay in seconds before the first retry. The
+            delay is doubled for every retry.
+        :param max_backoff: The maximum delay in seconds between attempts.
+        :param jitter: Whether to randomize the delay between zero and the
+            exponential delay, so that clients don't retry in lockstep.
+        :param deadline: Optional. The total number of seconds to spend on
+            an operation. No retry is made if the delay would exceed it,
+            nor the current `sweetpay.deadline.deadline`.
+        :param exceptions: The exceptions to retry on.
+        :param operations: The names of the operations to retry.
+        :param on_retry: Optional. Called with the operation name, the
+            attempt number, the raised exception and the delay before
+            every retry.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.exceptions = exceptions
+        self.operations = frozenset(operations)
+        self.on_retry = on_retry
+
+    def get_delay(self, attempt):
+        """Return the delay in seconds after the `attempt`:th attempt."""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def _next_delay(self, opname, exc, attempt, start, retryable):
+        """Return the delay before the next attempt, or re-raise `exc`."""
+        exc.attempts = attempt
+        if retryable is None:
+            retryable = opname in self.operations
+        if not retryable or attempt >= self.max_attempts:
+            raise exc
+        delay = self.get_delay(attempt)
+        if self.deadline is not None and \
+                time.monotonic() - start + delay > self.deadline:
+            raise exc
+        # Nor if it would exceed the deadline of the caller.
+        remaining = get_remaining()
+        if remaining is not None and delay >= remaining:
+            raise exc
+        if self.on_retry is not None:
+            self.on_retry(opname, attempt, exc, delay)
+        return delay
+
+    def call(self, func, opname, retryable=None):
+        """Call `func` until it succeeds or may no longer be retried.
+
+        :param func: The function to call, without arguments.
+        :param opname: The name of the operation.
+        :param retryable: Optional. Whether the operation may be retried,
+            defaults to whether `opname` is in `operations`.
+        :return: The return value of `func`.
+        """
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func()
+            except self.exceptions as e:
+                delay = self._next_delay(opname, e, attempt, start, retryable)
+            time.sleep(delay)
+
+    async def call_async(self, func, opname, retryable=None):
+        """Same as `call`, but for a coroutine function."""
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func()
+            except self.exceptions as e:
+                delay = self._next_delay(opname, e, attempt, start, retryable)
+            await asyncio.sleep(delay)
+
+    def __repr__(self):
+        return "<{0}: max_attempts={1}>".format(
+            type(self).__name__, self.max_attempts)
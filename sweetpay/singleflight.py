@@ -0,0 +1,134 @@
+"""Coalescing of identical concurrent read operations (single-flight)."""
+import asyncio
+import copy
+import threading
+from functools import partial
+
+from .deadline import get_remaining, timeout_error
+from .retry import IDEMPOTENT_OPERATIONS
+
+_WAIT_TIMEOUT_MESSAGE = (
+    "The deadline was exceeded while waiting for an identical call")
+
+
+class _Call:
+    """A call in flight, waited for by the calls collapsed into it."""
+
+    __slots__ = ("done", "result", "exc")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc = None
+
+
+class SingleFlight:
+    """Share one request between identical operations in flight.
+
+    While an operation is in flight, identical calls (the same operation
+    with the same arguments) wait for it instead of sending their own
+    request, and get a copy of its result or the exception it raised.
+    """
+
+    def __init__(self, operations=IDEMPOTENT_OPERATIONS):
+        """
+        :param operations: The names of the operations to coalesce,
+            defaults to the read-only ones.
+        """
+        self.operations = frozenset(operations)
+        self.calls = 0
+        self.collapsed = 0
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, func):
+        """Call `func`, unless a call with the same `key` is in flight.
+
+        :param key: A hashable key identifying the operation.
+        :param func: A callable taking no arguments.
+        :return: The result of `func`, or of the call in flight.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            # Wait no longer than our own deadline, if any.
+            if not call.done.wait(get_remaining()):
+                raise timeout_error(_WAIT_TIMEOUT_MESSAGE)
+            if call.exc is not None:
+                raise call.exc
+            # Every caller gets its own copy, which it's free to modify.
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = func()
+            result = copy.deepcopy(call.result)
+        except BaseException as e:
+            call.exc = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return result
+
+    async def call_async(self, key, func):
+        """Same as `call`, but awaits the coroutine function `func`.
+
+        Only calls within the same event loop are coalesced.
+        """
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self.calls += 1
+            task = self._futures.get(key)
+            if task is None:
+                # The call runs in its own task, so that cancelling any of
+                # the callers, the first one included, doesn't cancel it
+                # for the others.
+                task = self._futures[key] = asyncio.ensure_future(func())
+                task.add_done_callback(partial(self._forget, key))
+            else:
+                self.collapsed += 1
+
+        waiter = asyncio.shield(task)
+        remaining = get_remaining()
+        try:
+            if remaining is None:
+                result = await waiter
+            else:
+                # Wait no longer than our own deadline.
+                result = await asyncio.wait_for(waiter, max(remaining, 0))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise timeout_error(_WAIT_TIMEOUT_MESSAGE)
+        # Every caller gets its own copy, which it's free to modify.
+        return copy.deepcopy(result)
+
+    def _forget(self, key, task):
+        with self._lock:
+            if self._futures.get(key) is task:
+                del self._futures[key]
+        # Mark the exception as retrieved, in case every caller is gone.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """Return the number of calls, and how many of them were collapsed.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls, "collapsed": self.collapsed,
+                "in_flight": len(self._calls) + len(self._futures)
+            }
+
+    def __repr__(self):
+        return "<{0}: calls={1}, collapsed={2}>".format(
+            type(self).__name__, self.calls, self.collapsed)
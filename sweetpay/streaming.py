@@ -0,0 +1,183 @@
+"""Incremental decoding of JSON responses."""
+import codecs
+import json
+import re
+
+#: The default number of bytes read from the response at a time.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# The characters which may continue a number that has been matched.
+_NUMBER_CONTINUATIONS = frozenset(".eE+-")
+
+
+class _Reader:
+    """A buffer over an iterable of text chunks, consumed from the left."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # Every value is decoded on its own, so the keys of all objects
+        # are shared explicitly, like `json.loads` does within a document.
+        keys = {}
+        self.decoder = json.JSONDecoder(object_pairs_hook=lambda pairs: {
+            keys.setdefault(key, key): value for key, value in pairs})
+
+    def fill(self):
+        """Read the next chunk, dropping the consumed part of the buffer."""
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character, or "" at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, *chars):
+        """Consume the next character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                "Expected one of {0} at position {1}, got {2!r}".format(
+                    chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Consume and return the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+            else:
+                if self.eof or not self._may_continue(obj, end):
+                    self.pos = end
+                    return obj
+            self.fill()
+
+    def _may_continue(self, obj, end):
+        """Return whether the value ending at `end` may continue in the
+        next chunk, e.g. a number cut off right after its "." or "e"."""
+        if end == len(self.buf):
+            return True
+        return isinstance(obj, (int, float)) and not isinstance(obj, bool) \
+            and self.buf[end] in _NUMBER_CONTINUATIONS
+
+
+def _decode_chunks(chunks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+class ChunkRecorder:
+    """Wrap an iterable of bytes, counting them and keeping the first ones.
+
+    Used to report the size of a streamed body, and to tell what an
+    undecodable body looked like without holding all of it.
+    """
+
+    def __init__(self, chunks, limit):
+        """
+        :param chunks: An iterable of bytes.
+        :param limit: The number of bytes to keep in `head`.
+        """
+        self.chunks = chunks
+        self.limit = limit
+        self.size = 0
+        self.head = bytearray()
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.size += len(chunk)
+            missing = self.limit - len(self.head)
+            if missing > 0:
+                self.head += chunk[:missing]
+            yield chunk
+
+
+def _iter_items(reader):
+    """Consume a JSON array, yielding its items one by one."""
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",", "]") == "]":
+            return
+
+
+def load(chunks, key="payload", encoding="utf-8"):
+    """Decode a JSON object while it's read.
+
+    The result is the same as decoding the whole document at once, but
+    the array under `key` is decoded item by item, so neither the raw
+    document nor its text is ever held in memory.
+
+    :param chunks: An iterable of bytes, making up the JSON document.
+    :param key: The key of the (possibly large) array to decode
+        incrementally.
+    :param encoding: The encoding of the document.
+    :raise ValueError: If the document isn't a valid JSON object.
+    :return: The decoded object.
+    """
+    reader = _Reader(_decode_chunks(chunks, encoding))
+    data = {}
+    reader.expect("{")
+    if reader.peek() == "}":
+        return data
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            data[name] = list(_iter_items(reader))
+        else:
+            data[name] = reader.value()
+        if reader.expect(",", "}") == "}":
+            return data
+
+
+def iter_array(chunks, key="payload", envelope=None, encoding="utf-8"):
+    """Incrementally parse the array under `key` in a JSON object.
+
+    Only one item of the array is held in memory at a time, no matter
+    how large the document is.
+
+    :param chunks: An iterable of bytes, making up the JSON document.
+    :param key: The key of the array within the top-level object.
+    :param envelope: Optional. A dictionary which is filled with all
+        other top-level keys of the object.
+    :param encoding: The encoding of the document.
+    :raise ValueError: If the document isn't a valid JSON object.
+    :return: A generator of the items in the array.
+    """
+    reader = _Reader(_decode_chunks(chunks, encoding))
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            yield from _iter_items(reader)
+        else:
+            value = reader.value()
+            if envelope is not None:
+                envelope[name] = value
+        if reader.expect(",", "}") == "}":
+            return
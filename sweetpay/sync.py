@@ -0,0 +1,212 @@
+"""Incremental synchronization of subscription logs.
+
+`LogSyncer` remembers how far the log of each subscription has been
+synchronized (its high-water mark), and only returns the entries which
+have been added since. The API always returns the whole log, but only
+the new entries are processed and returned.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from functools import partial
+
+from .batch import DEFAULT_CONCURRENCY, iter_batch
+from .errors import SweetpayError
+from .utils import logger
+
+#: The file the checkpoints are saved to by default.
+DEFAULT_CHECKPOINT_PATH = "sweetpay-checkpoints.json"
+
+
+def get_entry_key(entry):
+    """Return a key identifying a log entry.
+
+    The ID of the entry is used if there is one, otherwise a digest
+    of its contents.
+    """
+    log_id = entry.get("logId")
+    if log_id is not None:
+        return str(log_id)
+    encoded = json.dumps(dict(entry), sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class MemoryCheckpointStore:
+    """Keep the checkpoints in memory, e.g. for tests.
+
+    A checkpoint is a `(count, key)` tuple of the number of entries
+    synchronized, and the key of the last one (see `get_entry_key`). To
+    keep the checkpoints somewhere else, implement the same `get`, `set`
+    and `flush` methods.
+    """
+
+    def __init__(self):
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+
+    def get(self, subscription_id):
+        """Return the checkpoint of a subscription, or None."""
+        with self._lock:
+            return self._checkpoints.get(str(subscription_id))
+
+    def set(self, subscription_id, checkpoint):
+        """Set the checkpoint of a subscription."""
+        with self._lock:
+            self._checkpoints[str(subscription_id)] = tuple(checkpoint)
+
+    def flush(self):
+        """Persist the checkpoints set since the last flush."""
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    def __repr__(self):
+        return "<{0}: size={1}>".format(type(self).__name__, len(self))
+
+
+class FileCheckpointStore(MemoryCheckpointStore):
+    """Keep the checkpoints in a JSON file.
+
+    The file is rewritten atomically on `flush`, so it's never left
+    half-written. It must not be shared between processes.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        super().__init__()
+        self.path = path
+        self._dirty = False
+        if os.path.exists(path):
+            with open(path) as f:
+                self._checkpoints = {
+                    key: tuple(value) for key, value in json.load(f).items()}
+
+    def set(self, subscription_id, checkpoint):
+        super().set(subscription_id, checkpoint)
+        self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(self._checkpoints, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._dirty = False
+
+
+class LogSyncer:
+    """Return the new entries of subscription logs since the last sync.
+
+    The checkpoint of a subscription is only advanced by `commit`, once
+    its new entries have been processed. Until then, every sync returns
+    them again, so no entry is lost if processing them fails.
+    """
+
+    def __init__(self, resource, store=None):
+        """
+        :param resource: The subscription resource, e.g.
+            `client.subscription`.
+        :param store: Optional. Where to keep the checkpoints, defaults to
+            a `FileCheckpointStore` in the working directory.
+        """
+        self.resource = resource
+        self.store = FileCheckpointStore() if store is None else store
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def sync(self, subscription_id):
+        """Return the entries added to the log since the last sync.
+
+        :raise SweetpayError: Same as `SubscriptionV1.list_log`.
+        :return: A list of log entries, oldest first.
+        """
+        data = self.resource.list_log(subscription_id)
+        return self._advance(subscription_id, data["payload"])
+
+    def sync_many(
+            self, subscription_ids, concurrency=DEFAULT_CONCURRENCY,
+            ordered=False):
+        """Sync many subscriptions concurrently.
+
+        :param subscription_ids: An iterable of subscription IDs.
+        :param concurrency: The number of concurrent requests.
+        :param ordered: Whether to yield the results in the same
+            order as `subscription_ids`.
+        :return: A generator of `(subscription_id, entries)` tuples, where
+            `entries` is either the list of new entries or the raised
+            `SweetpayError`.
+        """
+        for subscription_id, result in iter_batch(
+                ((subscription_id,
+                  partial(self.resource.list_log, subscription_id))
+                 for subscription_id in subscription_ids),
+                concurrency=concurrency, ordered=ordered):
+            if not isinstance(result, SweetpayError):
+                result = self._advance(subscription_id, result["payload"])
+            yield subscription_id, result
+
+    def commit(self, subscription_id=None):
+        """Advance the checkpoint past the entries returned by the last
+        sync, once they've been processed.
+
+        :param subscription_id: Optional. The subscription to commit,
+            defaults to all subscriptions synced since the last commit.
+        """
+        with self._lock:
+            if subscription_id is None:
+                checkpoints, self._pending = self._pending, {}
+            elif str(subscription_id) in self._pending:
+                checkpoints = {subscription_id: self._pending.pop(
+                    str(subscription_id))}
+            else:
+                return
+        for key, checkpoint in checkpoints.items():
+            self.store.set(key, checkpoint)
+        self.store.flush()
+
+    def reset(self, subscription_id):
+        """Make the next sync return the whole log again."""
+        with self._lock:
+            self._pending.pop(str(subscription_id), None)
+        self.store.set(subscription_id, (0, None))
+        self.store.flush()
+
+    def _advance(self, subscription_id, entries):
+        """Return the entries after the checkpoint, and keep the new
+        checkpoint until it's committed."""
+        checkpoint = self.store.get(subscription_id) or (0, None)
+        count, key = checkpoint
+        if count and (len(entries) < count or
+                      get_entry_key(entries[count - 1]) != key):
+            # The log has changed before the checkpoint, so look for the
+            # last synchronized entry instead.
+            count = self._find(entries, key)
+            logger.warning(
+                "The log of subscription_id=%s changed before the "
+                "checkpoint", subscription_id)
+        if entries:
+            latest = (len(entries), get_entry_key(entries[-1]))
+        else:
+            latest = (0, None)
+        with self._lock:
+            if latest != checkpoint:
+                self._pending[str(subscription_id)] = latest
+            else:
+                self._pending.pop(str(subscription_id), None)
+        return entries[count:]
+
+    @staticmethod
+    def _find(entries, key):
+        """Return the position after the entry with `key`, or 0."""
+        for position in range(len(entries), 0, -1):
+            if get_entry_key(entries[position - 1]) == key:
+                return position
+        return 0
@@ -0,0 +1,148 @@
+"""Clients for many merchants, sharing one connection pool.
+
+A marketplace talks to the API on behalf of many merchants, each with
+its own API token. A `ClientPool` creates the client of a merchant on
+first use, and all of them share the same transport (and its keep-alive
+connections) and codec. At most `max_clients` clients are kept, the
+least recently used ones (and those idle for `idle_timeout` seconds) are
+dropped and created again when needed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from .client import Client
+from .codec import get_default_codec
+from .transport import RequestsTransport
+
+#: The number of clients kept by default.
+DEFAULT_MAX_CLIENTS = 128
+
+#: The number of keep-alive connections per host shared by all clients.
+DEFAULT_POOL_SIZE = 10
+
+# Idempotency keys are chosen by the caller (e.g. an order ID), so two
+# merchants may use the same one, and a shared journal would return the
+# result of one merchant to another. Cached and coalesced results are
+# keyed by API token, so those can be shared.
+_UNSHARABLE = ("journal",)
+
+
+class ClientPool:
+    """Create and keep the clients of many merchants."""
+
+    #: The clock used to find idle clients.
+    clock = staticmethod(time.monotonic)
+
+    def __init__(
+            self, *args, max_clients=DEFAULT_MAX_CLIENTS, idle_timeout=None,
+            pool_size=DEFAULT_POOL_SIZE, transport=None, codec=None,
+            client_class=Client, **kwargs):
+        """
+        :param args: Passed to every client, e.g. `test=True`.
+        :param max_clients: The maximum number of clients kept.
+        :param idle_timeout: Optional. Drop the clients which haven't
+            been used for this many seconds.
+        :param pool_size: The number of keep-alive connections per host,
+            shared by all clients. Ignored if a `transport` is given.
+        :param transport: Optional. The transport shared by all clients.
+            Defaults to a `RequestsTransport`, closed by `close`.
+        :param codec: Optional. The codec shared by all clients, defaults
+            to the fastest one available.
+        :param client_class: The class of the clients.
+        :param kwargs: Passed to every client, e.g. `version` or `retry`.
+            Any `retry`, `circuit_breaker`, `rate_limiter`, `hooks`,
+            `cache` or `single_flight` are shared by all clients.
+        :raise ValueError: If a `journal` is given, as the idempotency
+            keys of different merchants may collide.
+        """
+        for name in _UNSHARABLE:
+            if kwargs.get(name) is not None:
+                raise ValueError(
+                    "A {0} can't be shared by the clients of many "
+                    "merchants".format(name))
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.client_class = client_class
+        self._owns_transport = transport is None
+        self.transport = transport or RequestsTransport(
+            pool_size=pool_size, timing=bool(kwargs.get("hooks")))
+        self.codec = codec or get_default_codec()
+        self.created = 0
+        self.evicted = 0
+        self._args = args
+        self._kwargs = kwargs
+        # Maps API tokens to their clients and when they were last used,
+        # from the least to the most recently used.
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, api_token):
+        """Return the client of a merchant, creating it if needed.
+
+        :param api_token: The API token of the merchant.
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._clients.pop(api_token, None)
+            self._evict(now)
+            if entry is None:
+                client = self.create_client(api_token)
+                self.created += 1
+            else:
+                client = entry[0]
+            self._clients[api_token] = (client, now)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self.evicted += 1
+        return client
+
+    def create_client(self, api_token):
+        """Return a new client for a merchant."""
+        return self.client_class(
+            api_token, *self._args, transport=self.transport,
+            codec=self.codec, **self._kwargs)
+
+    def _evict(self, now):
+        """Drop the clients which have been idle for too long."""
+        if self.idle_timeout is None:
+            return
+        while self._clients:
+            api_token, (client, used) = next(iter(self._clients.items()))
+            if now - used < self.idle_timeout:
+                break
+            del self._clients[api_token]
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._clients)
+
+    def __contains__(self, api_token):
+        return api_token in self._clients
+
+    def stats(self):
+        """Return the number of clients kept, created and evicted."""
+        with self._lock:
+            return {
+                "size": len(self._clients), "created": self.created,
+                "evicted": self.evicted
+            }
+
+    def close(self):
+        """Drop all clients, and close the transport if it was created
+        by the pool.
+        """
+        with self._lock:
+            self._clients.clear()
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return "<{0}: size={1}, max_clients={2}>".format(
+            type(self).__name__, len(self._clients), self.max_clients)
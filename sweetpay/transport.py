@@ -0,0 +1,258 @@
+"""Transports, sending the requests of a connector over the network.
+
+`RequestsTransport` (the default) sends requests with `requests` over
+HTTP/1.1. `HTTP2Transport` multiplexes concurrent requests over a single
+HTTP/2 connection per host, install it with `pip install sweetpay[http2]`.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from time import perf_counter
+
+import requests
+from urllib3.exceptions import HTTPError as URLLib3Error, ReadTimeoutError
+
+from .deadline import timeout_error
+from .errors import RequestError
+from .instrumentation import TimingHTTPAdapter
+
+# Imported on first use by `import_httpx`, as it's slow to import.
+httpx = None
+
+
+def import_httpx():
+    """Import and return `httpx`.
+
+    :raise ImportError: If httpx is not installed.
+    """
+    global httpx
+    if httpx is None:
+        try:
+            import httpx as module
+        except ImportError as e:  # pragma: no cover
+            raise ImportError(
+                "The HTTP/2 transport requires httpx, install it with "
+                "`pip install sweetpay[http2]`") from e
+        httpx = module
+    return httpx
+
+
+class Transport:
+    """The interface of all transports."""
+
+    def send(self, method, url, headers, reqkwargs):
+        """Send a request.
+
+        :param method: The HTTP method to use.
+        :param url: The URL to send the request to.
+        :param headers: The headers of the connector. Extra headers for
+            this request may be in `reqkwargs`.
+        :param reqkwargs: The keyword arguments from
+            `Connector.prepare_request`, i.e. `timeout`, `data` and
+            optionally `headers` and `stream`.
+        :raise TimeoutError: If the request timed out.
+        :raise RequestError: If the request couldn't be sent.
+        :return: A response with the same interface as `requests.Response`.
+        """
+        raise NotImplementedError
+
+    @contextmanager
+    def reading(self):
+        """Map the errors raised while reading the body of a response.
+
+        The body of a streamed response is read after `send` has
+        returned, so a dropped connection or a read timeout only shows
+        up then.
+
+        :raise TimeoutError: If reading the body timed out.
+        :raise RequestError: If the body couldn't be read.
+        """
+        yield
+
+    def close(self):
+        """Close all pooled connections, if any."""
+
+    def __repr__(self):
+        return "<{0}>".format(type(self).__name__)
+
+
+class RequestsTransport(Transport):
+    """Send requests with `requests`."""
+
+    def __init__(self, pool_size=None, timing=False):
+        """
+        :param pool_size: Optional. Same as `Client`.
+        :param timing: Whether to time the connections, for
+            `sweetpay.instrumentation`.
+        """
+        self.pool_size = pool_size
+        self.timing = timing
+        # The adapter holds the connection pools and is shared between
+        # all threads, while the sessions (which are not thread-safe)
+        # are kept per thread.
+        self._adapter = None
+        self._local = threading.local()
+        if pool_size is not None:
+            self._adapter = TimingHTTPAdapter(pool_maxsize=pool_size)
+
+    def get_session(self, headers):
+        """Return the session to use for the current request.
+
+        Without a `pool_size`, a new session is created on every request
+        to keep the library thread-safe. With a `pool_size`, every thread
+        gets its own session, but all of them share the same pool of
+        keep-alive connections.
+        """
+        if self._adapter is None:
+            session = requests.Session()
+            if self.timing:
+                # Only needed to time the connection.
+                adapter = TimingHTTPAdapter()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+        else:
+            session = getattr(self._local, "session", None)
+            if session is None:
+                session = requests.Session()
+                session.mount("https://", self._adapter)
+                session.mount("http://", self._adapter)
+                self._local.session = session
+        # The session may be shared by connectors with different headers.
+        session.headers = headers
+        return session
+
+    def send(self, method, url, headers, reqkwargs):
+        session = self.get_session(headers)
+        try:
+            return session.request(method=method, url=url, **reqkwargs)
+        except requests.Timeout as e:
+            # If the request timed out.
+            raise timeout_error("The request timed out", exc=e)
+        except requests.RequestException as e:
+            # If another request error occurred.
+            raise RequestError(
+                "Could not send a request to the server, inspect "
+                "the `exc` attribute to see the underlying "
+                "`requests` exception", code=None, status=None,
+                response=None, exc=e)
+
+    @contextmanager
+    def reading(self):
+        try:
+            yield
+        except (requests.RequestException, URLLib3Error) as e:
+            # `requests` raises a read timeout while streaming as a
+            # `ConnectionError` wrapping the one of urllib3.
+            cause = e.args[0] if e.args else None
+            if isinstance(e, (requests.Timeout, ReadTimeoutError)) or \
+                    isinstance(cause, ReadTimeoutError):
+                raise timeout_error("Reading the response timed out", exc=e)
+            raise RequestError(
+                "Could not read the response from the server, inspect "
+                "the `exc` attribute to see the underlying "
+                "`requests` exception", code=None, status=None,
+                response=None, exc=e)
+
+    def close(self):
+        if self._adapter is not None:
+            self._adapter.close()
+
+
+class _HTTPXResponse:
+    """Give an `httpx` response the interface of `requests.Response`."""
+
+    def __init__(self, response, elapsed):
+        self.raw = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.elapsed = timedelta(seconds=elapsed)
+
+    @property
+    def _content_consumed(self):
+        return self.raw.is_stream_consumed
+
+    @property
+    def content(self):
+        return self.raw.read()
+
+    @property
+    def text(self):
+        self.raw.read()
+        return self.raw.text
+
+    def iter_content(self, chunk_size=1):
+        return self.raw.iter_bytes(chunk_size)
+
+    def close(self):
+        self.raw.close()
+
+
+class HTTP2Transport(Transport):
+    """Multiplex requests over HTTP/2 connections, with `httpx`.
+
+    All threads share one connection per host, which carries any number
+    of concurrent requests. Falls back to HTTP/1.1 against servers which
+    don't support HTTP/2.
+    """
+
+    def __init__(self, max_connections=None, prior_knowledge=False):
+        """
+        :param max_connections: Optional. The maximum number of
+            connections, defaults to no limit.
+        :param prior_knowledge: Whether to use HTTP/2 without TLS, against
+            a server known to support it (e.g. a local stub server). By
+            default, HTTP/2 is negotiated during the TLS handshake.
+        """
+        import_httpx()
+        self.client = httpx.Client(
+            http2=True, http1=not prior_knowledge, timeout=None,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections))
+
+    @staticmethod
+    def get_timeout(timeout):
+        """Return the `httpx.Timeout` of a `requests` timeout."""
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, method, url, headers, reqkwargs):
+        extra = reqkwargs.get("headers")
+        if extra:
+            headers = dict(headers, **extra)
+        request = self.client.build_request(
+            method, url, headers=headers,
+            # An empty body is represented by an empty dict.
+            content=reqkwargs["data"] or None,
+            timeout=self.get_timeout(reqkwargs["timeout"]))
+        start = perf_counter()
+        try:
+            response = self.client.send(
+                request, stream=reqkwargs.get("stream", False))
+        except httpx.TimeoutException as e:
+            raise timeout_error("The request timed out", exc=e)
+        except httpx.HTTPError as e:
+            raise RequestError(
+                "Could not send a request to the server, inspect "
+                "the `exc` attribute to see the underlying "
+                "`httpx` exception", code=None, status=None,
+                response=None, exc=e)
+        return _HTTPXResponse(response, perf_counter() - start)
+
+    @contextmanager
+    def reading(self):
+        try:
+            yield
+        except httpx.TimeoutException as e:
+            raise timeout_error("Reading the response timed out", exc=e)
+        except httpx.HTTPError as e:
+            raise RequestError(
+                "Could not read the response from the server, inspect "
+                "the `exc` attribute to see the underlying "
+                "`httpx` exception", code=None, status=None,
+                response=None, exc=e)
+
+    def close(self):
+        self.client.close()
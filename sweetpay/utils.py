@@ -2,24 +2,52 @@
 import json
 import logging
 from base64 import b64decode, b64encode
+from functools import lru_cache
 
-from datetime import datetime
+from datetime import date, datetime
 from .constants import DATE_FORMAT, LOGGER_NAME
 
-logger = logging.Logger(LOGGER_NAME)
+logger = logging.getLogger(LOGGER_NAME)
 
+#: The number of distinct dates kept decoded by `decode_date`.
+DATE_CACHE_SIZE = 4096
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def decode_date(value):
     """Decode a date string.
 
+    The dates decoded last are cached, as the same dates (e.g. the
+    `startsAt` of subscriptions) come back again and again.
+
     :param value: The string to convert into a date.
     :return: A `datetime.date` object.
     """
     # We cannot convert the datetime to utc, as the
     # starts_at is based on a Swedish datetime
+    if isinstance(value, date):
+        return value
+    # The fast path, for dates padded like "2017-01-01". Any other format
+    # accepted by DATE_FORMAT (e.g. "2017-1-1") is parsed the slow way.
+    if len(value) == 10 and value[4] == value[7] == "-":
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
     return datetime.strptime(value, DATE_FORMAT).date()
 
 
+def decode_dates(values):
+    """Decode a list of date strings, see `decode_date`.
+
+    :param values: An iterable of date strings.
+    :return: A list of `datetime.date` objects.
+    """
+    return list(map(decode_date, values))
+
+
 def encode_attachment(attachment):
     """Helper function to encode a Python object to a b64 encoded value.
 
@@ -40,3 +68,18 @@ def decode_attachment(attachment):
     :return: A Python object of the decoded attachment.
     """
     return json.loads(b64decode(attachment).decode())
+
+
+def decode_attachments(attachments):
+    """Decode a list of attachments, see `decode_attachment`.
+
+    Every attachment is decoded on its own, so that an invalid one
+    raises instead of merging with its neighbours, but with one shared
+    decoder, which is faster than calling `json.loads` for each.
+
+    :param attachments: An iterable of b64 encoded values.
+    :return: A list of the decoded attachments.
+    """
+    decode = _JSON_DECODER.decode
+    return [decode(b64decode(attachment).decode())
+            for attachment in attachments]
@@ -0,0 +1,271 @@
+"""Receive notifications (webhooks) from the Sweetpay APIs.
+
+`WebhookHandler` verifies the signature of each notification, skips
+notifications which have already been handled and dispatches typed
+events to the registered handlers. It's a WSGI application on its own,
+and `WebhookHandler.asgi` is the ASGI equivalent:
+
+    handler = WebhookHandler("<your-webhook-secret>")
+
+    @handler.on("subscription.executed")
+    def executed(event):
+        print(event.payload.subscription_id)
+"""
+import asyncio
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+
+from .codec import get_default_codec
+from .constants import SIGNATURE_HEADER, SUBSCRIPTION, CHECKOUT_SESSION, \
+    CREDITCHECK
+from .errors import WebhookError, InvalidSignatureError
+from .models import Model, Field, Subscription, CheckoutSession, CreditCheck
+from .utils import logger
+
+#: The model of the payload of the events of each namespace.
+EVENT_MODELS = {
+    SUBSCRIPTION: Subscription, CHECKOUT_SESSION: CheckoutSession,
+    CREDITCHECK: CreditCheck
+}
+
+#: The largest body accepted, in bytes.
+MAX_BODY_SIZE = 1024 * 1024
+
+_REASONS = {
+    204: "204 No Content", 400: "400 Bad Request", 401: "401 Unauthorized",
+    405: "405 Method Not Allowed", 413: "413 Payload Too Large",
+    500: "500 Internal Server Error"
+}
+
+
+class Event(Model):
+    """A notification, e.g. that a subscription was executed."""
+
+    __slots__ = ()
+
+    event_id = Field("eventId")
+    type = Field("type")
+    created_at = Field("createdAt")
+
+    @property
+    def namespace(self):
+        """The namespace of the event type, e.g. `subscription`."""
+        return (self.type or "").split(".", 1)[0]
+
+    @property
+    def payload(self):
+        """The payload, wrapped in the model of its namespace, if any."""
+        decoded = self._decoded
+        if decoded is None:
+            decoded = self._decoded = {}
+        elif "payload" in decoded:
+            return decoded["payload"]
+        payload = self._data.get("payload")
+        model = EVENT_MODELS.get(self.namespace)
+        if model is not None and isinstance(payload, dict):
+            payload = model(payload)
+        decoded["payload"] = payload
+        return payload
+
+
+class MemoryDedupeStore:
+    """Remember the IDs of the most recently handled events.
+
+    Only the `maxsize` most recent IDs are remembered. To share the store
+    between processes, implement the same `add` and `discard` methods on
+    top of a shared store.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, event_id):
+        """Remember `event_id`.
+
+        :return: False if it was already remembered, otherwise True.
+        """
+        with self._lock:
+            if event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                return False
+            self._ids[event_id] = None
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+            return True
+
+    def discard(self, event_id):
+        """Forget `event_id`, e.g. because handling it failed."""
+        with self._lock:
+            self._ids.pop(event_id, None)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __repr__(self):
+        return "<{0}: size={1}>".format(type(self).__name__, len(self))
+
+
+class WebhookHandler:
+    """Verify, deduplicate and dispatch notifications."""
+
+    def __init__(
+            self, secret, store=None, codec=None,
+            max_body_size=MAX_BODY_SIZE):
+        """
+        :param secret: The secret used to sign the notifications.
+        :param store: Optional. The store remembering the handled events,
+            defaults to a `MemoryDedupeStore`.
+        :param codec: Optional. Same as `Client`.
+        :param max_body_size: Optional. The largest body to accept.
+        """
+        if isinstance(secret, str):
+            secret = secret.encode()
+        # Keyed once, and copied for every notification.
+        self._hmac = hmac.new(secret, digestmod=hashlib.sha256)
+        self.store = MemoryDedupeStore() if store is None else store
+        self.codec = codec or get_default_codec()
+        self.max_body_size = max_body_size
+        self._handlers = {}
+
+    def on(self, event_type):
+        """Register a handler of the events of `event_type`.
+
+        Use `"*"` to handle all events. Used as a decorator, e.g.
+        `@handler.on("subscription.executed")`.
+        """
+        def decorator(func):
+            self._handlers.setdefault(event_type, []).append(func)
+            return func
+        return decorator
+
+    def sign(self, body):
+        """Return the signature of `body`."""
+        signer = self._hmac.copy()
+        signer.update(body)
+        return signer.hexdigest()
+
+    def verify(self, body, signature):
+        """Verify that `signature` was made for `body` with our secret.
+
+        :raise InvalidSignatureError: If the signature doesn't match.
+        """
+        if signature and signature.startswith("sha256="):
+            signature = signature[len("sha256="):]
+        # `compare_digest` raises a TypeError for non-ASCII strings.
+        if not signature or not signature.isascii() or \
+                not hmac.compare_digest(self.sign(body), signature):
+            raise InvalidSignatureError(
+                "The signature of the notification is invalid")
+
+    def parse(self, body):
+        """Decode the body of a notification into an `Event`.
+
+        :raise WebhookError: If the body isn't a JSON object.
+        """
+        try:
+            data = self.codec.decode(body)
+        except (TypeError, ValueError) as e:
+            raise WebhookError(
+                "The notification isn't valid JSON", data=body, exc=e)
+        if not isinstance(data, dict):
+            raise WebhookError(
+                "The notification isn't a JSON object", data=data)
+        return Event(data)
+
+    def handle(self, body, signature):
+        """Verify, deduplicate and dispatch a notification.
+
+        :param body: The raw body of the notification, as bytes.
+        :param signature: The value of the signature header.
+        :raise InvalidSignatureError: If the signature doesn't match.
+        :raise WebhookError: If the body couldn't be decoded.
+        :return: The dispatched `Event`, or None if it had already
+            been handled.
+        """
+        self.verify(body, signature)
+        event = self.parse(body)
+        event_id = event.event_id
+        if event_id is not None and not self.store.add(event_id):
+            logger.info("Skipping already handled event_id=%s", event_id)
+            return None
+        try:
+            for func in self._handlers.get(event.type, []) + \
+                    self._handlers.get("*", []):
+                func(event)
+        except Exception:
+            # Let the event be handled again when it's redelivered.
+            if event_id is not None:
+                self.store.discard(event_id)
+            raise
+        return event
+
+    def respond(self, body, signature):
+        """Handle a notification, returning the HTTP status to respond with.
+        """
+        try:
+            self.handle(body, signature)
+        except InvalidSignatureError:
+            logger.warning("Received a notification with an invalid signature")
+            return 401
+        except WebhookError:
+            logger.warning("Received an invalid notification")
+            return 400
+        except Exception:
+            logger.exception("Could not handle the notification")
+            return 500
+        return 204
+
+    def __call__(self, environ, start_response):
+        """Handle a notification as a WSGI application."""
+        if environ["REQUEST_METHOD"] != "POST":
+            code = 405
+        else:
+            try:
+                length = int(environ.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                code = 400
+            elif length > self.max_body_size:
+                code = 413
+            else:
+                header = "HTTP_" + SIGNATURE_HEADER.upper().replace("-", "_")
+                code = self.respond(
+                    environ["wsgi.input"].read(length), environ.get(header))
+        start_response(_REASONS[code], [("Content-Length", "0")])
+        return [b""]
+
+    async def asgi(self, scope, receive, send):
+        """Handle a notification as an ASGI application.
+
+        The handlers are called in a thread, so that they don't block
+        the event loop.
+        """
+        if scope["type"] != "http":
+            return
+        code = None
+        if scope["method"] != "POST":
+            code = 405
+        body = bytearray()
+        while code is None:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > self.max_body_size:
+                code = 413
+            elif not message.get("more_body"):
+                break
+        if code is None:
+            headers = dict(scope["headers"])
+            signature = headers.get(SIGNATURE_HEADER.lower().encode())
+            code = await asyncio.get_running_loop().run_in_executor(
+                None, self.respond, bytes(body),
+                signature.decode("latin-1") if signature else None)
+        await send({
+            "type": "http.response.start", "status": code,
+            "headers": [(b"content-length", b"0")]
+        })
+        await send({"type": "http.response.body", "body": b""})
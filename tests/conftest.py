@@ -5,6 +5,8 @@ import pytest
 
 from sweetpay import Client
 
+from .stub_server import StubServer, APIHandler
+
 
 @pytest.fixture()
 def creditcheck_version():
@@ -30,3 +32,42 @@ def client(subscription_version, creditcheck_version, checkout_session_version):
             "creditcheck": creditcheck_version,
             "checkout_session": checkout_session_version
         }, timeout=4)
+
+
+@pytest.fixture()
+def stub_server():
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def make_stub_client(stub_server):
+    clients = []
+
+    def make(**kwargs):
+        kwargs.setdefault("timeout", 4)
+        client = Client("stub-token", test=True, version={
+            "subscription": 1, "creditcheck": 2, "checkout_session": 1
+        }, **kwargs)
+        clients.append(client)
+        return stub_server.point(client)
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture()
+def api_server():
+    server = StubServer(APIHandler).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def api_client(api_server):
+    client = Client("stub-token", test=True, version={
+        "subscription": 1, "creditcheck": 2, "checkout_session": 1
+    }, timeout=4)
+    yield api_server.point(client)
+    client.close()
@@ -0,0 +1,427 @@
+"""A local stand-in for the Sweetpay APIs, used for offline tests.
+
+`StubHandler` answers every request with an OK status and echoes the
+request back, while `APIHandler` emulates the subscription (v1),
+creditcheck (v2) and checkout session (v1) APIs. The emulator can also
+be run on its own, e.g. for benchmarks:
+
+    python -m tests.stub_server --port 8000 --latency 0.01
+"""
+import argparse
+import itertools
+import json
+import re
+import socket
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sweetpay.constants import TEST_CREDIT_SSN, TEST_NOCREDIT_SSN
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every request with an OK status and echo the request.
+
+    Canned responses can be registered per path with `StubServer.reply`.
+    """
+
+    # Keep-alive requires HTTP/1.1.
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately, which would
+    # otherwise be delayed on kept-alive connections.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count_connection()
+
+    def do_GET(self):
+        self.dispatch(None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        self.dispatch(json.loads(body.decode()) if body else None)
+
+    def dispatch(self, body):
+        stub = self.server.stub
+        if stub.record:
+            stub.requests.append(
+                (self.command, self.path, dict(self.headers)))
+        if stub.latency:
+            time.sleep(stub.latency)
+        # Canned responses take precedence.
+        canned = stub.take_reply(self.path)
+        if canned:
+            return self.respond(*canned)
+        self.respond(*self.route(self.command, self.path, body))
+
+    def route(self, method, path, body):
+        """Return the HTTP status code and the data to respond with."""
+        return 200, {
+            "status": "OK",
+            "payload": {"path": path, "method": method, "body": body}
+        }
+
+    def respond(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        truncate = self.server.stub.truncate
+        if truncate is not None:
+            # Drop the connection partway through the body.
+            body = body[:truncate]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # Keep the test output clean.
+        pass
+
+
+class API:
+    """The state of the emulated APIs."""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.logs = {}
+        self.creditchecks = []
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def log(self, subscription_id, event):
+        self.logs[subscription_id].append({
+            "logId": next(self.ids), "subscriptionId": subscription_id,
+            "event": event, "createdAt": date.today().isoformat()
+        })
+
+
+class APIHandler(StubHandler):
+    """Emulate the Sweetpay APIs, keeping the resources in memory."""
+
+    ROUTES = [
+        ("POST", r"/subscription/create", "create_subscription"),
+        ("GET", r"/subscription/(\d+)/query", "query_subscription"),
+        ("POST", r"/subscription/(\d+)/update", "update_subscription"),
+        ("POST", r"/subscription/search", "search_subscriptions"),
+        ("GET", r"/subscription/(\d+)/log", "list_subscription_log"),
+        ("POST", r"/subscription/(\d+)/regret", "regret_subscription"),
+        ("POST", r"/creditcheck/check", "create_creditcheck"),
+        ("POST", r"/creditcheck/search", "search_creditchecks"),
+        ("POST", r"/checkout_session/session/create", "create_session"),
+    ]
+
+    def route(self, method, path, body):
+        stub = self.server.stub
+        if stub.tokens is not None and \
+                self.headers.get("Authorization") not in stub.tokens:
+            return 401, {"status": "UNAUTHORIZED"}
+        for route_method, pattern, name in self.ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match:
+                if method != route_method:
+                    return 405, {"status": "METHOD_NOT_ALLOWED"}
+                with stub.api.lock:
+                    return getattr(self, name)(
+                        stub.api, body or {}, *map(int, match.groups()))
+        return 404, {"status": "NOT_FOUND"}
+
+    @staticmethod
+    def ok(payload):
+        return 200, {"status": "OK", "payload": payload}
+
+    def create_subscription(self, api, body):
+        for field in ("amount", "currency", "interval", "ssn"):
+            if field not in body:
+                return 400, {"status": "Missing {0}.".format(field)}
+        if body["interval"] not in ("WEEKLY", "MONTHLY", "YEARLY"):
+            return 422, {"status": "INVALID_PARAMETER"}
+        subscription_id = next(api.ids)
+        subscription = dict(body, subscriptionId=subscription_id)
+        subscription.pop("ssn")
+        subscription.setdefault("startsAt", date.today().isoformat())
+        subscription.update({
+            "state": "ACTIVE", "customer": {
+                "ssn": body["ssn"],
+                "address": {"country": body.get("country")}
+            }
+        })
+        api.subscriptions[subscription_id] = subscription
+        api.logs[subscription_id] = []
+        api.log(subscription_id, "CREATED")
+        return self.ok(subscription)
+
+    def query_subscription(self, api, body, subscription_id):
+        if subscription_id not in api.subscriptions:
+            return 404, {"status": "NOT_FOUND"}
+        return self.ok(api.subscriptions[subscription_id])
+
+    def update_subscription(self, api, body, subscription_id):
+        subscription = api.subscriptions.get(subscription_id)
+        if subscription is None:
+            return 404, {"status": "NOT_FOUND"}
+        if subscription["state"] != "ACTIVE":
+            return 200, {"status": "NOT_MODIFIABLE"}
+        subscription.update(body)
+        api.log(subscription_id, "UPDATED")
+        return self.ok(subscription)
+
+    def search_subscriptions(self, api, body):
+        if not body:
+            return 400, {"status": "INVALID_JSON"}
+        return self.ok([
+            subscription for subscription in api.subscriptions.values()
+            if all(subscription.get(key) == value
+                   for key, value in body.items())])
+
+    def list_subscription_log(self, api, body, subscription_id):
+        if subscription_id not in api.logs:
+            return 404, {"status": "NOT_FOUND"}
+        return self.ok(api.logs[subscription_id])
+
+    def regret_subscription(self, api, body, subscription_id):
+        subscription = api.subscriptions.get(subscription_id)
+        if subscription is None:
+            return 404, {"status": "NOT_FOUND"}
+        subscription["state"] = "REGRETTED"
+        api.log(subscription_id, "REGRETTED")
+        return self.ok(subscription)
+
+    def create_creditcheck(self, api, body):
+        if "ssn" not in body:
+            return 422, {"status": "INVALID_PARAMETER"}
+        if body["ssn"] not in (TEST_CREDIT_SSN, TEST_NOCREDIT_SSN):
+            return 500, {"status": "INTERNAL_ERROR"}
+        check = {
+            "creditcheckId": next(api.ids), "ssn": body["ssn"],
+            "approved": body["ssn"] == TEST_CREDIT_SSN
+        }
+        api.creditchecks.append(check)
+        if not check["approved"]:
+            return 200, {"status": "NOT_ENOUGH_CREDIT", "payload": check}
+        return self.ok(check)
+
+    def search_creditchecks(self, api, body):
+        return self.ok([
+            check for check in api.creditchecks
+            if check["ssn"] == body.get("ssn")])
+
+    def create_session(self, api, body):
+        if "merchantId" not in body:
+            return 400, {"status": "Missing merchantId."}
+        session_id = next(api.ids)
+        return self.ok({
+            "sessionId": session_id,
+            "url": "https://checkout.stage.paylevo.com/{0}".format(session_id)
+        })
+
+
+class StubServer:
+    """Run a stub server in a background thread."""
+
+    def __init__(
+            self, handler=StubHandler, latency=0, tokens=None, record=True,
+            port=0):
+        """
+        :param handler: The request handler class.
+        :param latency: The number of seconds to wait before responding.
+        :param tokens: Optional. The API tokens to accept, all other
+            tokens are unauthorized. Defaults to accepting any token.
+        :param record: Whether to record the requests in `requests`.
+        :param port: The port to listen on, defaults to any free port.
+        """
+        self.connections = 0
+        self.responses = {}
+        self.requests = []
+        self.latency = latency
+        self.tokens = tokens
+        self.record = record
+        # The number of bytes of each body to send before dropping the
+        # connection, defaults to the whole body.
+        self.truncate = None
+        self.api = API()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return "http://{0}:{1}".format(host, port)
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def reply(self, path, code, data, times=None):
+        """Answer requests to `path` with `code` and the JSON `data`.
+
+        If `times` is given, only that many requests are answered.
+        """
+        self.responses[path] = [code, data, times]
+
+    def take_reply(self, path):
+        with self._lock:
+            reply = self.responses.get(path)
+            if reply is None:
+                return None
+            code, data, times = reply
+            if times is not None:
+                reply[2] -= 1
+                if reply[2] <= 0:
+                    del self.responses[path]
+            return code, data
+
+    def start(self):
+        # Poll often, so that the server can be stopped quickly.
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.01,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def point(self, client):
+        """Make all resources of `client` send requests to this server."""
+        return point(client, self.url)
+
+
+class H2StubServer:
+    """Answer HTTP/2 requests like `StubHandler`, without TLS.
+
+    Every connection is served by its own thread, and the streams on it
+    are answered concurrently after `latency` seconds.
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.connections = 0
+        self.requests = []
+        self.active_streams = 0
+        self.max_active_streams = 0
+        self._lock = threading.Lock()
+        self._sockets = []
+        self._server = socket.create_server(("127.0.0.1", 0))
+
+    @property
+    def url(self):
+        host, port = self._server.getsockname()
+        return "http://{0}:{1}".format(host, port)
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.close()
+        for sock in self._sockets:
+            sock.close()
+
+    def point(self, client):
+        """Make all resources of `client` send requests to this server."""
+        return point(client, self.url)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections += 1
+                self._sockets.append(sock)
+            threading.Thread(
+                target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        import h2.config
+        import h2.connection
+        import h2.events
+        import h2.settings
+
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(
+            client_side=False, header_encoding="utf-8"))
+        conn.initiate_connection()
+        conn.update_settings(
+            {h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1000})
+        lock = threading.Lock()
+        streams = {}
+        sock.sendall(conn.data_to_send())
+        while True:
+            try:
+                data = sock.recv(65535)
+            except OSError:
+                return
+            if not data:
+                return
+            with lock:
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        streams[event.stream_id] = (
+                            dict(event.headers), bytearray())
+                        self._count_stream(1)
+                    elif isinstance(event, h2.events.DataReceived):
+                        streams[event.stream_id][1].extend(event.data)
+                        conn.acknowledge_received_data(
+                            event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        headers, body = streams.pop(event.stream_id)
+                        threading.Timer(
+                            self.latency, self._respond,
+                            (sock, conn, lock, event.stream_id, headers,
+                             bytes(body))).start()
+                sock.sendall(conn.data_to_send())
+
+    def _count_stream(self, change):
+        with self._lock:
+            self.active_streams += change
+            self.max_active_streams = max(
+                self.max_active_streams, self.active_streams)
+
+    def _respond(self, sock, conn, lock, stream_id, headers, body):
+        self.requests.append((headers[":method"], headers[":path"], headers))
+        data = json.dumps({"status": "OK", "payload": {
+            "path": headers[":path"], "method": headers[":method"],
+            "body": json.loads(body.decode()) if body else None
+        }}).encode()
+        self._count_stream(-1)
+        with lock:
+            conn.send_headers(stream_id, [
+                (":status", "200"), ("content-type", "application/json"),
+                ("content-length", str(len(data)))])
+            conn.send_data(stream_id, data, end_stream=True)
+            try:
+                sock.sendall(conn.data_to_send())
+            except OSError:
+                pass
+
+
+def point(client, url):
+    """Make all resources of `client` send requests to `url`."""
+    for namespace in client.version:
+        resource = getattr(client, namespace)
+        resource._test_url = "{0}/{1}".format(url, namespace)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0)
+    args = parser.parse_args()
+    server = StubServer(
+        APIHandler, latency=args.latency, record=False, port=args.port)
+    # Let the caller know where we are listening, e.g. when port is 0.
+    print(server.url, flush=True)
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Tests for the asyncio client, run against a local stub server."""
+import asyncio
+import time
+from functools import partial
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from sweetpay.aio import AsyncClient  # noqa: E402
+from sweetpay.deadline import deadline  # noqa: E402
+from sweetpay.errors import NotFoundError, TimeoutError  # noqa: E402
+from sweetpay.ratelimit import RateLimiter  # noqa: E402
+from sweetpay.singleflight import SingleFlight  # noqa: E402
+
+
+@pytest.fixture()
+def async_client(stub_server):
+    client = AsyncClient("stub-token", test=True, version={
+        "subscription": 1, "creditcheck": 2, "checkout_session": 1
+    }, timeout=4, pool_size=4)
+    return stub_server.point(client)
+
+
+def run(client, coro):
+    async def main():
+        async with client:
+            return await coro
+    return asyncio.run(main())
+
+
+class TestAsyncClient:
+
+    def test_query(self, async_client):
+        # Execute
+        data = run(async_client, async_client.subscription.query(1))
+
+        # Verify
+        assert data["payload"]["path"] == "/subscription/1/query"
+
+    def test_create_encodes_params(self, async_client):
+        # Execute
+        data = run(async_client, async_client.checkout_session.create(
+            merchantId="sweetpay-demo", country="SE"))
+
+        # Verify
+        assert data["payload"]["body"] == {
+            "merchantId": "sweetpay-demo", "country": "SE"}
+
+    def test_regret_without_body(self, async_client):
+        # Execute
+        data = run(async_client, async_client.subscription.regret(1))
+
+        # Verify
+        assert data["payload"]["method"] == "POST"
+
+    def test_errors_are_mapped(self, stub_server, async_client):
+        # Setup
+        stub_server.reply(
+            "/subscription/1/query", 404, {"status": "NOT_FOUND"})
+
+        # Execute
+        with pytest.raises(NotFoundError) as excinfo:
+            run(async_client, async_client.subscription.query(1))
+
+        # Verify
+        assert excinfo.value.status == "NOT_FOUND"
+
+    def test_concurrent_calls_share_the_pool(self, stub_server, async_client):
+        # Execute
+        async def gather():
+            return await asyncio.gather(*[
+                async_client.subscription.query(i) for i in range(50)])
+        results = run(async_client, gather())
+
+        # Verify
+        assert len(results) == 50
+        assert stub_server.connections <= 4
+
+    def test_query_many(self, stub_server, async_client):
+        # Setup
+        stub_server.reply(
+            "/subscription/3/query", 404, {"status": "NOT_FOUND"})
+
+        # Execute
+        async def collect():
+            resource = async_client.subscription
+            return [item async for item in resource.query_many(
+                range(1, 6), concurrency=2, ordered=True)]
+        results = run(async_client, collect())
+
+        # Verify
+        assert [key for key, result in results] == [1, 2, 3, 4, 5]
+        assert isinstance(results[2][1], NotFoundError)
+        assert results[0][1]["payload"]["path"] == "/subscription/1/query"
+
+    def test_update_many_and_batch(self, async_client):
+        # Execute
+        async def collect():
+            updated = [
+                item async for item in async_client.subscription.update_many(
+                    [(1, {"maxExecutions": 2})])]
+            batched = [item async for item in async_client.batch([
+                partial(async_client.subscription.query, 1),
+                partial(async_client.subscription.regret, 2)])]
+            return updated, batched
+        updated, batched = run(async_client, collect())
+
+        # Verify
+        assert updated[0][1]["payload"]["body"] == {"maxExecutions": 2}
+        assert sorted(index for index, result in batched) == [0, 1]
+
+    def test_iter_search(self, stub_server, async_client):
+        # Setup
+        payload = [{"subscriptionId": i} for i in range(3)]
+        stub_server.reply(
+            "/subscription/search", 200, {"status": "OK", "payload": payload})
+
+        # Execute
+        async def collect():
+            return [item async for item in
+                    async_client.subscription.iter_search(country="SE")]
+        items = run(async_client, collect())
+
+        # Verify
+        assert items == payload
+
+    def test_rate_limited(self, stub_server):
+        # Setup
+        client = stub_server.point(AsyncClient(
+            "stub-token", test=True, version={"subscription": 1},
+            rate_limiter=RateLimiter({"*": 50}, burst=1)))
+
+        # Execute
+        async def gather():
+            return await asyncio.gather(*[
+                client.subscription.query(i) for i in range(4)])
+        start = time.monotonic()
+        run(client, gather())
+
+        # Verify
+        assert time.monotonic() - start >= 0.06
+
+    def test_cancelled_wait_returns_the_token(self, stub_server):
+        # Setup
+        limiter = RateLimiter({"*": 1}, burst=1)
+        client = stub_server.point(AsyncClient(
+            "stub-token", test=True, version={"subscription": 1},
+            rate_limiter=limiter))
+
+        # Execute
+        async def cancel():
+            await client.subscription.query(1)
+            tokens = limiter.get_bucket("subscription").tokens
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.subscription.query(1), 0.05)
+            return tokens
+        tokens = run(client, cancel())
+
+        # Verify
+        assert limiter.get_bucket("subscription").tokens == \
+            pytest.approx(tokens, abs=0.2)
+        assert len(stub_server.requests) == 1
+
+    def test_single_flight(self, stub_server):
+        # Setup
+        stub_server.latency = 0.05
+        single_flight = SingleFlight()
+        client = stub_server.point(AsyncClient(
+            "stub-token", test=True, version={"subscription": 1},
+            single_flight=single_flight))
+
+        # Execute
+        async def gather():
+            return await asyncio.gather(*[
+                client.subscription.query(1) for _ in range(10)])
+        results = run(client, gather())
+
+        # Verify
+        assert len(stub_server.requests) == 1
+        assert single_flight.collapsed == 9
+        assert results[0] == results[9] and results[0] is not results[9]
+
+    def test_deadline(self, stub_server):
+        # Setup
+        stub_server.latency = 0.5
+        client = stub_server.point(AsyncClient(
+            "stub-token", test=True, version={"subscription": 1},
+            timeout=(1, 2)))
+
+        # Execute
+        async def query():
+            with deadline(0.1):
+                return await client.subscription.query(1)
+        with pytest.raises(TimeoutError) as excinfo:
+            run(client, query())
+
+        # Verify
+        assert excinfo.value.remaining < 0.05
@@ -0,0 +1,120 @@
+"""Tests for running operations in batches."""
+import itertools
+import time
+from functools import partial
+
+import pytest
+
+from sweetpay.batch import iter_batch
+from sweetpay.errors import NotFoundError, SweetpayError
+
+
+def sleep_and_return(value, delay):
+    time.sleep(delay)
+    return value
+
+
+class TestIterBatch:
+
+    def test_ordered(self):
+        # Setup: The first calls finish last
+        calls = [
+            (i, partial(sleep_and_return, i, 0.05 - i * 0.01))
+            for i in range(5)]
+
+        # Execute
+        results = list(iter_batch(calls, concurrency=5, ordered=True))
+
+        # Verify
+        assert results == [(i, i) for i in range(5)]
+
+    def test_unordered_yields_as_finished(self):
+        # Setup
+        calls = [
+            (i, partial(sleep_and_return, i, 0.05 - i * 0.01))
+            for i in range(5)]
+
+        # Execute
+        results = list(iter_batch(calls, concurrency=5))
+
+        # Verify
+        assert results == [(i, i) for i in reversed(range(5))]
+
+    def test_errors_do_not_abort_the_batch(self):
+        # Setup
+        def fail():
+            raise SweetpayError("Failed")
+        calls = [(0, fail), (1, partial(sleep_and_return, 1, 0))]
+
+        # Execute
+        results = dict(iter_batch(calls, concurrency=2))
+
+        # Verify
+        assert isinstance(results[0], SweetpayError)
+        assert results[1] == 1
+
+    def test_other_errors_are_raised(self):
+        # Setup
+        def fail():
+            raise ValueError
+
+        # Verify
+        with pytest.raises(ValueError):
+            # Execute
+            list(iter_batch([(0, fail)]))
+
+    def test_calls_are_read_lazily(self):
+        # Setup
+        calls = (
+            (i, partial(sleep_and_return, i, 0)) for i in itertools.count())
+
+        # Execute
+        results = list(itertools.islice(iter_batch(calls, concurrency=2), 10))
+
+        # Verify
+        assert len(results) == 10
+
+
+class TestClientBatch:
+
+    def test_query_many(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(pool_size=4)
+        stub_server.reply(
+            "/subscription/3/query", 404, {"status": "NOT_FOUND"})
+
+        # Execute
+        results = list(client.subscription.query_many(
+            range(10), concurrency=4, ordered=True))
+
+        # Verify
+        assert [subscription_id for subscription_id, _ in results] == list(
+            range(10))
+        assert isinstance(results[3][1], NotFoundError)
+        assert results[4][1]["payload"]["path"] == "/subscription/4/query"
+
+    def test_update_many(self, make_stub_client):
+        # Setup
+        client = make_stub_client()
+
+        # Execute
+        results = dict(client.subscription.update_many(
+            [(1, {"maxExecutions": 2}), (2, {"maxExecutions": 3})]))
+
+        # Verify
+        assert results[1]["payload"]["body"] == {"maxExecutions": 2}
+        assert results[2]["payload"]["body"] == {"maxExecutions": 3}
+
+    def test_batch(self, make_stub_client):
+        # Setup
+        client = make_stub_client()
+
+        # Execute
+        results = list(client.batch([
+            partial(client.subscription.query, 1),
+            partial(client.creditcheck.search, ssn="19500101-0002"),
+        ], ordered=True))
+
+        # Verify
+        assert results[0][1]["payload"]["path"] == "/subscription/1/query"
+        assert results[1][1]["payload"]["path"] == "/creditcheck/search"
@@ -0,0 +1,153 @@
+"""Tests for caching responses."""
+import time
+
+import pytest
+
+from sweetpay.cache import ResponseCache
+
+
+class TestResponseCache:
+
+    def test_get_and_set(self):
+        # Setup
+        cache = ResponseCache()
+        cache.set("key", {"status": "OK"}, ttl=10)
+
+        # Execute
+        value = cache.get("key")
+
+        # Verify
+        assert value == {"status": "OK"}
+        assert cache.get("other") is None
+        assert cache.stats() == {
+            "hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+    def test_values_are_copied(self):
+        # Setup
+        cache = ResponseCache()
+        value = {"payload": {"state": "ACTIVE"}}
+        cache.set("key", value, ttl=10)
+
+        # Execute
+        value["payload"]["state"] = "CHANGED"
+        cache.get("key")["payload"]["state"] = "CHANGED"
+
+        # Verify
+        assert cache.get("key") == {"payload": {"state": "ACTIVE"}}
+
+    def test_expires(self):
+        # Setup
+        cache = ResponseCache()
+        cache.set("key", {}, ttl=0.01)
+
+        # Execute
+        time.sleep(0.02)
+
+        # Verify
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        # Setup
+        cache = ResponseCache(maxsize=2)
+        cache.set("a", 1, ttl=10)
+        cache.set("b", 2, ttl=10)
+        cache.get("a")
+
+        # Execute
+        cache.set("c", 3, ttl=10)
+
+        # Verify
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_by_tag(self):
+        # Setup
+        cache = ResponseCache()
+        cache.set("a", 1, ttl=10, tag="x")
+        cache.set("b", 2, ttl=10, tag="x")
+        cache.set("c", 3, ttl=10, tag="y")
+
+        # Execute
+        cache.invalidate("x")
+
+        # Verify
+        assert cache.get("a") is None and cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+@pytest.fixture()
+def cache():
+    return ResponseCache()
+
+
+class TestClientCache:
+
+    def test_read_operations_are_cached(
+            self, stub_server, make_stub_client, cache):
+        # Execute
+        client = make_stub_client(cache=cache)
+        for _ in range(3):
+            client.subscription.query(1)
+            client.subscription.list_log(1)
+            client.creditcheck.search(ssn="19500101-0002")
+
+        # Verify
+        assert len(stub_server.requests) == 3
+        assert cache.stats()["hits"] == 6
+
+    def test_different_arguments_are_not_shared(
+            self, stub_server, make_stub_client, cache):
+        # Execute
+        client = make_stub_client(cache=cache)
+        client.subscription.query(1)
+        client.subscription.query(2)
+        client.subscription.search(country="SE")
+        client.subscription.search(country="NO")
+
+        # Verify
+        assert len(stub_server.requests) == 4
+
+    def test_mutations_are_not_cached(
+            self, stub_server, make_stub_client, cache):
+        # Execute
+        client = make_stub_client(cache=cache)
+        client.subscription.update(1, maxExecutions=2)
+        client.subscription.update(1, maxExecutions=2)
+
+        # Verify
+        assert len(stub_server.requests) == 2
+
+    def test_mutations_invalidate(self, stub_server, make_stub_client, cache):
+        # Setup
+        client = make_stub_client(cache=cache)
+        client.subscription.query(1)
+        client.subscription.query(2)
+        client.subscription.search(country="SE")
+
+        # Execute
+        client.subscription.regret("1")
+        client.subscription.query(1)
+        client.subscription.query(2)
+        client.subscription.search(country="SE")
+
+        # Verify
+        paths = [path for _, path, _ in stub_server.requests]
+        assert paths[3:] == [
+            "/subscription/1/regret", "/subscription/1/query",
+            "/subscription/search"]
+
+    def test_errors_are_not_cached(
+            self, stub_server, make_stub_client, cache):
+        # Setup
+        client = make_stub_client(cache=cache)
+        stub_server.reply("/subscription/1/query", 503, {}, times=1)
+        with pytest.raises(Exception):
+            client.subscription.query(1)
+
+        # Execute
+        data = client.subscription.query(1)
+
+        # Verify
+        assert data["status"] == "OK"
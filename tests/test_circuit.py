@@ -0,0 +1,171 @@
+"""Tests for the circuit breaker."""
+import asyncio
+
+import pytest
+
+from sweetpay.circuit import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from sweetpay.errors import CircuitOpenError, InternalServerError, \
+    NotFoundError
+
+
+def fail(exc=InternalServerError):
+    def func():
+        raise exc()
+    return func
+
+
+def succeed():
+    return "OK"
+
+
+@pytest.fixture()
+def changes():
+    return []
+
+
+@pytest.fixture()
+def breaker(changes):
+    return CircuitBreaker(
+        failure_rate=0.5, window=4, min_calls=4, reset_timeout=0,
+        on_state_change=lambda *change: changes.append(change))
+
+
+def trip(breaker, namespace="subscription"):
+    for _ in range(4):
+        with pytest.raises(InternalServerError):
+            breaker.call(namespace, fail())
+
+
+class TestCircuitBreaker:
+
+    def test_opens_at_failure_rate(self, breaker, changes):
+        # Execute
+        breaker.call("subscription", succeed)
+        breaker.call("subscription", succeed)
+        for _ in range(2):
+            with pytest.raises(InternalServerError):
+                breaker.call("subscription", fail())
+
+        # Verify
+        assert changes == [("subscription", CLOSED, OPEN)]
+
+    def test_other_errors_are_not_failures(self, breaker):
+        # Execute
+        for _ in range(4):
+            with pytest.raises(NotFoundError):
+                breaker.call("subscription", fail(NotFoundError))
+
+        # Verify
+        assert breaker.state("subscription") == CLOSED
+
+    def test_open_circuit_fails_fast(self, breaker):
+        # Setup
+        breaker.reset_timeout = 60
+        trip(breaker)
+        calls = []
+
+        # Execute
+        with pytest.raises(CircuitOpenError):
+            breaker.call("subscription", lambda: calls.append(1))
+
+        # Verify
+        assert calls == []
+        assert breaker.stats()["subscription"]["rejected"] == 1
+
+    def test_circuits_are_per_namespace(self, breaker):
+        # Setup
+        breaker.reset_timeout = 60
+        trip(breaker)
+
+        # Execute
+        result = breaker.call("creditcheck", succeed)
+
+        # Verify
+        assert result == "OK"
+        assert breaker.state("subscription") == OPEN
+        assert breaker.state("creditcheck") == CLOSED
+
+    def test_successful_probe_closes(self, breaker, changes):
+        # Setup
+        trip(breaker)
+
+        # Execute
+        assert breaker.state("subscription") == HALF_OPEN
+        breaker.call("subscription", succeed)
+
+        # Verify
+        assert changes == [
+            ("subscription", CLOSED, OPEN), ("subscription", OPEN, HALF_OPEN),
+            ("subscription", HALF_OPEN, CLOSED)]
+
+    def test_failed_probe_opens(self, breaker):
+        # Setup
+        trip(breaker)
+
+        # Execute
+        with pytest.raises(InternalServerError):
+            breaker.call("subscription", fail())
+
+        # Verify
+        breaker.reset_timeout = 60
+        assert breaker.state("subscription") == OPEN
+
+    def test_only_one_probe_at_a_time(self, breaker):
+        # Setup
+        trip(breaker)
+        breaker.before_call("subscription")
+
+        # Verify
+        with pytest.raises(CircuitOpenError):
+            # Execute
+            breaker.before_call("subscription")
+
+
+class TestClientCircuitBreaker:
+
+    def test_fails_fast_when_open(self, stub_server, make_stub_client):
+        # Setup
+        breaker = CircuitBreaker(window=2, min_calls=2, reset_timeout=60)
+        client = make_stub_client(circuit_breaker=breaker)
+        stub_server.reply("/subscription/1/query", 503, {})
+        for _ in range(2):
+            with pytest.raises(Exception):
+                client.subscription.query(1)
+
+        # Execute
+        with pytest.raises(CircuitOpenError):
+            client.subscription.query(1)
+
+        # Verify
+        assert len(stub_server.requests) == 2
+        assert client.creditcheck.search(ssn="1")["status"] == "OK"
+
+    def test_cancelled_probe_is_released(self, breaker):
+        # Setup
+        trip(breaker)
+
+        async def cancelled():
+            raise asyncio.CancelledError()
+
+        # Execute
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(breaker.call_async("subscription", cancelled))
+
+        # Verify
+        assert breaker.state("subscription") == HALF_OPEN
+        assert breaker.call("subscription", succeed) == "OK"
+        assert breaker.state("subscription") == CLOSED
+
+    def test_callback_may_read_the_state(self, changes):
+        # Setup
+        def on_state_change(namespace, old, new):
+            changes.append(breaker.stats()[namespace]["state"])
+        breaker = CircuitBreaker(
+            window=4, min_calls=4, reset_timeout=60,
+            on_state_change=on_state_change)
+
+        # Execute
+        trip(breaker)
+
+        # Verify
+        assert changes == [OPEN]
@@ -0,0 +1,104 @@
+"""Tests for the JSON codecs."""
+import datetime
+import json
+import math
+from decimal import Decimal
+
+import pytest
+
+from sweetpay.codec import JSONCodec, OrjsonCodec, SweetpayJSONEncoder, \
+    get_default_codec, orjson
+from sweetpay.connector import Connector
+
+CODECS = [JSONCodec]
+if orjson is not None:
+    CODECS.append(OrjsonCodec)
+
+
+@pytest.fixture(params=CODECS)
+def codec(request):
+    return request.param()
+
+
+class TestCodec:
+
+    def test_custom_types(self, codec):
+        # Setup
+        data = {
+            "amount": Decimal("10.50"), "startsAt": datetime.date(2017, 1, 2),
+            "createdAt": datetime.datetime(2017, 1, 2, 3, 4, 5, 6),
+            "customer": {"ssn": "19500101-0002", "name": "Åsa"}, "count": 1
+        }
+
+        # Execute
+        encoded = codec.encode(data)
+
+        # Verify
+        assert json.loads(encoded) == {
+            "amount": "10.50", "startsAt": "2017-01-02",
+            "createdAt": "2017-01-02T03:04:05.000006",
+            "customer": {"ssn": "19500101-0002", "name": "Åsa"}, "count": 1
+        }
+
+    def test_same_as_stdlib(self, codec):
+        # Setup
+        data = {1: [1.5, 2 ** 70, None, True], "tz": datetime.datetime(
+            2017, 1, 2, tzinfo=datetime.timezone.utc)}
+
+        # Execute
+        encoded = codec.encode(data)
+
+        # Verify
+        assert json.loads(encoded) == json.loads(
+            SweetpayJSONEncoder().encode(data))
+
+    def test_non_finite_floats_as_stdlib(self, codec):
+        # Setup
+        data = {"limits": [float("inf"), -float("inf"), None],
+                "nan": float("nan")}
+
+        # Execute
+        encoded = codec.encode(data)
+
+        # Verify
+        decoded = json.loads(encoded)
+        assert math.isnan(decoded.pop("nan"))
+        assert decoded == {"limits": [float("inf"), -float("inf"), None]}
+
+    def test_unsupported_type(self, codec):
+        # Verify
+        with pytest.raises(TypeError):
+            # Execute
+            codec.encode({"value": object()})
+
+    def test_decode(self, codec):
+        # Execute
+        data = codec.decode('{"payload": [1, 2.5, "a", 1%s]}' % ("0" * 20))
+
+        # Verify
+        assert data == {"payload": [1, 2.5, "a", 10 ** 20]}
+
+
+class TestConnectorCodec:
+
+    def test_default_codec(self):
+        # Execute
+        connector = Connector("token", test=True, timeout=1)
+
+        # Verify
+        assert type(connector.codec) is type(get_default_codec())
+
+    def test_overridden_json_encoder_is_used(self):
+        # Setup
+        class Encoder(SweetpayJSONEncoder):
+            pass
+
+        class CustomConnector(Connector):
+            def get_json_encoder(self):
+                return Encoder()
+
+        # Execute
+        connector = CustomConnector("token", test=True, timeout=1)
+
+        # Verify
+        assert isinstance(connector.codec.encoder, Encoder)
@@ -0,0 +1,79 @@
+"""Tests for the connector, run against a local stub server."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+class TestConnectionPooling:
+
+    def test_new_connection_per_request_by_default(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+
+        # Execute
+        for subscription_id in range(5):
+            client.subscription.query(subscription_id)
+
+        # Verify
+        assert stub_server.connections == 5
+
+    def test_pooled_connections_are_reused(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(pool_size=2)
+
+        # Execute
+        for subscription_id in range(5):
+            data = client.subscription.query(subscription_id)
+
+        # Verify
+        assert stub_server.connections == 1
+        assert data["payload"]["path"] == "/subscription/4/query"
+
+    def test_pooled_connections_are_thread_safe(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(pool_size=4)
+
+        # Execute
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(
+                client.subscription.query, range(40)))
+
+        # Verify
+        assert [data["payload"]["path"] for data in results] == [
+            "/subscription/{0}/query".format(i) for i in range(40)]
+        assert stub_server.connections <= 4
+
+
+class TestEndpointURLs:
+
+    def test_urls_match_build_url(self, client):
+        # Setup
+        resource = client.subscription
+
+        # Execute
+        urls = [resource._get_url("create"), resource._get_url("query", 12)]
+
+        # Verify
+        assert urls == [
+            resource._build_url("create"), resource._build_url("12", "query")]
+
+    def test_urls_follow_base_url(self, client):
+        # Setup
+        resource = client.creditcheck
+        resource._get_url("create")
+
+        # Execute
+        resource._test_url = "http://localhost/creditcheck/"
+
+        # Verify
+        assert resource._get_url("create") == \
+            "http://localhost/creditcheck/check"
+
+    def test_headers_are_immutable(self, client):
+        # Verify
+        with pytest.raises(TypeError):
+            # Execute
+            client.subscription.client.headers["Authorization"] = "other"
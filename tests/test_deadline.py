@@ -0,0 +1,187 @@
+"""Tests for the timeouts and deadlines of operations."""
+import asyncio
+import time
+
+import pytest
+
+from sweetpay.deadline import deadline, get_remaining, get_request_timeout
+from sweetpay.errors import TimeoutError, UnderMaintenanceError
+from sweetpay.ratelimit import RateLimiter
+from sweetpay.retry import RetryPolicy
+
+
+class TestDeadline:
+
+    def test_no_deadline(self):
+        # Verify
+        assert get_remaining() is None
+        assert get_request_timeout((1, 5)) == (1, 5)
+
+    def test_timeout_is_cut(self):
+        # Execute
+        with deadline(2):
+            timeouts = [get_request_timeout(5), get_request_timeout((1, 5))]
+
+        # Verify
+        assert 1.9 < timeouts[0] <= 2
+        assert timeouts[1][0] == 1 and 1.9 < timeouts[1][1] <= 2
+
+    def test_nested_deadline_cant_extend(self):
+        # Execute
+        with deadline(1):
+            with deadline(10):
+                remaining = get_remaining()
+
+        # Verify
+        assert remaining <= 1
+        assert get_remaining() is None
+
+    def test_passed_deadline(self):
+        # Execute
+        with deadline(0):
+            with pytest.raises(TimeoutError) as excinfo:
+                get_request_timeout(5)
+
+        # Verify
+        assert excinfo.value.remaining <= 0
+
+    def test_propagated_to_tasks(self):
+        # Setup
+        async def remaining():
+            return get_remaining()
+
+        async def main():
+            with deadline(1):
+                return await asyncio.gather(remaining(), remaining())
+
+        # Execute
+        results = asyncio.run(main())
+
+        # Verify
+        assert all(0 < result <= 1 for result in results)
+
+
+class TestOperationTimeouts:
+
+    def test_deadline_cuts_the_request(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.latency = 0.5
+        client = make_stub_client()
+
+        # Execute
+        start = time.monotonic()
+        with deadline(0.1):
+            with pytest.raises(TimeoutError) as excinfo:
+                client.subscription.query(1)
+
+        # Verify
+        assert time.monotonic() - start < 0.4
+        assert excinfo.value.remaining < 0.05
+
+    def test_no_request_after_the_deadline(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+
+        # Execute
+        with deadline(0):
+            with pytest.raises(TimeoutError):
+                client.subscription.query(1)
+
+        # Verify
+        assert stub_server.requests == []
+
+    def test_rate_limit_fails_fast(self, stub_server, make_stub_client):
+        # Setup
+        limiter = RateLimiter({"*": 0.5}, burst=1)
+        client = make_stub_client(rate_limiter=limiter)
+        client.subscription.query(1)
+        bucket = limiter.get_bucket("subscription")
+        tokens = bucket.tokens
+
+        # Execute
+        start = time.monotonic()
+        for _ in range(5):
+            with deadline(0.3):
+                with pytest.raises(TimeoutError):
+                    client.subscription.query(1)
+
+        # Verify
+        assert time.monotonic() - start < 0.1
+        assert len(stub_server.requests) == 1
+        # The rejected calls didn't keep their tokens.
+        assert bucket.tokens == pytest.approx(tokens, abs=0.1)
+
+    def test_rate_limit_wait_cuts_the_timeout(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(
+            rate_limiter=RateLimiter({"*": 5}, burst=1))
+        client.subscription.query(1)
+        stub_server.latency = 0.5
+
+        # Execute
+        start = time.monotonic()
+        with deadline(0.4):
+            with pytest.raises(TimeoutError):
+                client.subscription.query(1)
+
+        # Verify
+        assert time.monotonic() - start < 0.5
+
+    def test_per_operation_timeouts(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.latency = 0.2
+        client = make_stub_client(timeouts={
+            "subscription.query": 0.05, "subscription": 2,
+            "creditcheck": (1, 0.05)})
+
+        # Execute
+        with pytest.raises(TimeoutError):
+            client.subscription.query(1)
+        with pytest.raises(TimeoutError):
+            client.creditcheck.search(ssn="19500101-0002")
+        data = client.subscription.list_log(1)
+
+        # Verify
+        assert data["status"] == "OK"
+
+    def test_connect_and_read_timeouts(self, make_stub_client):
+        # Setup
+        client = make_stub_client(timeout=(1, 2))
+
+        # Execute
+        data = client.subscription.query(1)
+
+        # Verify
+        assert data["status"] == "OK"
+
+    def test_no_retry_past_the_deadline(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.reply(
+            "/subscription/1/query", 503, {"status": "MAINTENANCE"})
+        client = make_stub_client(retry=RetryPolicy(
+            max_attempts=5, backoff=0.2, jitter=False))
+
+        # Execute
+        start = time.monotonic()
+        with deadline(0.3):
+            with pytest.raises(UnderMaintenanceError) as excinfo:
+                client.subscription.query(1)
+
+        # Verify
+        assert excinfo.value.attempts == 2
+        assert time.monotonic() - start < 0.3
+
+    def test_propagated_to_batches(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.latency = 0.5
+        client = make_stub_client()
+
+        # Execute
+        with deadline(0.1):
+            results = dict(client.subscription.query_many(range(4)))
+
+        # Verify
+        assert all(isinstance(result, TimeoutError)
+                   for result in results.values())
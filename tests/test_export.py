@@ -0,0 +1,147 @@
+"""Tests for the bulk export of subscriptions and logs."""
+import csv
+import json
+
+import pytest
+
+from sweetpay.__main__ import create_parser, export
+from sweetpay.errors import InternalServerError
+from sweetpay.export import Exporter, flatten
+from sweetpay.sync import MemoryCheckpointStore
+
+from .test_offline import create_subscription
+
+SEARCH = {"merchantId": "sweetpay-demo"}
+
+
+@pytest.fixture()
+def subscription_ids(api_client):
+    return [create_subscription(api_client)["payload"]["subscriptionId"]
+            for _ in range(3)]
+
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+class TestExporter:
+
+    def test_flatten(self):
+        # Execute
+        flat = flatten({"a": 1, "b": {"c": 2, "d": {"e": [3]}}})
+
+        # Verify
+        assert flat == {"a": 1, "b.c": 2, "b.d.e": [3]}
+
+    def test_subscriptions_to_ndjson(
+            self, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscriptions.ndjson")
+        exporter = Exporter(api_client, MemoryCheckpointStore())
+
+        # Execute
+        count = exporter.export_subscriptions(path, **SEARCH)
+
+        # Verify
+        assert count == 3
+        assert [line["subscriptionId"] for line in read_lines(path)] == \
+            subscription_ids
+
+    def test_subscriptions_to_csv(
+            self, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscriptions.csv")
+        exporter = Exporter(api_client, MemoryCheckpointStore())
+
+        # Execute
+        exporter.export_subscriptions(
+            path, columns=["subscriptionId", "customer.address.country"],
+            **SEARCH)
+
+        # Verify
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert rows == [
+            {"subscriptionId": str(subscription_id),
+             "customer.address.country": "SE"}
+            for subscription_id in subscription_ids]
+
+    def test_logs(self, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "logs.ndjson")
+        api_client.subscription.regret(subscription_ids[0])
+        exporter = Exporter(api_client, MemoryCheckpointStore())
+
+        # Execute
+        count = exporter.export_logs(path, **SEARCH)
+
+        # Verify
+        entries = read_lines(path)
+        assert count == 3
+        assert [(entry["subscriptionId"], entry["event"])
+                for entry in entries] == [
+            (subscription_ids[0], "CREATED"),
+            (subscription_ids[0], "REGRETTED"),
+            (subscription_ids[1], "CREATED"),
+            (subscription_ids[2], "CREATED")]
+
+    def test_interrupted_export_is_resumed(
+            self, api_server, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "logs.csv")
+        store = MemoryCheckpointStore()
+        exporter = Exporter(
+            api_client, store, concurrency=1, checkpoint_every=1)
+        api_server.reply(
+            "/subscription/{0}/log".format(subscription_ids[2]), 500, {},
+            times=1)
+        with pytest.raises(InternalServerError):
+            exporter.export_logs(path, subscription_ids)
+        api_server.requests.clear()
+
+        # Execute
+        count = exporter.export_logs(path, subscription_ids)
+
+        # Verify
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert count == 3
+        assert [row["subscriptionId"] for row in rows] == [
+            str(subscription_id) for subscription_id in subscription_ids]
+        assert [path for method, path, headers in api_server.requests] == [
+            "/subscription/{0}/log".format(subscription_ids[2])]
+
+    def test_restart(self, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscriptions.ndjson")
+        exporter = Exporter(api_client, MemoryCheckpointStore())
+        exporter.export_subscriptions(path, **SEARCH)
+
+        # Execute
+        resumed = exporter.export_subscriptions(path, **SEARCH)
+        restarted = exporter.export_subscriptions(
+            path, restart=True, **SEARCH)
+
+        # Verify
+        assert resumed == restarted == 3
+        assert len(read_lines(path)) == 3
+
+
+class TestExportCommand:
+
+    def test_export(self, api_client, subscription_ids, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscriptions.csv")
+        args = create_parser().parse_args([
+            "export", "subscriptions", path, "--token", "stub-token",
+            "--param", "merchantId=sweetpay-demo", "--checkpoints",
+            str(tmp_path / "checkpoints.json")])
+
+        # Execute
+        count = export(args, api_client)
+
+        # Verify
+        with open(path, newline="") as f:
+            assert len(list(csv.DictReader(f))) == count == 3
+        assert (tmp_path / "checkpoints.json").exists()
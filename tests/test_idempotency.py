@@ -0,0 +1,108 @@
+"""Tests for idempotency keys."""
+import pytest
+
+from sweetpay.errors import ProxyError
+from sweetpay.idempotency import MemoryJournal
+from sweetpay.retry import RetryPolicy
+
+
+def sent_keys(stub_server):
+    return [headers.get("Idempotency-Key")
+            for _, _, headers in stub_server.requests]
+
+
+class TestMemoryJournal:
+
+    def test_record_and_get(self):
+        # Setup
+        journal = MemoryJournal()
+        journal.record("key", {"status": "OK"})
+
+        # Execute
+        result = journal.get("key")
+
+        # Verify
+        assert result == {"status": "OK"}
+        assert journal.get("other") is None
+
+    def test_bounded(self):
+        # Setup
+        journal = MemoryJournal(maxsize=2)
+
+        # Execute
+        for key in "abc":
+            journal.record(key, {"key": key})
+
+        # Verify
+        assert len(journal) == 2
+        assert journal.get("a") is None
+
+
+class TestIdempotencyKeys:
+
+    def test_no_key_by_default(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+
+        # Execute
+        client.subscription.create(amount=10)
+
+        # Verify
+        assert sent_keys(stub_server) == [None]
+
+    def test_key_is_generated(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(idempotency_keys=True)
+
+        # Execute
+        client.subscription.create(amount=10)
+        client.checkout_session.create(amount=10)
+        client.subscription.query(1)
+
+        # Verify
+        first, second, query = sent_keys(stub_server)
+        assert first and second and first != second
+        assert query is None
+
+    def test_key_is_reused_across_retries(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(
+            idempotency_keys=True, retry=RetryPolicy(backoff=0))
+        stub_server.reply("/subscription/create", 502, {}, times=2)
+
+        # Execute
+        data = client.subscription.create(amount=10)
+
+        # Verify
+        assert data["status"] == "OK"
+        keys = sent_keys(stub_server)
+        assert len(keys) == 3 and len(set(keys)) == 1
+
+    def test_journal_resolves_repeated_create(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(journal=MemoryJournal())
+        first = client.subscription.create(idempotency_key="key", amount=10)
+
+        # Execute
+        second = client.subscription.create(idempotency_key="key", amount=10)
+
+        # Verify
+        assert first == second
+        assert len(stub_server.requests) == 1
+
+    def test_failed_create_is_not_journaled(
+            self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(journal=MemoryJournal())
+        stub_server.reply("/subscription/create", 502, {}, times=1)
+        with pytest.raises(ProxyError):
+            client.subscription.create(idempotency_key="key", amount=10)
+
+        # Execute
+        data = client.subscription.create(idempotency_key="key", amount=10)
+
+        # Verify
+        assert data["status"] == "OK"
+        assert sent_keys(stub_server) == ["key", "key"]
@@ -0,0 +1,123 @@
+"""Tests for the request hooks and histograms."""
+import pytest
+
+from sweetpay.errors import NotFoundError
+from sweetpay.instrumentation import Hook, Histogram, HistogramCollector
+
+
+class RecordingHook(Hook):
+
+    def __init__(self):
+        self.calls = []
+
+    def before_request(self, info):
+        self.calls.append(("before", info))
+
+    def after_request(self, info):
+        self.calls.append(("after", info))
+
+    def on_error(self, info, exc):
+        self.calls.append(("error", info, exc))
+
+
+@pytest.fixture()
+def hook():
+    return RecordingHook()
+
+
+class TestHooks:
+
+    def test_after_request(self, make_stub_client, hook):
+        # Setup
+        client = make_stub_client(hooks=[hook])
+
+        # Execute
+        client.subscription.update(1, maxExecutions=2)
+
+        # Verify
+        (before, info), (after, same_info) = hook.calls
+        assert (before, after) == ("before", "after")
+        assert info is same_info
+        assert info.namespace == "subscription"
+        assert info.opname == "update"
+        assert info.method == "POST"
+        assert info.url.endswith("/subscription/1/update")
+        assert info.status_code == 200
+        assert info.status == "OK"
+        assert info.bytes_sent == len(
+            client.subscription.client.codec.encode({"maxExecutions": 2}))
+        assert info.bytes_received > 0
+        assert info.timings["total"] >= info.timings["server"] > 0
+
+    def test_on_error(self, stub_server, make_stub_client, hook):
+        # Setup
+        client = make_stub_client(hooks=[hook])
+        stub_server.reply(
+            "/subscription/1/query", 404, {"status": "NOT_FOUND"})
+
+        # Execute
+        with pytest.raises(NotFoundError):
+            client.subscription.query(1)
+
+        # Verify
+        _, (error, info, exc) = hook.calls
+        assert error == "error"
+        assert isinstance(exc, NotFoundError)
+        assert info.status_code == 404
+        assert info.status == "NOT_FOUND"
+
+    def test_connect_is_timed_for_new_connections(
+            self, make_stub_client, hook):
+        # Setup
+        client = make_stub_client(hooks=[hook], pool_size=1)
+
+        # Execute
+        client.subscription.query(1)
+        client.subscription.query(1)
+
+        # Verify
+        first, second = [call[1] for call in hook.calls if call[0] == "after"]
+        assert first.timings["connect"] > 0
+        assert second.timings["connect"] == 0
+
+
+class TestHistogram:
+
+    def test_percentiles(self):
+        # Setup
+        histogram = Histogram()
+
+        # Execute
+        for value in range(1, 101):
+            histogram.add(value / 1000)
+
+        # Verify
+        assert histogram.count == 100
+        assert histogram.percentile(50) == pytest.approx(0.05, rel=0.1)
+        assert histogram.percentile(99) == pytest.approx(0.099, rel=0.1)
+        assert histogram.percentile(100) == 0.1
+
+    def test_empty(self):
+        # Verify
+        assert Histogram().percentile(50) is None
+
+
+class TestHistogramCollector:
+
+    def test_snapshot_per_operation(self, stub_server, make_stub_client):
+        # Setup
+        collector = HistogramCollector()
+        client = make_stub_client(hooks=[collector])
+        stub_server.reply("/subscription/2/query", 503, {})
+
+        # Execute
+        client.subscription.query(1)
+        with pytest.raises(Exception):
+            client.subscription.query(2)
+        client.creditcheck.search(ssn="19500101-0002")
+
+        # Verify
+        snapshot = collector.snapshot()
+        assert snapshot["subscription.query"]["count"] == 2
+        assert snapshot["creditcheck.search"]["count"] == 1
+        assert snapshot["subscription.query"]["p99"] > 0
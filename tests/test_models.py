@@ -0,0 +1,236 @@
+"""Tests for the typed response models."""
+import pickle
+from base64 import b64encode
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from sweetpay import Client
+from sweetpay.models import Subscription, SubscriptionLogEntry, Customer, \
+    CreditCheck, CheckoutSession, PayloadDecoder
+from sweetpay.utils import encode_attachment, decode_date, decode_dates, \
+    decode_attachments
+
+from .test_offline import create_subscription
+
+
+class TestModel:
+
+    def test_fields_are_decoded(self):
+        # Setup
+        subscription = Subscription({
+            "subscriptionId": 1, "amount": 10.1, "startsAt": "2017-01-02",
+            "customer": {"ssn": "19500101-0002", "address": {
+                "country": "SE"}},
+            "attachment": encode_attachment({"key": "value"})
+        })
+
+        # Verify
+        assert subscription.subscription_id == 1
+        assert subscription.amount == Decimal("10.1")
+        assert subscription.starts_at == date(2017, 1, 2)
+        assert isinstance(subscription.customer, Customer)
+        assert subscription.customer.address.country == "SE"
+        assert subscription.attachment == {"key": "value"}
+        assert subscription.max_executions is None
+
+    def test_fields_are_decoded_once(self):
+        # Setup
+        subscription = Subscription({"customer": {"ssn": "19500101-0002"}})
+
+        # Execute
+        customer = subscription.customer
+
+        # Verify
+        assert subscription.customer is customer
+
+    def test_dict_compatible(self):
+        # Setup
+        data = {"subscriptionId": 1, "amount": 10, "customer": {"ssn": "1"}}
+
+        # Execute
+        subscription = Subscription(data)
+
+        # Verify
+        assert subscription == data
+        assert subscription["customer"]["ssn"] == "1"
+        assert subscription.get("state") is None
+        assert dict(subscription) == data
+        assert subscription.to_dict() is data
+
+    def test_no_instance_dict(self):
+        # Setup
+        subscription = Subscription({"subscriptionId": 1})
+
+        # Verify
+        assert not hasattr(subscription, "__dict__")
+
+    def test_pickle(self):
+        # Setup
+        subscription = Subscription({"amount": 10})
+        subscription.amount
+
+        # Execute
+        copied = pickle.loads(pickle.dumps(subscription))
+
+        # Verify
+        assert copied == subscription
+        assert copied.amount == Decimal(10)
+
+
+@pytest.fixture()
+def models_client(api_server):
+    client = Client("stub-token", test=True, version={
+        "subscription": 1, "creditcheck": 2, "checkout_session": 1
+    }, timeout=4, models=True)
+    yield api_server.point(client)
+    client.close()
+
+
+class TestResourceModels:
+
+    def test_disabled_by_default(self, api_client):
+        # Execute
+        data = create_subscription(api_client)
+
+        # Verify
+        assert type(data["payload"]) is dict
+
+    def test_subscription_operations(self, models_client):
+        # Setup
+        client = models_client
+        subscription_id = create_subscription(
+            client)["payload"].subscription_id
+
+        # Execute
+        subscription = client.subscription.query(subscription_id)["payload"]
+        log = client.subscription.list_log(subscription_id)["payload"]
+        results = client.subscription.search(
+            subscriptionId=subscription_id)["payload"]
+        streamed = list(client.subscription.iter_search(
+            subscriptionId=subscription_id))
+
+        # Verify
+        assert isinstance(subscription, Subscription)
+        assert subscription.amount == Decimal(10)
+        assert isinstance(log[0], SubscriptionLogEntry)
+        assert log[0].event == "CREATED"
+        assert [s.subscription_id for s in results] == [subscription_id]
+        assert isinstance(streamed[0], Subscription)
+
+    def test_creditcheck_and_checkout_session(self, models_client):
+        # Setup
+        client = models_client
+
+        # Execute
+        check = client.creditcheck.create(ssn="19500101-0002")["payload"]
+        session = client.checkout_session.create(
+            merchantId="sweetpay-demo")["payload"]
+
+        # Verify
+        assert isinstance(check, CreditCheck)
+        assert isinstance(session, CheckoutSession)
+        assert session.url.endswith(str(session.session_id))
+
+
+class TestDecoders:
+
+    def test_decode_date(self):
+        # Execute
+        dates = [decode_date("2017-01-02"), decode_date("2017-1-2")]
+
+        # Verify
+        assert dates == [date(2017, 1, 2)] * 2
+        with pytest.raises(ValueError):
+            decode_date("2017-13-02")
+
+    def test_decode_date_is_cached(self):
+        # Setup
+        first = decode_date("2017-03-04")
+
+        # Execute
+        second = decode_date("2017-03-04")
+
+        # Verify
+        assert second is first
+
+    def test_decode_dates(self):
+        # Execute
+        dates = decode_dates(["2017-01-02", "2017-01-03"])
+
+        # Verify
+        assert dates == [date(2017, 1, 2), date(2017, 1, 3)]
+
+    def test_decode_attachments(self):
+        # Execute
+        attachments = decode_attachments([
+            encode_attachment({"key": "value"}), encode_attachment([1, 2]),
+            encode_attachment(None)])
+
+        # Verify
+        assert attachments == [{"key": "value"}, [1, 2], None]
+
+    def test_decode_invalid_attachments(self):
+        # Setup
+        # Neither is valid JSON, even though "1, 2" fits in an array.
+        invalid = [b64encode(b"1, 2").decode(), b64encode(b", 2").decode()]
+
+        # Verify
+        for attachment in invalid:
+            with pytest.raises(ValueError):
+                # Execute
+                decode_attachments([encode_attachment(1), attachment])
+
+    def test_invalid_attachments_dont_merge(self):
+        # Setup
+        # Each is invalid, but together they'd make a valid array.
+        invalid = [b64encode(document).decode()
+                   for document in (b"1,2", b"[3", b"4]")]
+
+        # Verify
+        with pytest.raises(ValueError):
+            # Execute
+            decode_attachments(invalid)
+
+
+class TestPayloadDecoder:
+
+    def test_whole_payload_is_decoded(self):
+        # Setup
+        data = {"status": "OK", "payload": [
+            {"amount": 10.5, "startsAt": "2017-01-02", "attachment": None},
+            {"amount": 3, "customer": {"startsAt": "2017-01-03"},
+             "attachment": encode_attachment({"key": "value"})}
+        ]}
+
+        # Execute
+        decoded = PayloadDecoder()(data)
+
+        # Verify
+        assert decoded == {"status": "OK", "payload": [
+            {"amount": Decimal("10.5"), "startsAt": date(2017, 1, 2),
+             "attachment": None},
+            {"amount": Decimal(3), "customer": {"startsAt": date(2017, 1, 3)},
+             "attachment": {"key": "value"}}
+        ]}
+        assert data["payload"][0]["startsAt"] == "2017-01-02"
+
+    def test_response_hook(self, api_server):
+        # Setup
+        client = api_server.point(Client(
+            "stub-token", test=True, version={"subscription": 1},
+            timeout=4, response_hook=PayloadDecoder()))
+        subscription_id = create_subscription(
+            client)["payload"]["subscriptionId"]
+
+        # Execute
+        queried = client.subscription.query(subscription_id)["payload"]
+        streamed = list(client.subscription.iter_search(
+            subscriptionId=subscription_id))
+
+        # Verify
+        assert queried["amount"] == Decimal(10)
+        assert isinstance(queried["startsAt"], date)
+        assert streamed[0]["amount"] == Decimal(10)
+        client.close()
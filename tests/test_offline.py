@@ -0,0 +1,168 @@
+"""Test all operations against the local emulator of the APIs."""
+import pytest
+
+from sweetpay import Client
+from sweetpay.constants import TEST_CREDIT_SSN, TEST_NOCREDIT_SSN
+from sweetpay.errors import BadDataError, NotFoundError, \
+    InvalidParameterError, FailureStatusError, UnauthorizedError, \
+    InternalServerError, ProxyError, UnderMaintenanceError
+
+from .test_operations import STARTS_AT
+
+
+def create_subscription(client, **extra):
+    return client.subscription.create(
+        amount=10, currency="SEK", country="SE", merchantId="sweetpay-demo",
+        interval="MONTHLY", ssn=TEST_CREDIT_SSN, startsAt=STARTS_AT,
+        maxExecutions=4, **extra)
+
+
+class TestSubscriptionV1Resource:
+
+    def test_create(self, api_client):
+        # Execute
+        data = create_subscription(api_client)
+
+        # Verify
+        payload = data["payload"]
+        assert payload["customer"]["address"]["country"] == "SE"
+        assert payload["startsAt"] == STARTS_AT.isoformat()
+        assert payload["amount"] == 10
+        assert payload["customer"]["ssn"] == TEST_CREDIT_SSN
+
+    def test_create_with_missing_amount(self, api_client):
+        # Execute
+        with pytest.raises(BadDataError) as excinfo:
+            api_client.subscription.create(
+                currency="SEK", interval="MONTHLY", ssn=TEST_CREDIT_SSN)
+
+        # Verify
+        assert excinfo.value.status == "Missing amount."
+
+    def test_create_with_invalid_interval(self, api_client):
+        # Verify
+        with pytest.raises(InvalidParameterError):
+            # Execute
+            api_client.subscription.create(
+                amount=10, currency="SEK", interval="HOURLY",
+                ssn=TEST_CREDIT_SSN)
+
+    def test_query_update_and_regret(self, api_client):
+        # Setup
+        subscription_id = create_subscription(
+            api_client)["payload"]["subscriptionId"]
+
+        # Execute
+        updated = api_client.subscription.update(
+            subscription_id, maxExecutions=2)
+        regretted = api_client.subscription.regret(subscription_id)
+        queried = api_client.subscription.query(subscription_id)
+        log = api_client.subscription.list_log(subscription_id)
+
+        # Verify
+        assert updated["payload"]["maxExecutions"] == 2
+        assert regretted["payload"]["state"] == "REGRETTED"
+        assert queried["payload"]["state"] == "REGRETTED"
+        assert [entry["event"] for entry in log["payload"]] == [
+            "CREATED", "UPDATED", "REGRETTED"]
+
+    def test_update_regretted(self, api_client):
+        # Setup
+        subscription_id = create_subscription(
+            api_client)["payload"]["subscriptionId"]
+        api_client.subscription.regret(subscription_id)
+
+        # Execute
+        with pytest.raises(FailureStatusError) as excinfo:
+            api_client.subscription.update(subscription_id, maxExecutions=2)
+
+        # Verify
+        assert excinfo.value.status == "NOT_MODIFIABLE"
+
+    def test_search(self, api_client):
+        # Setup
+        create_subscription(api_client, merchantItemId="a")
+        create_subscription(api_client, merchantItemId="b")
+
+        # Execute
+        data = api_client.subscription.search(merchantItemId="b")
+
+        # Verify
+        assert [subscription["merchantItemId"]
+                for subscription in data["payload"]] == ["b"]
+
+    def test_search_with_no_criteria(self, api_client):
+        # Execute
+        with pytest.raises(BadDataError) as excinfo:
+            api_client.subscription.search()
+
+        # Verify
+        assert excinfo.value.status == "INVALID_JSON"
+
+    def test_query_with_nonexistent_resource(self, api_client):
+        # Verify
+        with pytest.raises(NotFoundError):
+            # Execute
+            api_client.subscription.query(10000)
+
+
+class TestCreditcheckV2Resource:
+
+    def test_create_and_search(self, api_client):
+        # Execute
+        api_client.creditcheck.create(ssn=TEST_CREDIT_SSN)
+        data = api_client.creditcheck.search(ssn=TEST_CREDIT_SSN)
+
+        # Verify
+        assert len(data["payload"]) == 1
+
+    def test_create_without_credit(self, api_client):
+        # Execute
+        with pytest.raises(FailureStatusError) as excinfo:
+            api_client.creditcheck.create(ssn=TEST_NOCREDIT_SSN)
+
+        # Verify
+        assert excinfo.value.status == "NOT_ENOUGH_CREDIT"
+
+    def test_create_with_unknown_ssn(self, api_client):
+        # Verify
+        with pytest.raises(InternalServerError):
+            # Execute
+            api_client.creditcheck.create(ssn="19000101-0000")
+
+
+class TestCheckoutSessionV1Resource:
+
+    def test_create_session(self, api_client):
+        # Execute
+        data = api_client.checkout_session.create(
+            transactions=[{"amount": 100, "currency": "SEK"}],
+            merchantId="sweetpay-demo", country="SE")
+
+        # Verify
+        assert data["payload"]["sessionId"]
+
+
+class TestErrors:
+
+    def test_unauthorized(self, api_server):
+        # Setup
+        api_server.tokens = {"valid-token"}
+        client = api_server.point(Client(
+            "invalid-token", test=True, version={"subscription": 1}))
+
+        # Verify
+        with pytest.raises(UnauthorizedError):
+            # Execute
+            client.subscription.query(1)
+
+    @pytest.mark.parametrize("code, exc", [
+        (502, ProxyError), (503, UnderMaintenanceError)])
+    def test_unavailable(self, api_server, api_client, code, exc):
+        # Setup
+        api_server.reply("/subscription/1/query", code, {})
+
+        # Verify
+        with pytest.raises(exc):
+            # Execute
+            api_client.subscription.query(1)
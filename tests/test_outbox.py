@@ -0,0 +1,228 @@
+"""Tests for the durable write-behind queue."""
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from sweetpay import outbox as outbox_module
+from sweetpay.constants import IDEMPOTENCY_KEY_HEADER
+from sweetpay.errors import BadDataError, ProxyError, UnderMaintenanceError
+from sweetpay.outbox import Outbox
+
+
+@pytest.fixture()
+def outbox_path(tmp_path):
+    return str(tmp_path / "outbox.sqlite3")
+
+
+def get_paths(server):
+    return [path for method, path, headers in server.requests]
+
+
+class TestOutbox:
+
+    def test_submit_returns_a_future(self, api_client, outbox_path):
+        # Setup
+        with Outbox(api_client, outbox_path) as outbox:
+            # Execute
+            future = outbox.submit(
+                "subscription", "create", amount=10, currency="SEK",
+                country="SE", merchantId="sweetpay-demo", interval="MONTHLY",
+                ssn="19500101-0002", startsAt="2017-01-01", maxExecutions=4)
+            data = future.result(timeout=5)
+
+            # Verify
+            assert data["payload"]["state"] == "ACTIVE"
+            assert outbox.pending() == 0
+
+    def test_fast_operations_complete_their_future(
+            self, api_client, outbox_path, monkeypatch):
+        # Setup
+        class SlowFuture(Future):
+            def __init__(self):
+                # Give the dispatcher time to send the operation.
+                time.sleep(0.05)
+                super().__init__()
+        monkeypatch.setattr(outbox_module, "Future", SlowFuture)
+
+        with Outbox(api_client, outbox_path) as outbox:
+            # Execute
+            future = outbox.submit(
+                "checkout_session", "create", merchantId="sweetpay-demo")
+
+            # Verify
+            assert future.result(timeout=5)["status"] == "OK"
+
+    def test_outages_are_retried(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/subscription/1/update", 503, {}, times=2)
+        client = make_stub_client()
+
+        # Execute
+        with Outbox(client, outbox_path, backoff=0.01) as outbox:
+            data = outbox.submit(
+                "subscription", "update", 1, maxExecutions=6).result(
+                    timeout=5)
+
+        # Verify
+        assert data["payload"]["body"] == {"maxExecutions": 6}
+        assert get_paths(stub_server) == ["/subscription/1/update"] * 3
+
+    def test_creates_reuse_their_idempotency_key(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/checkout_session/session/create", 502, {},
+                          times=1)
+        client = make_stub_client(idempotency_keys=True)
+
+        # Execute
+        with Outbox(client, outbox_path, backoff=0.01) as outbox:
+            outbox.submit("checkout_session", "create").result(timeout=5)
+
+        # Verify
+        keys = {headers[IDEMPOTENCY_KEY_HEADER]
+                for method, path, headers in stub_server.requests}
+        assert len(stub_server.requests) == 2
+        assert len(keys) == 1
+
+    def test_ambiguous_creates_are_not_retried_without_keys(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/checkout_session/session/create", 502, {},
+                          times=1)
+        stub_server.reply("/subscription/create", 503, {}, times=1)
+        client = make_stub_client()
+
+        with Outbox(client, outbox_path, backoff=0.01) as outbox:
+            # Execute
+            proxied = outbox.submit("checkout_session", "create")
+            maintained = outbox.submit("subscription", "create")
+
+            # Verify
+            with pytest.raises(ProxyError):
+                proxied.result(timeout=5)
+            assert maintained.result(timeout=5)["status"] == "OK"
+        assert get_paths(stub_server).count(
+            "/checkout_session/session/create") == 1
+
+    def test_operations_are_ordered_per_subscription(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.latency = 0.01
+        stub_server.reply("/subscription/1/update", 503, {}, times=1)
+        client = make_stub_client()
+
+        # Execute
+        with Outbox(client, outbox_path, workers=4, backoff=0.01) as outbox:
+            futures = [
+                outbox.submit("subscription", "update", 1, maxExecutions=1),
+                outbox.submit("subscription", "update", 2, maxExecutions=1),
+                outbox.submit("subscription", "update", 1, maxExecutions=2),
+                outbox.submit("subscription", "regret", 1),
+                outbox.submit("subscription", "regret", 2)
+            ]
+            for future in futures:
+                future.result(timeout=5)
+
+        # Verify
+        paths = get_paths(stub_server)
+        assert [path for path in paths if "/1/" in path] == [
+            "/subscription/1/update", "/subscription/1/update",
+            "/subscription/1/update", "/subscription/1/regret"]
+        assert [path for path in paths if "/2/" in path] == [
+            "/subscription/2/update", "/subscription/2/regret"]
+
+    def test_rejected_operations_fail(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/subscription/1/update", 400, {}, times=1)
+        client = make_stub_client()
+
+        # Execute
+        with Outbox(client, outbox_path) as outbox:
+            failed = outbox.submit(
+                "subscription", "update", 1, maxExecutions=-1)
+            regret = outbox.submit("subscription", "regret", 1)
+
+            # Verify
+            with pytest.raises(BadDataError):
+                failed.result(timeout=5)
+            assert regret.result(timeout=5)["status"] == "OK"
+            assert outbox.failed() == 1
+
+    def test_exhausted_operations_fail(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/subscription/1/update", 503, {})
+        client = make_stub_client()
+
+        # Execute
+        with Outbox(client, outbox_path, backoff=0.01,
+                    max_attempts=3) as outbox:
+            exhausted = outbox.submit(
+                "subscription", "update", 1, maxExecutions=6)
+            regret = outbox.submit("subscription", "regret", 1)
+
+            # Verify
+            with pytest.raises(UnderMaintenanceError):
+                exhausted.result(timeout=5)
+            assert regret.result(timeout=5)["status"] == "OK"
+            assert outbox.pending() == 0
+            assert outbox.failed() == 1
+        assert get_paths(stub_server) == \
+            ["/subscription/1/update"] * 3 + ["/subscription/1/regret"]
+
+    def test_journal_is_not_scanned_per_operation(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        client = make_stub_client()
+        statements = []
+
+        with Outbox(client, outbox_path, backoff=0.01) as outbox:
+            outbox._db.set_trace_callback(statements.append)
+
+            # Execute
+            futures = [
+                outbox.submit("subscription", "regret", i % 5)
+                for i in range(50)]
+            for future in futures:
+                future.result(timeout=5)
+
+        # Verify
+        assert not [statement for statement in statements
+                    if "GROUP BY" in statement or "MIN(" in statement]
+
+    def test_pending_operations_survive_a_restart(
+            self, stub_server, make_stub_client, outbox_path):
+        # Setup
+        stub_server.reply("/subscription/1/regret", 503, {})
+        client = make_stub_client()
+        outbox = Outbox(client, outbox_path, backoff=0.01)
+        outbox.submit("subscription", "regret", 1)
+        outbox.close()
+        stub_server.responses.clear()
+        completed = []
+        done = threading.Event()
+
+        def on_complete(op_id, result):
+            completed.append(result)
+            done.set()
+
+        # Execute
+        with Outbox(client, outbox_path, on_complete=on_complete) as outbox:
+            done.wait(timeout=5)
+
+            # Verify
+            assert completed[0]["payload"]["path"] == "/subscription/1/regret"
+            assert outbox.pending() == 0
+
+    def test_unsupported_operations(self, api_client, outbox_path):
+        # Setup
+        with Outbox(api_client, outbox_path) as outbox:
+            # Execute & Verify
+            with pytest.raises(ValueError):
+                outbox.submit("creditcheck", "create")
+            with pytest.raises(ValueError):
+                outbox.submit("subscription", "update", maxExecutions=1)
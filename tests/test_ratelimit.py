@@ -0,0 +1,183 @@
+"""Tests for the client-side rate limiting."""
+import time
+
+import pytest
+
+from sweetpay.ratelimit import TokenBucket, FileTokenBucket, RateLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(TokenBucket, "clock", clock)
+    monkeypatch.setattr(FileTokenBucket, "clock", clock)
+    return clock
+
+
+class TestTokenBucket:
+
+    def test_burst_then_spread(self, clock):
+        # Setup
+        bucket = TokenBucket(rate=10, burst=2)
+
+        # Execute
+        delays = [bucket.reserve() for _ in range(4)]
+
+        # Verify
+        assert delays == pytest.approx([0, 0, 0.1, 0.2])
+
+    def test_refill(self, clock):
+        # Setup
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.reserve()
+        bucket.reserve()
+
+        # Execute
+        clock.now += 0.1
+        delay = bucket.reserve()
+
+        # Verify
+        assert delay == pytest.approx(0)
+
+    def test_refill_is_capped_by_burst(self, clock):
+        # Setup
+        bucket = TokenBucket(rate=10, burst=2)
+
+        # Execute
+        clock.now += 60
+        delays = [bucket.reserve() for _ in range(3)]
+
+        # Verify
+        assert delays == pytest.approx([0, 0, 0.1])
+
+    def test_refund(self, clock):
+        # Setup
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve()
+        bucket.reserve()
+
+        # Execute
+        bucket.refund()
+        delay = bucket.reserve()
+
+        # Verify
+        assert delay == pytest.approx(0.1)
+
+    def test_refund_is_capped_by_burst(self, clock):
+        # Setup
+        bucket = TokenBucket(rate=10, burst=2)
+
+        # Execute
+        bucket.refund()
+
+        # Verify
+        assert [bucket.reserve() for _ in range(3)] == \
+            pytest.approx([0, 0, 0.1])
+
+    def test_acquire_waits(self):
+        # Setup
+        bucket = TokenBucket(rate=50, burst=1)
+        bucket.acquire()
+
+        # Execute
+        start = time.monotonic()
+        bucket.acquire()
+
+        # Verify
+        assert time.monotonic() - start >= 0.015
+
+
+class TestFileTokenBucket:
+
+    def test_shared_between_instances(self, clock, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscription.bucket")
+        first = FileTokenBucket(path, rate=10, burst=2)
+        second = FileTokenBucket(path, rate=10, burst=2)
+
+        # Execute
+        delays = [
+            first.reserve(), second.reserve(), first.reserve(),
+            second.reserve()]
+
+        # Verify
+        assert delays == pytest.approx([0, 0, 0.1, 0.2])
+        first.close()
+        second.close()
+
+    def test_refund(self, clock, tmp_path):
+        # Setup
+        path = str(tmp_path / "subscription.bucket")
+        first = FileTokenBucket(path, rate=10, burst=1)
+        second = FileTokenBucket(path, rate=10, burst=1)
+        first.reserve()
+        first.reserve()
+
+        # Execute
+        first.refund()
+        delay = second.reserve()
+
+        # Verify
+        assert delay == pytest.approx(0.1)
+        first.close()
+        second.close()
+
+
+class TestRateLimiter:
+
+    def test_per_namespace(self, clock):
+        # Setup
+        limiter = RateLimiter({"subscription": 10, "*": 1}, burst=1)
+
+        # Execute
+        delays = [limiter.reserve("subscription") for _ in range(2)]
+        other = [limiter.reserve("creditcheck") for _ in range(2)]
+
+        # Verify
+        assert delays == pytest.approx([0, 0.1])
+        assert other == pytest.approx([0, 1])
+
+    def test_unlimited_namespace(self):
+        # Setup
+        limiter = RateLimiter({"subscription": 1})
+
+        # Verify
+        assert limiter.get_bucket("creditcheck") is None
+        assert limiter.acquire("creditcheck") == 0
+
+    def test_shared_between_processes(self, clock, tmp_path):
+        # Setup
+        limiters = [
+            RateLimiter({"*": 10}, burst=1, directory=str(tmp_path))
+            for _ in range(2)]
+
+        # Execute
+        delays = [limiter.reserve("subscription") for limiter in limiters]
+
+        # Verify
+        assert delays == pytest.approx([0, 0.1])
+        assert (tmp_path / "subscription.bucket").exists()
+
+    def test_client_requests_are_limited(self, make_stub_client):
+        # Setup
+        limiter = RateLimiter({"subscription": 50}, burst=1)
+        client = make_stub_client(rate_limiter=limiter, pool_size=1)
+
+        # Execute
+        start = time.monotonic()
+        for subscription_id in range(4):
+            client.subscription.query(subscription_id)
+        elapsed = time.monotonic() - start
+
+        # Verify
+        assert elapsed >= 0.06
+        assert limiter.get_bucket("creditcheck") is None
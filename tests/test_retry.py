@@ -0,0 +1,142 @@
+"""Tests for retrying failed operations."""
+import pytest
+
+from sweetpay.errors import ProxyError, UnderMaintenanceError, \
+    NotFoundError
+from sweetpay.retry import RetryPolicy
+
+
+class Failing:
+    """Raise the given exceptions, one per call, then return "OK"."""
+
+    def __init__(self, *excs):
+        self.excs = list(excs)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.excs:
+            raise self.excs.pop(0)
+        return "OK"
+
+
+@pytest.fixture()
+def retries():
+    return []
+
+
+@pytest.fixture()
+def policy(retries):
+    def on_retry(opname, attempt, exc, delay):
+        retries.append((opname, attempt, type(exc)))
+    return RetryPolicy(backoff=0, on_retry=on_retry)
+
+
+class TestRetryPolicy:
+
+    def test_retries_until_success(self, policy, retries):
+        # Setup
+        func = Failing(ProxyError(), UnderMaintenanceError())
+
+        # Execute
+        result = policy.call(func, "query")
+
+        # Verify
+        assert result == "OK"
+        assert retries == [
+            ("query", 1, ProxyError), ("query", 2, UnderMaintenanceError)]
+
+    def test_gives_up_after_max_attempts(self, policy):
+        # Setup
+        func = Failing(ProxyError(), ProxyError(), ProxyError())
+
+        # Execute
+        with pytest.raises(ProxyError) as excinfo:
+            policy.call(func, "query")
+
+        # Verify
+        assert func.calls == 3
+        assert excinfo.value.attempts == 3
+
+    def test_only_idempotent_operations_are_retried(self, policy):
+        # Setup
+        func = Failing(ProxyError())
+
+        # Verify
+        with pytest.raises(ProxyError):
+            # Execute
+            policy.call(func, "create")
+        assert func.calls == 1
+
+    def test_other_errors_are_not_retried(self, policy):
+        # Setup
+        func = Failing(NotFoundError())
+
+        # Verify
+        with pytest.raises(NotFoundError):
+            # Execute
+            policy.call(func, "query")
+        assert func.calls == 1
+
+    def test_deadline(self):
+        # Setup
+        policy = RetryPolicy(backoff=1, jitter=False, deadline=0.5)
+        func = Failing(ProxyError())
+
+        # Verify
+        with pytest.raises(ProxyError):
+            # Execute
+            policy.call(func, "query")
+        assert func.calls == 1
+
+    def test_backoff_is_exponential_and_capped(self):
+        # Setup
+        policy = RetryPolicy(backoff=1, max_backoff=5, jitter=False)
+
+        # Execute
+        delays = [policy.get_delay(attempt) for attempt in range(1, 6)]
+
+        # Verify
+        assert delays == [1, 2, 4, 5, 5]
+
+    def test_jitter(self):
+        # Setup
+        policy = RetryPolicy(backoff=1)
+
+        # Execute
+        delays = [policy.get_delay(3) for _ in range(100)]
+
+        # Verify
+        assert all(0 <= delay <= 4 for delay in delays)
+        assert len(set(delays)) > 1
+
+
+class TestClientRetry:
+
+    def test_retries_proxy_errors(
+            self, stub_server, make_stub_client, policy, retries):
+        # Setup
+        client = make_stub_client(retry=policy)
+        stub_server.reply("/subscription/1/query", 502, {}, times=1)
+        stub_server.reply("/subscription/1/log", 503, {}, times=1)
+
+        # Execute
+        query = client.subscription.query(1)
+        log = client.subscription.list_log(1)
+
+        # Verify
+        assert query["status"] == "OK"
+        assert log["status"] == "OK"
+        assert retries == [
+            ("query", 1, ProxyError), ("list_log", 1, UnderMaintenanceError)]
+
+    def test_does_not_retry_create(
+            self, stub_server, make_stub_client, policy):
+        # Setup
+        client = make_stub_client(retry=policy)
+        stub_server.reply("/subscription/create", 502, {}, times=1)
+
+        # Verify
+        with pytest.raises(ProxyError):
+            # Execute
+            client.subscription.create(amount=10)
@@ -0,0 +1,199 @@
+"""Tests for the coalescing of identical concurrent operations."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sweetpay.deadline import deadline
+from sweetpay.errors import NotFoundError, TimeoutError
+from sweetpay.singleflight import SingleFlight
+
+
+def run_concurrently(func, number):
+    with ThreadPoolExecutor(number) as executor:
+        futures = [executor.submit(func) for _ in range(number)]
+    return futures
+
+
+def wait_for_followers(single_flight, number):
+    # Wait until all other calls have been collapsed into the first one.
+    while single_flight.stats()["calls"] < number:
+        threading.Event().wait(0.001)
+
+
+class TestSingleFlight:
+
+    def test_identical_calls_are_collapsed(self):
+        # Setup
+        single_flight = SingleFlight()
+        calls = []
+
+        def func():
+            calls.append(1)
+            wait_for_followers(single_flight, 8)
+            return {"payload": [1]}
+
+        # Execute
+        futures = run_concurrently(lambda: single_flight.call("k", func), 8)
+
+        # Verify
+        results = [future.result() for future in futures]
+        assert len(calls) == 1
+        assert results == [{"payload": [1]}] * 8
+        assert len({id(result) for result in results}) == 8
+        assert single_flight.stats() == {
+            "calls": 8, "collapsed": 7, "in_flight": 0}
+
+    def test_exceptions_are_shared(self):
+        # Setup
+        single_flight = SingleFlight()
+
+        def func():
+            wait_for_followers(single_flight, 4)
+            raise NotFoundError("Not found")
+
+        # Execute
+        futures = run_concurrently(lambda: single_flight.call("k", func), 4)
+
+        # Verify
+        for future in futures:
+            with pytest.raises(NotFoundError):
+                future.result()
+
+    def test_followers_honor_their_deadline(self):
+        # Setup
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def leader():
+            return single_flight.call("k", lambda: release.wait(5))
+
+        def follower():
+            with deadline(0.1):
+                return single_flight.call("k", lambda: None)
+
+        with ThreadPoolExecutor(1) as executor:
+            led = executor.submit(leader)
+            wait_for_followers(single_flight, 1)
+
+            # Execute
+            start = time.monotonic()
+            with pytest.raises(TimeoutError):
+                follower()
+            waited = time.monotonic() - start
+            release.set()
+
+        # Verify
+        assert waited < 0.5
+        assert led.result() is True
+
+    def test_async_followers_honor_their_deadline(self):
+        # Setup
+        single_flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.5)
+            return 1
+
+        async def follower():
+            with deadline(0.1):
+                return await single_flight.call_async("k", slow)
+
+        async def main():
+            leader = asyncio.ensure_future(single_flight.call_async("k", slow))
+            await asyncio.sleep(0)
+            start = time.monotonic()
+            with pytest.raises(TimeoutError):
+                await follower()
+            return time.monotonic() - start, await leader
+
+        # Execute
+        waited, result = asyncio.run(main())
+
+        # Verify
+        assert waited < 0.4
+        assert result == 1
+
+    def test_cancelled_caller_doesnt_cancel_the_call(self):
+        # Setup
+        single_flight = SingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"payload": [1]}
+
+        async def main():
+            first = asyncio.ensure_future(single_flight.call_async("k", slow))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(
+                single_flight.call_async("k", slow))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        # Execute
+        result = asyncio.run(main())
+
+        # Verify
+        assert result == {"payload": [1]}
+        assert len(calls) == 1
+        assert single_flight.stats()["in_flight"] == 0
+
+    def test_different_keys_are_not_collapsed(self):
+        # Setup
+        single_flight = SingleFlight()
+
+        # Execute
+        results = [single_flight.call(key, lambda: key) for key in "ab"]
+
+        # Verify
+        assert results == ["a", "b"]
+        assert single_flight.collapsed == 0
+
+    def test_sequential_calls_are_not_collapsed(self):
+        # Setup
+        single_flight = SingleFlight()
+        calls = []
+
+        # Execute
+        for _ in range(2):
+            single_flight.call("k", lambda: calls.append(1))
+
+        # Verify
+        assert len(calls) == 2
+
+
+class TestResourceSingleFlight:
+
+    def test_concurrent_queries(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.latency = 0.1
+        single_flight = SingleFlight()
+        client = make_stub_client(single_flight=single_flight, pool_size=8)
+
+        # Execute
+        futures = run_concurrently(lambda: client.subscription.query(1), 8)
+
+        # Verify
+        assert [f.result()["payload"]["path"] for f in futures] == \
+            ["/subscription/1/query"] * 8
+        assert len(stub_server.requests) < 8
+        assert single_flight.collapsed == 8 - len(stub_server.requests)
+
+    def test_writes_are_not_collapsed(self, stub_server, make_stub_client):
+        # Setup
+        stub_server.latency = 0.05
+        client = make_stub_client(
+            single_flight=SingleFlight(), pool_size=4)
+
+        # Execute
+        run_concurrently(lambda: client.subscription.regret(1), 4)
+
+        # Verify
+        assert len(stub_server.requests) == 4
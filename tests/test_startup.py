@@ -0,0 +1,66 @@
+"""Tests for the import time of the package."""
+import subprocess
+import sys
+
+import pytest
+
+import sweetpay
+
+#: The maximum time `import sweetpay` may take, in seconds.
+IMPORT_BUDGET = 0.05
+
+
+def run_python(*args):
+    """Run a fresh interpreter, returning what it wrote to stderr."""
+    process = subprocess.run(
+        [sys.executable] + list(args), stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return process.stdout, process.stderr
+
+
+def get_import_time(statement, module):
+    """Return the seconds spent importing `module`, by `-X importtime`."""
+    _, stderr = run_python("-X", "importtime", "-c", statement)
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            # The cumulative time, including all modules it imported.
+            return int(parts[1]) / 1e6
+    raise AssertionError("{0} was not imported".format(module))
+
+
+class TestStartup:
+
+    def test_import_is_under_budget(self):
+        # Execute
+        seconds = min(
+            get_import_time("import sweetpay", "sweetpay") for _ in range(3))
+
+        # Verify
+        assert seconds < IMPORT_BUDGET
+
+    def test_nothing_heavy_is_imported(self):
+        # Execute
+        stdout, _ = run_python("-c", (
+            "import sys, sweetpay, sweetpay.utils, sweetpay.models; "
+            "print(' '.join(sorted(sys.modules)))"))
+
+        # Verify
+        modules = stdout.split()
+        for name in ("requests", "restbase", "sweetpay.client", "httpx"):
+            assert name not in modules
+
+    def test_client_imports_on_its_own(self):
+        # Verify
+        run_python("-c", "from sweetpay.client import Client")
+
+    def test_lazy_names(self):
+        # Execute
+        from sweetpay import Client, SubscriptionV1, errors
+
+        # Verify
+        assert Client.RESOURCE_MAPPER[("subscription", 1)] is SubscriptionV1
+        assert errors.SweetpayError
+        assert set(sweetpay.__all__) <= set(dir(sweetpay))
+        with pytest.raises(AttributeError):
+            sweetpay.missing
@@ -0,0 +1,292 @@
+"""Tests for the incremental decoding of responses."""
+import io
+import json
+
+import pytest
+import requests
+
+from sweetpay import Client
+from sweetpay.connector import Connector
+from sweetpay.constants import MAX_RAW_BODY_SIZE
+from sweetpay.errors import FailureStatusError, NotFoundError, \
+    RequestError, SweetpayError
+from sweetpay.instrumentation import HistogramCollector
+from sweetpay.retry import RetryPolicy
+from sweetpay.streaming import iter_array, load
+
+from .test_offline import create_subscription
+
+
+def chunked(data, size):
+    raw = json.dumps(data).encode()
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+class TestIterArray:
+
+    @pytest.mark.parametrize("size", [1, 2, 7, 1024])
+    def test_items_across_chunks(self, size):
+        # Setup
+        payload = [
+            {"subscriptionId": i, "amount": 10.5 * i, "name": "Å" * i,
+             "active": i % 2 == 0, "attachment": None}
+            for i in range(20)]
+        envelope = {}
+
+        # Execute
+        items = list(iter_array(
+            chunked({"status": "OK", "payload": payload, "count": 20}, size),
+            envelope=envelope))
+
+        # Verify
+        assert items == payload
+        assert envelope == {"status": "OK", "count": 20}
+
+    def test_numbers_split_between_chunks(self):
+        # Execute
+        items = list(iter_array([b'{"payload": [12', b'34, 5', b"6]}"]))
+
+        # Verify
+        assert items == [1234, 56]
+
+    def test_empty_payload(self):
+        # Execute
+        items = list(iter_array([b'{"payload": [], "status": "OK"}']))
+
+        # Verify
+        assert items == []
+
+    def test_invalid_document(self):
+        # Verify
+        with pytest.raises(ValueError):
+            # Execute
+            list(iter_array([b'{"payload": [1, 2']))
+
+
+class TestLoad:
+
+    @pytest.mark.parametrize("size", [1, 7, 1024])
+    def test_same_as_json(self, size):
+        # Setup
+        data = {"status": "OK", "payload": [{"id": i} for i in range(10)],
+                "nested": {"payload": [1]}, "empty": []}
+
+        # Execute
+        loaded = load(chunked(data, size))
+
+        # Verify
+        assert loaded == data
+
+    def test_numbers_at_every_split(self):
+        # Setup
+        raw = (b'{"amount": 3.0, "rate": -2.5E-3, "count": 10, '
+               b'"payload": [1e5, -0.25, 7, 1.5e+2, 2E-1], "total": 12.75}')
+
+        # Execute
+        results = [load([raw[:offset], raw[offset:]])
+                   for offset in range(len(raw) + 1)]
+
+        # Verify
+        assert results == [json.loads(raw)] * (len(raw) + 1)
+
+    def test_object_payload(self):
+        # Execute
+        loaded = load([b'{"status": "OK", "payload": {"id": 1}}'])
+
+        # Verify
+        assert loaded == {"status": "OK", "payload": {"id": 1}}
+
+    def test_invalid_document(self):
+        # Verify
+        with pytest.raises(ValueError):
+            # Execute
+            load([b'<html>Bad gateway</html>'])
+
+
+def create_response(body, headers=None):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.headers.update(headers or {})
+    return response
+
+
+class TestStreamedResponses:
+
+    def test_large_bodies_are_streamed(self):
+        # Setup
+        connector = Connector(
+            "token", test=True, timeout=1, stream_threshold=10)
+        body = json.dumps({"status": "OK", "payload": [1, 2, 3]}).encode()
+        response = create_response(body, {"Content-Length": str(len(body))})
+
+        # Execute
+        data, size = connector.read_data(response)
+
+        # Verify
+        assert data == {"status": "OK", "payload": [1, 2, 3]}
+        assert size == len(body)
+        assert not response._content_consumed
+
+    def test_small_bodies_are_not_streamed(self):
+        # Setup
+        connector = Connector(
+            "token", test=True, timeout=1, stream_threshold=1024)
+        response = create_response(
+            b'{"status": "OK"}', {"Content-Length": "16"})
+
+        # Execute
+        data, size = connector.read_data(response)
+
+        # Verify
+        assert data == {"status": "OK"}
+        assert response._content_consumed
+
+    def test_undecodable_body_is_capped(self):
+        # Setup
+        connector = Connector(
+            "token", test=True, timeout=1, stream_threshold=0)
+        body = b"<html>" + b"x" * MAX_RAW_BODY_SIZE * 10
+
+        # Execute
+        data, size = connector.read_data(create_response(body))
+
+        # Verify
+        assert data == body[:MAX_RAW_BODY_SIZE].decode()
+        assert size == len(body)
+
+    def test_undecodable_body_is_capped_without_streaming(self):
+        # Setup
+        connector = Connector("token", test=True, timeout=1)
+
+        # Execute
+        data = connector.decode_data(b"\xff" * MAX_RAW_BODY_SIZE * 10)
+
+        # Verify
+        assert len(data) == MAX_RAW_BODY_SIZE
+
+    def test_operations(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(pool_size=1, stream_threshold=0)
+
+        # Execute
+        data = client.subscription.search(country="SE")
+
+        # Verify
+        assert data["payload"]["body"] == {"country": "SE"}
+        assert data["payload"] == client.subscription.search(
+            country="SE")["payload"]
+        assert stub_server.connections == 1
+
+    @pytest.mark.parametrize("stream_threshold", [0, 1024 * 1024])
+    def test_truncated_body(
+            self, stub_server, make_stub_client, stream_threshold):
+        # Setup
+        stub_server.truncate = 20
+        collector = HistogramCollector()
+        client = make_stub_client(
+            stream_threshold=stream_threshold, hooks=[collector],
+            retry=RetryPolicy(
+                max_attempts=2, backoff=0, exceptions=(RequestError,)))
+
+        # Execute
+        with pytest.raises(RequestError) as excinfo:
+            client.subscription.query(1)
+        results = dict(client.subscription.query_many([1]))
+
+        # Verify
+        assert isinstance(excinfo.value.exc, requests.RequestException)
+        assert excinfo.value.attempts == 2
+        assert isinstance(results[1], RequestError)
+        assert collector.snapshot()["subscription.query"]["count"] == 4
+
+
+class TestIterSearch:
+
+    def test_iter_search(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client(pool_size=1)
+        payload = [{"subscriptionId": i} for i in range(1000)]
+        stub_server.reply(
+            "/subscription/search", 200,
+            {"payload": payload, "status": "OK"})
+
+        # Execute
+        items = list(client.subscription.iter_search(
+            country="SE", chunk_size=128))
+
+        # Verify
+        assert items == payload
+
+    def test_truncated_response(self, stub_server, make_stub_client):
+        # Setup
+        collector = HistogramCollector()
+        client = make_stub_client(hooks=[collector])
+        stub_server.reply(
+            "/subscription/search", 200,
+            {"payload": [{"subscriptionId": i} for i in range(1000)],
+             "status": "OK"})
+        stub_server.truncate = 4096
+        items = []
+
+        # Execute
+        with pytest.raises(RequestError) as excinfo:
+            for item in client.subscription.iter_search(chunk_size=128):
+                items.append(item)
+
+        # Verify
+        assert isinstance(excinfo.value.exc, requests.RequestException)
+        assert 0 < len(items) < 1000
+        assert collector.snapshot()["subscription.search"]["count"] == 1
+
+    def test_failure_status(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+        stub_server.reply(
+            "/creditcheck/search", 200, {"status": "INVALID_SSN"})
+
+        # Verify
+        with pytest.raises(FailureStatusError) as excinfo:
+            # Execute
+            list(client.creditcheck.iter_search(ssn="123"))
+        assert excinfo.value.status == "INVALID_SSN"
+
+    def test_error_code(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+        stub_server.reply("/subscription/search", 404, {"status": "MISSING"})
+
+        # Verify
+        with pytest.raises(NotFoundError):
+            # Execute
+            list(client.subscription.iter_search(country="SE"))
+
+    def test_retried_and_instrumented(self, api_server):
+        # Setup
+        collector = HistogramCollector()
+        client = api_server.point(Client(
+            "stub-token", test=True, version={"subscription": 1}, timeout=4,
+            retry=RetryPolicy(backoff=0, jitter=False), hooks=[collector]))
+        subscription_id = create_subscription(
+            client)["payload"]["subscriptionId"]
+        api_server.reply("/subscription/search", 503, {}, times=1)
+
+        # Execute
+        items = list(client.subscription.iter_search(
+            subscriptionId=subscription_id))
+
+        # Verify
+        assert [item["subscriptionId"] for item in items] == [
+            subscription_id]
+        assert collector.snapshot()["subscription.search"]["count"] == 2
+        client.close()
+
+    def test_undecodable_response(self, stub_server, make_stub_client):
+        # Setup
+        client = make_stub_client()
+        stub_server.reply("/subscription/search", 200, ["not", "an object"])
+
+        # Verify
+        with pytest.raises(SweetpayError):
+            # Execute
+            list(client.subscription.iter_search(country="SE"))
@@ -0,0 +1,114 @@
+"""Tests for the incremental synchronization of subscription logs."""
+from sweetpay.errors import NotFoundError
+from sweetpay.sync import LogSyncer, MemoryCheckpointStore, \
+    FileCheckpointStore
+
+from .test_offline import create_subscription
+
+
+def create(client):
+    return create_subscription(client)["payload"]["subscriptionId"]
+
+
+class TestLogSyncer:
+
+    def test_only_new_entries(self, api_client):
+        # Setup
+        syncer = LogSyncer(api_client.subscription, MemoryCheckpointStore())
+        subscription_id = create(api_client)
+
+        # Execute
+        first = syncer.sync(subscription_id)
+        syncer.commit(subscription_id)
+        second = syncer.sync(subscription_id)
+        api_client.subscription.update(subscription_id, maxExecutions=6)
+        third = syncer.sync(subscription_id)
+
+        # Verify
+        assert [entry["event"] for entry in first] == ["CREATED"]
+        assert second == []
+        assert [entry["event"] for entry in third] == ["UPDATED"]
+
+    def test_uncommitted_entries_are_returned_again(self, api_client):
+        # Setup
+        syncer = LogSyncer(api_client.subscription, MemoryCheckpointStore())
+        subscription_id = create(api_client)
+        syncer.sync(subscription_id)
+        api_client.subscription.update(subscription_id, maxExecutions=6)
+
+        # Execute
+        entries = syncer.sync(subscription_id)
+        syncer.commit(subscription_id)
+
+        # Verify
+        assert [entry["event"] for entry in entries] == \
+            ["CREATED", "UPDATED"]
+        assert syncer.sync(subscription_id) == []
+        assert syncer.store.get(subscription_id)[0] == 2
+
+    def test_checkpoints_are_kept_in_a_file(self, api_client, tmp_path):
+        # Setup
+        path = str(tmp_path / "checkpoints.json")
+        subscription_id = create(api_client)
+        syncer = LogSyncer(api_client.subscription, FileCheckpointStore(path))
+        syncer.sync(subscription_id)
+        syncer.commit()
+        api_client.subscription.regret(subscription_id)
+
+        # Execute
+        entries = LogSyncer(
+            api_client.subscription, FileCheckpointStore(path)).sync(
+                subscription_id)
+
+        # Verify
+        assert [entry["event"] for entry in entries] == ["REGRETTED"]
+
+    def test_changed_log(self, api_client, api_server):
+        # Setup
+        syncer = LogSyncer(api_client.subscription, MemoryCheckpointStore())
+        subscription_id = create(api_client)
+        api_client.subscription.update(subscription_id, maxExecutions=6)
+        syncer.sync(subscription_id)
+        syncer.commit()
+        log = api_server.api.logs[subscription_id]
+        # Drop the oldest entry, and add a new one.
+        del log[0]
+        api_client.subscription.regret(subscription_id)
+
+        # Execute
+        entries = syncer.sync(subscription_id)
+
+        # Verify
+        assert [entry["event"] for entry in entries] == ["REGRETTED"]
+
+    def test_reset(self, api_client):
+        # Setup
+        syncer = LogSyncer(api_client.subscription, MemoryCheckpointStore())
+        subscription_id = create(api_client)
+        syncer.sync(subscription_id)
+        syncer.commit()
+
+        # Execute
+        syncer.reset(subscription_id)
+
+        # Verify
+        assert len(syncer.sync(subscription_id)) == 1
+
+    def test_sync_many(self, api_client, tmp_path):
+        # Setup
+        store = FileCheckpointStore(str(tmp_path / "checkpoints.json"))
+        syncer = LogSyncer(api_client.subscription, store)
+        subscription_ids = [create(api_client) for _ in range(5)]
+        api_client.subscription.update(subscription_ids[0], maxExecutions=6)
+        syncer.sync(subscription_ids[1])
+        syncer.commit()
+
+        # Execute
+        results = dict(syncer.sync_many(subscription_ids + [404]))
+        syncer.commit()
+
+        # Verify
+        assert len(results[subscription_ids[0]]) == 2
+        assert results[subscription_ids[1]] == []
+        assert isinstance(results[404], NotFoundError)
+        assert len(FileCheckpointStore(store.path)) == 5
@@ -0,0 +1,136 @@
+"""Tests for the clients of many merchants."""
+import pytest
+
+from sweetpay.cache import ResponseCache
+from sweetpay.idempotency import MemoryJournal
+from sweetpay.tenants import ClientPool
+
+VERSION = {"subscription": 1, "creditcheck": 2, "checkout_session": 1}
+
+
+@pytest.fixture()
+def make_pool(stub_server):
+    pools = []
+
+    def make(**kwargs):
+        pool = ClientPool(test=True, version=VERSION, timeout=4, **kwargs)
+        # Point every client created at the stub server.
+        create_client = pool.create_client
+        pool.create_client = lambda token: stub_server.point(
+            create_client(token))
+        pools.append(pool)
+        return pool
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+class TestClientPool:
+
+    def test_requests_use_the_token_of_the_merchant(
+            self, stub_server, make_pool):
+        # Setup
+        pool = make_pool()
+
+        # Execute
+        pool.get("merchant-a").subscription.query(1)
+        pool.get("merchant-b").subscription.query(1)
+
+        # Verify
+        tokens = [headers["Authorization"]
+                  for method, path, headers in stub_server.requests]
+        assert tokens == ["merchant-a", "merchant-b"]
+
+    def test_clients_share_the_connections(self, stub_server, make_pool):
+        # Setup
+        pool = make_pool(pool_size=2)
+
+        # Execute
+        for token in ("merchant-a", "merchant-b", "merchant-a"):
+            pool.get(token).subscription.query(1)
+
+        # Verify
+        assert stub_server.connections == 1
+        assert pool.get("merchant-a").subscription.client.transport is \
+            pool.get("merchant-b").creditcheck.client.transport
+
+    def test_clients_are_reused(self, make_pool):
+        # Setup
+        pool = make_pool()
+
+        # Execute
+        first = pool.get("merchant-a")
+        second = pool.get("merchant-a")
+
+        # Verify
+        assert first is second
+        assert pool.stats() == {"size": 1, "created": 1, "evicted": 0}
+
+    def test_least_recently_used_clients_are_evicted(self, make_pool):
+        # Setup
+        pool = make_pool(max_clients=2)
+        pool.get("merchant-a")
+        pool.get("merchant-b")
+        pool.get("merchant-a")
+
+        # Execute
+        pool.get("merchant-c")
+
+        # Verify
+        assert "merchant-a" in pool
+        assert "merchant-b" not in pool
+        assert pool.stats() == {"size": 2, "created": 3, "evicted": 1}
+
+    def test_idle_clients_are_evicted(self, make_pool):
+        # Setup
+        now = [0]
+        pool = make_pool(idle_timeout=60)
+        pool.clock = lambda: now[0]
+        pool.get("merchant-a")
+        now[0] = 30
+        pool.get("merchant-b")
+
+        # Execute
+        now[0] = 70
+        pool.get("merchant-c")
+
+        # Verify
+        assert "merchant-a" not in pool
+        assert "merchant-b" in pool
+
+    def test_journals_are_not_shared(self):
+        # Verify
+        with pytest.raises(ValueError):
+            # Execute
+            ClientPool(test=True, version=VERSION, journal=MemoryJournal())
+
+    def test_caches_are_kept_by_merchant(self, stub_server, make_pool):
+        # Setup
+        cache = ResponseCache()
+        pool = make_pool(cache=cache)
+        pool.get("merchant-a").subscription.query(1)
+        pool.get("merchant-b").subscription.query(1)
+
+        # Execute
+        pool.get("merchant-b").subscription.update(1, maxExecutions=6)
+        pool.get("merchant-a").subscription.query(1)
+        pool.get("merchant-b").subscription.query(1)
+
+        # Verify
+        tokens = [headers["Authorization"]
+                  for method, path, headers in stub_server.requests]
+        assert tokens == [
+            "merchant-a", "merchant-b", "merchant-b", "merchant-b"]
+
+    def test_urls_are_shared(self, make_pool):
+        # Setup
+        pool = make_pool()
+        first = pool.get("merchant-a").subscription
+        second = pool.get("merchant-b").subscription
+
+        # Execute
+        first._get_url("create")
+        second._get_url("create")
+
+        # Verify
+        assert first._urls is second._urls
@@ -0,0 +1,160 @@
+"""Tests for the transports, run against local stub servers."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+from sweetpay import Client
+from sweetpay.errors import TimeoutError, RequestError
+from sweetpay.instrumentation import HistogramCollector
+from sweetpay.transport import RequestsTransport, HTTP2Transport
+
+from .stub_server import H2StubServer
+
+
+class TestRequestsTransport:
+
+    def test_default_transport(self, make_stub_client):
+        # Execute
+        client = make_stub_client(pool_size=2)
+
+        # Verify
+        transport = client.subscription.client.transport
+        assert isinstance(transport, RequestsTransport)
+        assert transport.pool_size == 2
+
+    def test_shared_transport(self, stub_server, make_stub_client):
+        # Setup
+        transport = RequestsTransport(pool_size=1)
+        clients = [make_stub_client(transport=transport) for _ in range(2)]
+
+        # Execute
+        for client in clients:
+            client.subscription.query(1)
+            client.close()
+
+        # Verify
+        assert stub_server.connections == 1
+        assert clients[0].subscription.query(1)["status"] == "OK"
+        transport.close()
+
+    @pytest.mark.parametrize("exc, expected", [
+        (requests.ConnectionError(ReadTimeoutError(None, None, "Timed out")),
+         TimeoutError),
+        (requests.exceptions.ChunkedEncodingError("Reset"), RequestError)
+    ])
+    def test_read_errors(self, exc, expected):
+        # Verify
+        with pytest.raises(expected) as excinfo:
+            with RequestsTransport().reading():
+                # Execute
+                raise exc
+        assert excinfo.value.exc is exc
+
+
+@pytest.fixture()
+def h2_server():
+    pytest.importorskip("h2")
+    server = H2StubServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def make_h2_client(h2_server):
+    pytest.importorskip("httpx")
+    transports = []
+
+    def make(**kwargs):
+        transport = HTTP2Transport(prior_knowledge=True)
+        transports.append(transport)
+        kwargs.setdefault("timeout", 4)
+        client = Client("stub-token", test=True, version={
+            "subscription": 1, "creditcheck": 2, "checkout_session": 1
+        }, transport=transport, **kwargs)
+        return h2_server.point(client)
+    yield make
+    for transport in transports:
+        transport.close()
+
+
+class TestHTTP2Transport:
+
+    def test_operations(self, h2_server, make_h2_client):
+        # Setup
+        client = make_h2_client()
+
+        # Execute
+        query = client.subscription.query(1)
+        search = client.subscription.search(country="SE")
+        regret = client.subscription.regret(1)
+
+        # Verify
+        assert query["payload"]["path"] == "/subscription/1/query"
+        assert search["payload"]["body"] == {"country": "SE"}
+        assert regret["payload"]["body"] is None
+        method, path, headers = h2_server.requests[0]
+        assert headers["authorization"] == "stub-token"
+
+    def test_multiplexed(self, h2_server, make_h2_client):
+        # Setup
+        h2_server.latency = 0.2
+        client = make_h2_client()
+
+        # Execute
+        with ThreadPoolExecutor(200) as executor:
+            results = list(executor.map(
+                client.subscription.query, range(200)))
+
+        # Verify
+        assert len(results) == 200
+        assert h2_server.connections == 1
+        assert h2_server.max_active_streams > 50
+
+    def test_timeout(self, h2_server, make_h2_client):
+        # Setup
+        h2_server.latency = 0.5
+        client = make_h2_client(timeout=(1, 0.05))
+
+        # Verify
+        with pytest.raises(TimeoutError):
+            # Execute
+            client.subscription.query(1)
+
+    def test_request_error(self, make_h2_client):
+        # Setup
+        client = make_h2_client()
+        client.subscription._test_url = "http://127.0.0.1:1/subscription"
+
+        # Verify
+        with pytest.raises(RequestError):
+            # Execute
+            client.subscription.query(1)
+
+    def test_read_errors(self, make_h2_client):
+        # Setup
+        transport = make_h2_client().subscription.client.transport
+        httpx = pytest.importorskip("httpx")
+
+        # Verify
+        with pytest.raises(TimeoutError):
+            with transport.reading():
+                # Execute
+                raise httpx.ReadTimeout("Timed out")
+        with pytest.raises(RequestError):
+            with transport.reading():
+                # Execute
+                raise httpx.RemoteProtocolError("Closed")
+
+    def test_streamed_and_instrumented(self, make_h2_client):
+        # Setup
+        collector = HistogramCollector()
+        client = make_h2_client(stream_threshold=0, hooks=[collector])
+
+        # Execute
+        data = client.subscription.search(country="SE")
+
+        # Verify
+        assert data["payload"]["body"] == {"country": "SE"}
+        assert collector.snapshot()["subscription.search"]["count"] == 1
@@ -0,0 +1,240 @@
+"""Tests for receiving notifications."""
+import asyncio
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from sweetpay.errors import WebhookError, InvalidSignatureError
+from sweetpay.models import Subscription
+from sweetpay.webhooks import WebhookHandler, MemoryDedupeStore
+
+SECRET = "webhook-secret"
+
+
+def create_notification(event_id=1, event_type="subscription.executed"):
+    return json.dumps({
+        "eventId": event_id, "type": event_type,
+        "createdAt": "2017-01-02T03:04:05",
+        "payload": {"subscriptionId": 12, "amount": 10.5}
+    }).encode()
+
+
+@pytest.fixture()
+def handler():
+    return WebhookHandler(SECRET)
+
+
+class TestWebhookHandler:
+
+    def test_dispatch_typed_event(self, handler):
+        # Setup
+        events = []
+        handler.on("subscription.executed")(events.append)
+        handler.on("subscription.updated")(pytest.fail)
+        body = create_notification()
+
+        # Execute
+        event = handler.handle(body, handler.sign(body))
+
+        # Verify
+        assert events == [event]
+        assert event.event_id == 1
+        assert event.namespace == "subscription"
+        assert isinstance(event.payload, Subscription)
+        assert event.payload.subscription_id == 12
+
+    def test_wildcard_handler(self, handler):
+        # Setup
+        events = []
+        handler.on("*")(events.append)
+        body = create_notification(event_type="checkout_session.paid")
+
+        # Execute
+        handler.handle(body, "sha256=" + handler.sign(body))
+
+        # Verify
+        assert [event.type for event in events] == ["checkout_session.paid"]
+
+    @pytest.mark.parametrize(
+        "signature", [None, "", "0" * 64, "sha256=" + "é" * 64])
+    def test_invalid_signature(self, handler, signature):
+        # Verify
+        with pytest.raises(InvalidSignatureError):
+            # Execute
+            handler.handle(create_notification(), signature)
+
+    def test_invalid_body(self, handler):
+        # Setup
+        body = b"[1, 2"
+
+        # Verify
+        with pytest.raises(WebhookError):
+            # Execute
+            handler.handle(body, handler.sign(body))
+
+    def test_redeliveries_are_skipped(self, handler):
+        # Setup
+        events = []
+        handler.on("*")(events.append)
+        body = create_notification()
+
+        # Execute
+        results = [handler.handle(body, handler.sign(body)) for _ in range(3)]
+
+        # Verify
+        assert len(events) == 1
+        assert results[1:] == [None, None]
+
+    def test_failed_events_are_handled_again(self, handler):
+        # Setup
+        calls = []
+
+        @handler.on("*")
+        def fail_once(event):
+            calls.append(event)
+            if len(calls) == 1:
+                raise RuntimeError("Failed")
+
+        body = create_notification()
+
+        # Execute
+        with pytest.raises(RuntimeError):
+            handler.handle(body, handler.sign(body))
+        handler.handle(body, handler.sign(body))
+
+        # Verify
+        assert len(calls) == 2
+
+
+class TestMemoryDedupeStore:
+
+    def test_bounded(self):
+        # Setup
+        store = MemoryDedupeStore(maxsize=2)
+
+        # Execute
+        added = [store.add(event_id) for event_id in (1, 2, 3, 1)]
+
+        # Verify
+        assert added == [True, True, True, True]
+        assert len(store) == 2
+
+
+def call_wsgi(handler, body, signature, method="POST"):
+    environ = {
+        "REQUEST_METHOD": method, "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body), "HTTP_X_SWEETPAY_SIGNATURE": signature
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    handler(environ, lambda status, headers: statuses.append(status))
+    return statuses[0]
+
+
+def call_asgi(handler, body, signature, method="POST"):
+    sent = []
+    messages = [
+        {"type": "http.request", "body": body[:10], "more_body": True},
+        {"type": "http.request", "body": body[10:], "more_body": False}
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "headers": [
+        (b"x-sweetpay-signature", signature.encode())]}
+    asyncio.run(handler.asgi(scope, receive, send))
+    return sent[0]["status"]
+
+
+class TestWSGIApplication:
+
+    @pytest.mark.parametrize("length", ["abc", "-1"])
+    def test_invalid_content_length(self, handler, length):
+        # Setup
+        body = create_notification()
+        environ = {
+            "REQUEST_METHOD": "POST", "CONTENT_LENGTH": length,
+            "wsgi.input": io.BytesIO(body),
+            "HTTP_X_SWEETPAY_SIGNATURE": handler.sign(body)
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+
+        # Execute
+        handler(environ, lambda status, headers: statuses.append(status))
+
+        # Verify
+        assert statuses == ["400 Bad Request"]
+
+
+@pytest.mark.parametrize("call", [call_wsgi, call_asgi])
+class TestApplications:
+
+    def test_handled(self, handler, call):
+        # Setup
+        events = []
+        handler.on("*")(events.append)
+        body = create_notification()
+
+        # Execute
+        status = call(handler, body, handler.sign(body))
+
+        # Verify
+        assert str(status).startswith("204")
+        assert len(events) == 1
+
+    @pytest.mark.parametrize("signature", ["invalid", "é" * 64])
+    def test_invalid_signature(self, handler, call, signature):
+        # Execute
+        status = call(handler, create_notification(), signature)
+
+        # Verify
+        assert str(status).startswith("401")
+
+    def test_invalid_body(self, handler, call):
+        # Setup
+        body = b"not json, but long enough"
+
+        # Execute
+        status = call(handler, body, handler.sign(body))
+
+        # Verify
+        assert str(status).startswith("400")
+
+    def test_failing_handler(self, handler, call):
+        # Setup
+        @handler.on("*")
+        def fail(event):
+            raise RuntimeError("Failed")
+
+        body = create_notification()
+
+        # Execute
+        status = call(handler, body, handler.sign(body))
+
+        # Verify
+        assert str(status).startswith("500")
+
+    def test_too_large(self, call):
+        # Setup
+        handler = WebhookHandler(SECRET, max_body_size=16)
+        body = create_notification()
+
+        # Execute
+        status = call(handler, body, handler.sign(body))
+
+        # Verify
+        assert str(status).startswith("413")
+
+    def test_wrong_method(self, handler, call):
+        # Execute
+        status = call(handler, b"", "", method="GET")
+
+        # Verify
+        assert str(status).startswith("405")